@@ -0,0 +1,287 @@
+"""
+Minimal MQTT 3.1.1 broker, used by the benchmarks (and for local development) instead of Mosquitto.
+It runs in a background thread and supports the features used by the service: connections without authentication
+(user names and passwords are accepted but not checked), subscriptions with wildcards, retained messages and QoS 0, 1
+and 2 publishing from the clients. Messages are always delivered to the subscribers with QoS 0, and sessions are not
+kept after the clients disconnect.
+
+Usage (from the server directory):
+    python -m benchmarks.broker [--host 127.0.0.1] [--port 1883]
+"""
+
+# python libs
+import asyncio
+import argparse
+import threading
+
+from typing import Dict, List, Optional, Tuple
+
+# constants
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+PUBREC = 5
+PUBREL = 6
+PUBCOMP = 7
+SUBSCRIBE = 8
+SUBACK = 9
+UNSUBSCRIBE = 10
+UNSUBACK = 11
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """
+    Returns whether the topic matches the topic filter ("+" matches one level and "#" all the remaining levels, topics
+    starting with "$" are not matched by wildcards in the first level)
+    :param topic_filter: subscribed topic filter
+    :param topic: message topic
+    :return: True if the topic matches
+    """
+
+    if topic.startswith('$') and topic_filter[:1] in ['+', '#']:
+        return False
+
+    filter_levels = topic_filter.split('/')
+    topic_levels = topic.split('/')
+    for i, filter_level in enumerate(filter_levels):
+        if filter_level == '#':
+            return True
+
+        if i >= len(topic_levels) or (filter_level != '+' and filter_level != topic_levels[i]):
+            return False
+
+    return len(filter_levels) == len(topic_levels)
+
+
+def packet(packet_type: int, flags: int, body: bytes) -> bytes:
+    # fixed header (type, flags and remaining length) and body of a packet
+    remaining_length = bytearray()
+    length = len(body)
+    while True:
+        length, byte = divmod(length, 128)
+        remaining_length.append(byte | (128 if length else 0))
+        if not length:
+            break
+
+    return bytes([packet_type << 4 | flags]) + bytes(remaining_length) + body
+
+
+def string(value: bytes) -> bytes:
+    return len(value).to_bytes(2, 'big') + value
+
+
+def read_string(body: bytes, position: int) -> Tuple[bytes, int]:
+    length = int.from_bytes(body[position:position + 2], 'big')
+    return body[position + 2:position + 2 + length], position + 2 + length
+
+
+class BrokerConnection:
+
+    def __init__(self, broker: 'MqttBroker', reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.broker = broker
+        self.reader = reader
+        self.writer = writer
+        self.client_id = None
+        self.subscriptions: List[str] = list()
+
+    async def read_packet(self) -> Optional[Tuple[int, int, bytes]]:
+        # returns the type, flags and body of the next packet (None if the connection was closed)
+        try:
+            first_byte = (await self.reader.readexactly(1))[0]
+            length = 0
+            multiplier = 1
+            while True:
+                byte = (await self.reader.readexactly(1))[0]
+                length += (byte & 127) * multiplier
+                multiplier *= 128
+                if not byte & 128:
+                    break
+
+            return first_byte >> 4, first_byte & 15, await self.reader.readexactly(length)
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+
+    def send(self, data: bytes) -> None:
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+    async def handle(self) -> None:
+        try:
+            while (received_packet := await self.read_packet()) is not None:
+                packet_type, flags, body = received_packet
+                if packet_type == DISCONNECT or not self.handle_packet(packet_type, flags, body):
+                    break
+
+                await self.writer.drain()
+
+        except ConnectionError:
+            pass
+
+        finally:
+            self.broker.disconnected(self)
+            self.writer.close()
+
+    def handle_packet(self, packet_type: int, flags: int, body: bytes) -> bool:
+        # handles a packet received from the client, returns False if the connection must be closed
+        if packet_type == CONNECT:
+            _, position = read_string(body, 0)
+            client_id, _ = read_string(body, position + 4)
+            self.client_id = client_id.decode() or f'client-{id(self)}'
+            self.broker.connected(self)
+            self.send(packet(CONNACK, 0, b'\x00\x00'))
+
+        elif packet_type == PUBLISH:
+            qos = flags >> 1 & 3
+            topic, position = read_string(body, 0)
+            if qos:
+                packet_id = body[position:position + 2]
+                position += 2
+                self.send(packet(PUBACK if qos == 1 else PUBREC, 0, packet_id))
+
+            self.broker.publish(topic.decode(), body[position:], bool(flags & 1))
+
+        elif packet_type == PUBREL:
+            self.send(packet(PUBCOMP, 0, body[:2]))
+
+        elif packet_type == SUBSCRIBE:
+            topic_filters = list()
+            position = 2
+            while position < len(body):
+                topic_filter, position = read_string(body, position)
+                topic_filters.append(topic_filter.decode())
+                position += 1  # requested QoS, messages are always delivered with QoS 0
+
+            self.send(packet(SUBACK, 0, body[:2] + b'\x00' * len(topic_filters)))
+            self.broker.subscribe(self, topic_filters)
+
+        elif packet_type == UNSUBSCRIBE:
+            position = 2
+            while position < len(body):
+                topic_filter, position = read_string(body, position)
+                if topic_filter.decode() in self.subscriptions:
+                    self.subscriptions.remove(topic_filter.decode())
+
+            self.send(packet(UNSUBACK, 0, body[:2]))
+
+        elif packet_type == PINGREQ:
+            self.send(packet(PINGRESP, 0, b''))
+
+        elif packet_type not in [PUBACK, PUBREC, PUBCOMP]:
+            return False
+
+        return True
+
+
+class MqttBroker:
+    """
+    MQTT broker running in a background thread
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        """
+        :param host: address to listen on
+        :param port: port to listen on (0 uses a free port, see "port" after starting)
+        """
+
+        self.host = host
+        self.port = port
+
+        self._connections: Dict[str, BrokerConnection] = dict()
+        self._retained: Dict[str, bytes] = dict()
+        self._loop = asyncio.new_event_loop()
+        self._server = None
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='mqtt-broker', daemon=True)
+
+        # counters
+        self.received_messages = 0
+        self.delivered_messages = 0
+
+    def start(self) -> 'MqttBroker':
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def stop(self) -> None:
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+        self._thread.join()
+
+    def connected(self, connection: BrokerConnection) -> None:
+        # a new connection with the same client id closes the previous one
+        if (previous_connection := self._connections.get(connection.client_id)) is not None:
+            previous_connection.writer.close()
+
+        self._connections[connection.client_id] = connection
+
+    def disconnected(self, connection: BrokerConnection) -> None:
+        if self._connections.get(connection.client_id) is connection:
+            del self._connections[connection.client_id]
+
+    def subscribe(self, connection: BrokerConnection, topic_filters: List[str]) -> None:
+        connection.subscriptions.extend(topic_filter for topic_filter in topic_filters
+                                        if topic_filter not in connection.subscriptions)
+        for topic, payload in self._retained.items():
+            if any(topic_matches(topic_filter, topic) for topic_filter in topic_filters):
+                connection.send(packet(PUBLISH, 1, string(topic.encode()) + payload))
+
+    def publish(self, topic: str, payload: bytes, retain: bool) -> None:
+        self.received_messages += 1
+        if retain:
+            if payload:
+                self._retained[topic] = payload
+
+            else:
+                self._retained.pop(topic, None)
+
+        message = packet(PUBLISH, 0, string(topic.encode()) + payload)
+        for connection in list(self._connections.values()):
+            if any(topic_matches(topic_filter, topic) for topic_filter in connection.subscriptions):
+                connection.send(message)
+                self.delivered_messages += 1
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await BrokerConnection(self, reader, writer).handle()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle_connection,
+                                                                          self.host,
+                                                                          self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started.set()
+        try:
+            self._loop.run_forever()
+
+        finally:
+            self._server.close()
+            for connection in list(self._connections.values()):
+                connection.writer.close()
+
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=1883, help='port to listen on')
+    args = parser.parse_args()
+
+    broker = MqttBroker(args.host, args.port).start()
+    print(f'MQTT broker listening on {args.host}:{broker.port}')
+    try:
+        threading.Event().wait()
+
+    except KeyboardInterrupt:
+        broker.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Measures the decode (loads) and encode (dumps) times of the JSON codec backends for documents of different sizes.
+The "orjson" backend is only measured if the package is installed.
+
+Usage (from the server directory):
+    python -m benchmarks.codec [--sizes-kb 1 1024 20480] [--repeat 5]
+"""
+
+# python libs
+import sys
+import json
+import time
+import argparse
+
+from pathlib import Path
+
+# the service modules are imported from the server directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# project files
+from codec import JsonCodec, orjson
+from benchmarks.utils import large_document
+
+
+def best_time(function, repeat: int) -> float:
+    times = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes-kb', type=float, nargs='+', default=[1, 1024, 20480],
+                        help='sizes of the JSON documents in KB')
+    parser.add_argument('--repeat', type=int, default=5, help='number of runs of each measure (best time is used)')
+    args = parser.parse_args()
+
+    codecs = {'json (indent 1)': JsonCodec('json', 1), 'json (compact)': JsonCodec('json')}
+    if orjson:
+        codecs |= {'orjson (compact)': JsonCodec('orjson'), 'orjson (indent 2)': JsonCodec('orjson', 2)}
+
+    results = list()
+    for size_kb in args.sizes_kb:
+        document = large_document(int(size_kb * 1024))
+        for name, codec in codecs.items():
+            encoded = codec.dumps(document)
+            results.append({
+                'codec': name,
+                'size_kb': size_kb,
+                'encoded_kb': round(len(encoded) / 1024, 1),
+                'loads_ms': round(best_time(lambda: codec.loads(encoded), args.repeat) * 1000, 3),
+                'dumps_ms': round(best_time(lambda: codec.dumps(document), args.repeat) * 1000, 3)
+            })
+
+    print(json.dumps({'benchmark': 'codec', 'results': results}, indent=1))
+
+
+if __name__ == '__main__':
+    main()
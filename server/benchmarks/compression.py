@@ -0,0 +1,69 @@
+"""
+Measures the latency and the response size of GET requests of nodes of several sizes without compression and with
+each available encoding, compressing every response versus keeping the compressed bodies, and the time to transfer
+each response over a slow link.
+
+Usage (from the server directory):
+    python -m benchmarks.compression [--sizes-kb 16 256 4096] [--requests 50] [--link-mbps 10]
+"""
+
+# python libs
+import json
+import asyncio
+import argparse
+
+from typing import Optional
+
+# project files
+from benchmarks.utils import asgi_request, large_document, latency_summary, setup_server
+
+
+async def get(app, path: str, requests: int, encoding: Optional[str], link_mbps: float) -> dict:
+    latencies = list()
+    body_size = 0
+    for _ in range(requests):
+        response = await asgi_request(app, 'GET', path, headers={'Accept-Encoding': encoding} if encoding else None)
+        assert response['status'] == 200
+        assert response['headers'].get('content-encoding') == encoding
+        latencies.append(response['total_s'])
+        body_size = response['body_size']
+
+    transfer_ms = body_size * 8 / (link_mbps * 1000)
+    return latency_summary(latencies) | {
+        'body_kb': round(body_size / 1024, 1),
+        'p50_with_transfer_ms': round(latency_summary(latencies)['p50_ms'] + transfer_ms, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes-kb', type=float, nargs='+', default=[16, 256, 4096], help='sizes of the nodes in KB')
+    parser.add_argument('--requests', type=int, default=50, help='number of GET requests of each measure')
+    parser.add_argument('--link-mbps', type=float, default=10, help='bandwidth of the link, in Mbit/s')
+    args = parser.parse_args()
+
+    setup_server({f'bench{i}': large_document(int(size_kb * 1024)) for i, size_kb in enumerate(args.sizes_kb)})
+
+    import main as service
+
+    app = service.app()
+    cache_size = service.compressed_bodies.max_size
+    results = list()
+    for i, size_kb in enumerate(args.sizes_kb):
+        path = f'/bench{i}/large'
+        result = {'size_kb': size_kb, 'identity': asyncio.run(get(app, path, args.requests, None, args.link_mbps))}
+        for encoding in service.compressor.encodings:
+            service.compressed_bodies.max_size = 0
+            result[encoding] = asyncio.run(get(app, path, args.requests, encoding, args.link_mbps))
+            service.compressed_bodies.max_size = cache_size
+            result[f'{encoding}_cached'] = asyncio.run(get(app, path, args.requests, encoding, args.link_mbps))
+
+        results.append(result)
+
+    service.shutdown()
+
+    print(json.dumps({'benchmark': 'compression', 'link_mbps': args.link_mbps, 'results': results}, indent=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Measures the latency and the response size of polling a node with and without the "If-None-Match" header, while
+another node of the same file changes.
+
+Usage (from the server directory):
+    python -m benchmarks.conditional_get [--size-mb 1] [--polls 200]
+"""
+
+# python libs
+import json
+import asyncio
+import argparse
+
+# project files
+from benchmarks.utils import asgi_request, large_document, latency_summary, setup_server
+
+
+async def poll(app, polls: int, conditional: bool) -> dict:
+    latencies = list()
+    body_size = 0
+    etag = None
+    for i in range(polls):
+        # other node of the file changes between polls
+        await asgi_request(app, 'PUT', '/bench/small/value', body=json.dumps(i).encode())
+
+        response = await asgi_request(app, 'GET', '/bench/large', headers={'If-None-Match': etag} if etag else None)
+        assert response['status'] in [200, 304]
+
+        latencies.append(response['total_s'])
+        body_size += response['body_size']
+        if conditional:
+            etag = response['headers'].get('etag', etag)
+
+    return latency_summary(latencies) | {'body_kb': round(body_size / 1024, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, default=1, help='size of the polled node in MB')
+    parser.add_argument('--polls', type=int, default=200, help='number of GET requests')
+    args = parser.parse_args()
+
+    setup_server({'bench': large_document(int(args.size_mb * 1048576))})
+
+    import main as service
+
+    app = service.app()
+    results = {
+        'unconditional': asyncio.run(poll(app, args.polls, False)),
+        'if_none_match': asyncio.run(poll(app, args.polls, True))
+    }
+    service.shutdown()
+
+    print(json.dumps({'benchmark': 'conditional_get', 'node_size_mb': args.size_mb} | results, indent=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Measures the time to change several nodes of a file with one PUT request per node and with one PATCH request with a
+JSON Patch document of all the changes.
+
+Usage (from the server directory):
+    python -m benchmarks.json_patch [--size-mb 1] [--changes 50] [--rounds 20]
+"""
+
+# python libs
+import json
+import time
+import asyncio
+import argparse
+
+# project files
+from benchmarks.utils import asgi_request, large_document, latency_summary, setup_server
+
+
+async def change_nodes(app, changes: int, rounds: int, batch: bool) -> dict:
+    latencies = list()
+    for i in range(rounds):
+        start = time.perf_counter()
+        if batch:
+            json_patch = [{'op': 'add', 'path': f'/small/node{node}', 'value': i} for node in range(changes)]
+            response = await asgi_request(app, 'PATCH', '/bench', body=json.dumps(json_patch).encode())
+            assert response['status'] == 200
+
+        else:
+            for node in range(changes):
+                response = await asgi_request(app, 'PUT', f'/bench/small/node{node}', body=json.dumps(i).encode())
+                assert response['status'] == 200
+
+        latencies.append(time.perf_counter() - start)
+
+    return latency_summary(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, default=1, help='size of the JSON file in MB')
+    parser.add_argument('--changes', type=int, default=50, help='number of nodes changed in each round')
+    parser.add_argument('--rounds', type=int, default=20, help='number of rounds')
+    args = parser.parse_args()
+
+    setup_server({'bench': large_document(int(args.size_mb * 1048576))})
+
+    import main as service
+
+    app = service.app()
+    results = {
+        'put_per_node': asyncio.run(change_nodes(app, args.changes, args.rounds, False)),
+        'patch': asyncio.run(change_nodes(app, args.changes, args.rounds, True))
+    }
+    service.shutdown()
+
+    print(json.dumps({'benchmark': 'json_patch', 'file_size_mb': args.size_mb, 'changes': args.changes} | results,
+                     indent=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Measures the MQTT messages and bytes published when one leaf of a large topic node changes, in the "full" and
+"delta" publish modes. Messages are published to a client that only counts them (no broker is used).
+
+Usage (from the server directory):
+    python -m benchmarks.mqtt_delta [--size-kb 256] [--changes 200]
+"""
+
+# python libs
+import json
+import time
+import asyncio
+import argparse
+
+# project files
+from benchmarks.utils import CountingClient, asgi_request, latency_summary, setup_server
+
+
+async def change_leaves(app, changes: int) -> dict:
+    latencies = list()
+    for i in range(changes):
+        response = await asgi_request(app, 'PUT', f'/bench/devices/device{i % 100}/value', body=json.dumps(i).encode())
+        assert response['status'] == 200
+        latencies.append(response['total_s'])
+
+    return latency_summary(latencies)
+
+
+def run(service, app, mode: str, changes: int) -> dict:
+    from publisher import MqttPublisher
+
+    service.CONFIG['mqtt']['publish']['mode'] = mode
+    client = CountingClient()
+    client.publisher = service.mqtt_publisher = MqttPublisher(client, queue_size=10000)
+    service.mqtt_publisher.start()
+
+    start = time.perf_counter()
+    result = asyncio.run(change_leaves(app, changes))
+    service.mqtt_publisher.stop()
+
+    return result | {
+        'seconds': round(time.perf_counter() - start, 3),
+        'messages': client.messages,
+        'published_kb': round(client.bytes / 1024, 1),
+        'published_kb_per_change': round(client.bytes / 1024 / changes, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-kb', type=float, default=256, help='size of the topic node in KB')
+    parser.add_argument('--changes', type=int, default=200, help='number of changed leaves')
+    args = parser.parse_args()
+
+    device = {'value': 0, 'name': 'device', 'enabled': True, 'readings': [1.5, 2.5, 3.5]}
+    devices = max(100, int(args.size_kb * 1024) // (len(json.dumps(device)) + 16))
+    config = {'mqtt': {'enabled': False, 'publish': {'json_path_topic_depth': 1, 'full_state_interval': 1}}, 'api': {}}
+    setup_server({'bench': {'devices': {f'device{i}': device for i in range(devices)}}}, config)
+
+    import main as service
+
+    app = service.app()
+
+    # the client is never connected, the messages are published to the counting client
+    service.CONFIG['mqtt']['enabled'] = True
+    results = {mode: run(service, app, mode, args.changes) for mode in ['full', 'delta']}
+    service.CONFIG['mqtt']['enabled'] = False
+    service.shutdown()
+
+    print(json.dumps({'benchmark': 'mqtt_delta', 'topic_node_kb': args.size_kb} | results, indent=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Measures the end-to-end latency between an HTTP write and the arrival of the published message at a subscriber, under
+load. The service connects to an in-process MQTT broker (see benchmarks/broker.py) as it connects to Mosquitto, and a
+subscriber connected to the same broker timestamps the messages of the written nodes.
+
+Each write sets the value of a node of a different topic to a sequence number, so its message is identified by the
+subscriber. Messages of a topic that is written again before they are published are replaced by the newer one (only
+the last state of a topic is published), so they never arrive; they are reported as "replaced".
+
+Usage (from the server directory):
+    python -m benchmarks.mqtt_latency [--writes 5000] [--topics 100] [--concurrency 8] [--rate 0] [--qos 0]
+"""
+
+# python libs
+import json
+import time
+import asyncio
+import argparse
+import threading
+
+from typing import Dict
+
+# project files
+from benchmarks.broker import MqttBroker
+from benchmarks.utils import latency_summary, setup_server
+
+# constants
+ARRIVAL_TIMEOUT = 5
+
+
+class TimestampingSubscriber:
+    """
+    MQTT client that records the arrival time of the sequence number of each message
+    """
+
+    def __init__(self, port: int):
+        from paho.mqtt.client import Client
+
+        self.arrivals: Dict[int, float] = dict()
+        self.messages = 0
+        self._subscribed = threading.Event()
+        self._client = Client('benchmark-subscriber')
+        self._client.on_connect = lambda client, userdata, flags, rc: client.subscribe('#')
+        self._client.on_subscribe = lambda client, userdata, mid, granted_qos: self._subscribed.set()
+        self._client.on_message = self._on_message
+        self._client.connect('127.0.0.1', port)
+        self._client.loop_start()
+        self._subscribed.wait(ARRIVAL_TIMEOUT)
+
+    def stop(self) -> None:
+        self._client.disconnect()
+        self._client.loop_stop()
+
+    def _on_message(self, client, userdata, message) -> None:
+        arrival = time.perf_counter()
+        if message.retain or not message.payload:
+            return
+
+        self.messages += 1
+        self.arrivals[json.loads(message.payload)['value']] = arrival
+
+
+async def write_nodes(app, writes: int, topics: int, concurrency: int, rate: float) -> Dict[str, object]:
+    import httpx
+
+    sent = dict()
+    latencies = list()
+    sequence_numbers = iter(range(writes))
+    start = time.perf_counter()
+
+    async def writer(client: httpx.AsyncClient) -> None:
+        for sequence_number in sequence_numbers:
+            # with a rate, the writes are sent at fixed times
+            if rate and (delay := start + sequence_number / rate - time.perf_counter()) > 0:
+                await asyncio.sleep(delay)
+
+            sent[sequence_number] = time.perf_counter()
+            response = await client.put(f'/bench/topic{sequence_number % topics}/value',
+                                        content=json.dumps(sequence_number))
+            latencies.append(time.perf_counter() - sent[sequence_number])
+            assert response.status_code == 200
+
+    async with httpx.AsyncClient(app=app, base_url='http://benchmark') as client:
+        await asyncio.gather(*(writer(client) for _ in range(concurrency)))
+
+    return {'sent': sent, 'latencies': latencies, 'seconds': time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writes', type=int, default=5000, help='number of HTTP writes')
+    parser.add_argument('--topics', type=int, default=100, help='number of written topics (nodes)')
+    parser.add_argument('--concurrency', type=int, default=8, help='number of concurrent writes')
+    parser.add_argument('--rate', type=float, default=0, help='writes per second (0 writes as fast as possible)')
+    parser.add_argument('--qos', type=int, choices=[0, 1, 2], default=0, help='QoS of the published messages')
+    args = parser.parse_args()
+
+    broker = MqttBroker().start()
+    config = {
+        'mqtt': {
+            'enabled': True,
+            'port': broker.port,
+            'publish': {'json_path_topic_depth': 1, 'qos': args.qos}
+        },
+        'api': {}
+    }
+    setup_server({'bench': {f'topic{i}': {'value': -1, 'name': f'topic{i}'} for i in range(args.topics)}}, config)
+
+    import main as service
+
+    app = service.app()
+    subscriber = TimestampingSubscriber(broker.port)
+    while not service.mqtt_client.is_connected():
+        time.sleep(0.01)
+
+    result = asyncio.run(write_nodes(app, args.writes, args.topics, args.concurrency, args.rate))
+
+    # wait for the messages still being published
+    deadline = time.perf_counter() + ARRIVAL_TIMEOUT
+    while service.mqtt_publisher.pending_messages or service.mqtt_publisher.in_flight_messages or \
+            (args.writes - 1 not in subscriber.arrivals and time.perf_counter() < deadline):
+        time.sleep(0.01)
+
+    time.sleep(0.1)
+    service.shutdown()
+    subscriber.stop()
+    broker.stop()
+
+    sent = result['sent']
+    end_to_end_latencies = [arrival - sent[sequence_number]
+                            for sequence_number, arrival in subscriber.arrivals.items() if sequence_number in sent]
+
+    print(json.dumps({
+        'benchmark': 'mqtt_latency',
+        'writes': args.writes,
+        'topics': args.topics,
+        'concurrency': args.concurrency,
+        'qos': args.qos,
+        'seconds': round(result['seconds'], 3),
+        'writes_per_second': round(args.writes / result['seconds'], 1),
+        'http_write': latency_summary(result['latencies']),
+        'end_to_end': latency_summary(end_to_end_latencies),
+        'received_messages': subscriber.messages,
+        'messages_per_second': round(subscriber.messages / result['seconds'], 1),
+        'replaced': service.mqtt_publisher.replaced_messages,
+        'suppressed': service.mqtt_publisher.suppressed_messages,
+        'dropped': service.mqtt_publisher.dropped_messages,
+        'not_received': args.writes - len(end_to_end_latencies)
+    }, indent=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Measures the throughput of changing nodes of a file with one HTTP PUT request per change versus MQTT messages to the
+subscribed topic, that are applied in batches. The MQTT messages are delivered by an in-process broker stand-in, that
+calls the message callback of the client as the network loop does.
+
+Usage (from the server directory):
+    python -m benchmarks.mqtt_write [--size-kb 64] [--changes 2000] [--batch-size 1000]
+"""
+
+# python libs
+import json
+import time
+import asyncio
+import argparse
+
+# project files
+from benchmarks.utils import asgi_request, setup_server
+
+
+class LocalBroker:
+    """
+    Broker stand-in that delivers the published messages to the client of the service
+    """
+
+    def __init__(self, service):
+        self._service = service
+
+    def publish(self, topic: str, payload: bytes) -> None:
+        from paho.mqtt.client import MQTTMessage
+
+        message = MQTTMessage(topic=topic.encode())
+        message.payload = payload
+        self._service.on_message(self._service.mqtt_client, None, message)
+
+
+async def put_changes(app, changes: int) -> None:
+    for i in range(changes):
+        response = await asgi_request(app, 'PUT', f'/bench/devices/device{i % 100}/value', body=json.dumps(i).encode())
+        assert response['status'] == 200
+
+
+def publish_changes(service, broker: LocalBroker, changes: int) -> None:
+    for i in range(changes):
+        broker.publish(f'{service.MQTT_SUBSCRIBE_TOPIC_PREFIX}/devices/device{i % 100}/value', json.dumps(i).encode())
+
+    # wait for all the changes to be applied
+    while service.mqtt_subscriber.applied_changes + service.mqtt_subscriber.apply_errors < changes:
+        time.sleep(0.001)
+
+
+def measure(function, changes: int) -> dict:
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    return {'changes': changes, 'seconds': round(seconds, 3), 'changes_per_second': round(changes / seconds, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-kb', type=float, default=64, help='size of the JSON file in KB')
+    parser.add_argument('--changes', type=int, default=2000, help='number of changes')
+    parser.add_argument('--batch-size', type=int, default=1000, help='maximum number of MQTT changes per batch')
+    args = parser.parse_args()
+
+    device = {'value': 0, 'name': 'device', 'enabled': True, 'readings': [1.5, 2.5, 3.5]}
+    devices = max(100, int(args.size_kb * 1024) // (len(json.dumps(device)) + 16))
+    setup_server({'bench': {'devices': {f'device{i}': device for i in range(devices)}}})
+
+    import main as service
+    from subscriber import MqttSubscriber
+
+    app = service.app()
+    service.mqtt_subscriber = MqttSubscriber(service.apply_mqtt_changes, 10000, args.batch_size)
+    service.mqtt_subscriber.start()
+
+    results = {
+        'http_put': measure(lambda: asyncio.run(put_changes(app, args.changes)), args.changes),
+        'mqtt': measure(lambda: publish_changes(service, LocalBroker(service), args.changes), args.changes)
+    }
+    results['mqtt']['batches'] = service.mqtt_subscriber.applied_batches
+    service.shutdown()
+
+    print(json.dumps({'benchmark': 'mqtt_write', 'file_size_kb': args.size_kb} | results, indent=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Measures the latency and the response size of GET requests of a large list: the whole list, one page of items (in the
+middle of the list) and all the pages of the list (of 100 times the page size), following the "X-Next-Cursor" header
+of each page.
+
+Usage (from the server directory):
+    python -m benchmarks.pagination [--size-mb 20] [--page-size 100] [--requests 50]
+"""
+
+# python libs
+import json
+import time
+import asyncio
+import argparse
+
+# project files
+from benchmarks.utils import asgi_request, large_document, latency_summary, setup_server
+
+
+async def get(app, path: str, requests: int) -> dict:
+    latencies = list()
+    body_size = 0
+    for _ in range(requests):
+        response = await asgi_request(app, 'GET', path)
+        assert response['status'] == 200
+        latencies.append(response['total_s'])
+        body_size = response['body_size']
+
+    return latency_summary(latencies) | {'body_kb': round(body_size / 1024, 1)}
+
+
+async def walk_pages(app, page_size: int) -> dict:
+    pages = 0
+    body_size = 0
+    start = time.perf_counter()
+    path = f'/bench/large?limit={page_size}'
+    while path:
+        response = await asgi_request(app, 'GET', path)
+        assert response['status'] == 200
+        pages += 1
+        body_size += response['body_size']
+        cursor = response['headers'].get('x-next-cursor')
+        path = f'/bench/large?cursor={cursor}' if cursor else None
+
+    return {'pages': pages, 'seconds': round(time.perf_counter() - start, 3), 'body_kb': round(body_size / 1024, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, default=20, help='size of the list in MB')
+    parser.add_argument('--page-size', type=int, default=100, help='number of items of each page')
+    parser.add_argument('--requests', type=int, default=50, help='number of GET requests of each measure')
+    args = parser.parse_args()
+
+    document = large_document(int(args.size_mb * 1048576))
+    setup_server({'bench': document})
+
+    import main as service
+
+    app = service.app()
+    items = len(document['large'])
+    results = {
+        'whole_list': asyncio.run(get(app, '/bench/large', max(1, args.requests // 10))),
+        'page': asyncio.run(get(app, f'/bench/large?offset={items // 2}&limit={args.page_size}', args.requests)),
+        'all_pages': asyncio.run(walk_pages(app, args.page_size * 100))
+    }
+    service.shutdown()
+
+    print(json.dumps({'benchmark': 'pagination', 'list_size_mb': args.size_mb, 'items': items,
+                      'page_size': args.page_size} | results, indent=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Measures the time to answer a GET request of a small node of a large JSON file that was changed outside the API:
+parsing the whole file versus reading only the node with the path index of the file (built once per file change,
+or loaded from the index file if the service restarts and the file didn't change).
+
+Usage (from the server directory):
+    python -m benchmarks.path_index [--size-mb 20] [--depth 2] [--reads 200]
+"""
+
+# python libs
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+from pathlib import Path
+
+# the service modules are imported from the server directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# project files
+from codec import JsonCodec
+from index import PathIndexes
+from benchmarks.utils import latency_summary, large_document
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, default=20, help='size of the JSON file in MB')
+    parser.add_argument('--depth', type=int, default=2, help='"index_depth" of the file')
+    parser.add_argument('--reads', type=int, default=200, help='number of reads of indexed nodes')
+    args = parser.parse_args()
+
+    codec = JsonCodec()
+    document = large_document(int(args.size_mb * 1048576))
+    with tempfile.TemporaryDirectory(prefix='json-api-benchmark-') as directory:
+        json_file_path = Path(directory) / 'bench.json'
+        json_file_path.write_bytes(codec.dumps(document))
+
+        start = time.perf_counter()
+        codec.load(json_file_path)
+        full_load = time.perf_counter() - start
+
+        start = time.perf_counter()
+        path_indexes = PathIndexes()
+        index = path_indexes.get('bench', json_file_path, args.depth)
+        index_build = time.perf_counter() - start
+
+        # new instance, as if the service restarted
+        start = time.perf_counter()
+        PathIndexes().get('bench', json_file_path, args.depth)
+        index_load = time.perf_counter() - start
+
+        latencies = list()
+        for i in range(args.reads):
+            path = ['large', str(i * len(document['large']) // args.reads), 'name']
+            start = time.perf_counter()
+            node, remaining_path = path_indexes.read('bench', json_file_path, args.depth, path, codec.loads)
+            latencies.append(time.perf_counter() - start)
+
+    print(json.dumps({
+        'benchmark': 'path_index',
+        'file_size_mb': args.size_mb,
+        'index_depth': args.depth,
+        'index_entries': len(index),
+        'full_load_ms': round(full_load * 1000, 3),
+        'index_build_ms': round(index_build * 1000, 3),
+        'index_load_ms': round(index_load * 1000, 3),
+        'indexed_read': latency_summary(latencies)
+    }, indent=1))
+
+
+if __name__ == '__main__':
+    main()
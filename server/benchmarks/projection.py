@@ -0,0 +1,56 @@
+"""
+Measures the latency and the response size of GET requests of a large file with and without the "fields" and "depth"
+query parameters: the whole file versus one level of it (as read by a tree browser), and a large list versus only one
+field of its items.
+
+Usage (from the server directory):
+    python -m benchmarks.projection [--size-mb 20] [--requests 10]
+"""
+
+# python libs
+import json
+import asyncio
+import argparse
+
+# project files
+from benchmarks.utils import asgi_request, large_document, latency_summary, setup_server
+
+
+async def get(app, path: str, requests: int) -> dict:
+    latencies = list()
+    body_size = 0
+    for _ in range(requests):
+        response = await asgi_request(app, 'GET', path)
+        assert response['status'] == 200
+        latencies.append(response['total_s'])
+        body_size = response['body_size']
+
+    return latency_summary(latencies) | {'body_kb': round(body_size / 1024, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, default=20, help='size of the JSON file in MB')
+    parser.add_argument('--requests', type=int, default=10, help='number of GET requests of each measure')
+    args = parser.parse_args()
+
+    setup_server({'bench': large_document(int(args.size_mb * 1048576))})
+
+    import main as service
+
+    app = service.app()
+    measures = {
+        'file': '/bench/',
+        'file_depth_1': '/bench/?depth=1',
+        'list': '/bench/large',
+        'list_depth_1': '/bench/large?depth=1',
+        'list_fields_id': '/bench/large?fields=id'
+    }
+    results = {name: asyncio.run(get(app, path, args.requests)) for name, path in measures.items()}
+    service.shutdown()
+
+    print(json.dumps({'benchmark': 'projection', 'file_size_mb': args.size_mb} | results, indent=1))
+
+
+if __name__ == '__main__':
+    main()
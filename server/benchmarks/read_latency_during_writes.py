@@ -0,0 +1,79 @@
+"""
+Measures the latency of GET requests of a small node while large writes are being made to the same file.
+Since parsing, validation and file writes run in the thread pool, the GET latency should stay flat.
+
+Usage (from the server directory):
+    python -m benchmarks.read_latency_during_writes [--size-mb 20] [--reads 500] [--threads 8]
+"""
+
+# python libs
+import json
+import time
+import asyncio
+import argparse
+
+# project files
+from benchmarks.utils import latency_summary, large_document, setup_server
+
+
+async def read_small_node(client, reads: int) -> list:
+    latencies = list()
+    for _ in range(reads):
+        start = time.perf_counter()
+        response = await client.get('/bench/small/value')
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200
+
+        await asyncio.sleep(0.001)
+
+    return latencies
+
+
+async def write_large_node(client, stop: asyncio.Event) -> int:
+    writes = 0
+    while not stop.is_set():
+        response = await client.put('/bench/large/0', content=json.dumps({'id': writes}))
+        assert response.status_code == 200
+        writes += 1
+
+    return writes
+
+
+async def run(app, reads: int) -> dict:
+    import httpx
+
+    async with httpx.AsyncClient(app=app, base_url='http://benchmark') as client:
+        idle_latencies = await read_small_node(client, reads)
+
+        stop = asyncio.Event()
+        writers = [asyncio.create_task(write_large_node(client, stop)) for _ in range(2)]
+        busy_latencies = await read_small_node(client, reads)
+        stop.set()
+        writes = sum(await asyncio.gather(*writers))
+
+    return {
+        'idle': latency_summary(idle_latencies),
+        'during_writes': latency_summary(busy_latencies) | {'large_writes': writes}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, default=20, help='size of the JSON file in MB')
+    parser.add_argument('--reads', type=int, default=500, help='number of GET requests in each phase')
+    parser.add_argument('--threads', type=int, default=8, help='"api.thread_pool_size" configuration')
+    args = parser.parse_args()
+
+    setup_server({'bench': large_document(int(args.size_mb * 1048576))},
+                 {'mqtt': {'enabled': False}, 'api': {'thread_pool_size': args.threads}})
+
+    import main as service
+
+    results = asyncio.run(run(service.app(), args.reads))
+    service.shutdown()
+
+    print(json.dumps({'benchmark': 'read_latency_during_writes', 'file_size_mb': args.size_mb} | results, indent=1))
+
+
+if __name__ == '__main__':
+    main()
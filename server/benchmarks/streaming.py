@@ -0,0 +1,64 @@
+"""
+Measures the time to the first byte, total time and peak memory of a GET request of a large node, with the response
+encoded at once and streamed in chunks.
+Since the streamed response is encoded while it is sent, the time to the first byte and the peak memory should not
+grow with the size of the node.
+
+Usage (from the server directory):
+    python -m benchmarks.streaming [--sizes-mb 1 20 100] [--repeat 3]
+"""
+
+# python libs
+import json
+import asyncio
+import argparse
+import tracemalloc
+
+# project files
+from benchmarks.utils import asgi_request, large_document, setup_server
+
+
+async def measure(app, path: str, repeat: int) -> dict:
+    responses = [await asgi_request(app, 'GET', path) for _ in range(repeat)]
+    assert all(response['status'] == 200 for response in responses)
+
+    # memory is measured in a separate request, since tracing the allocations slows down the request
+    tracemalloc.start()
+    await asgi_request(app, 'GET', path)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'streamed': 'content-length' not in responses[0]['headers'],
+        'body_mb': round(responses[0]['body_size'] / 1048576, 1),
+        'first_byte_ms': round(min(response['first_byte_s'] for response in responses) * 1000, 3),
+        'total_ms': round(min(response['total_s'] for response in responses) * 1000, 3),
+        'peak_memory_mb': round(peak_memory / 1048576, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes-mb', type=float, nargs='+', default=[1, 20, 100], help='sizes of the nodes in MB')
+    parser.add_argument('--repeat', type=int, default=3, help='number of requests of each measure (best time is used)')
+    args = parser.parse_args()
+
+    setup_server({f'bench{i}': large_document(int(size_mb * 1048576)) for i, size_mb in enumerate(args.sizes_mb)})
+
+    import main as service
+
+    app = service.app()
+    results = list()
+    for i, size_mb in enumerate(args.sizes_mb):
+        for stream_threshold in [0, service.CONFIG['api']['stream_threshold'] or 1048576]:
+            service.CONFIG['api']['stream_threshold'] = stream_threshold
+            results.append({'size_mb': size_mb, 'stream_threshold': stream_threshold} |
+                           asyncio.run(measure(app, f'/bench{i}/large', args.repeat)))
+
+    service.shutdown()
+
+    print(json.dumps({'benchmark': 'streaming', 'results': results}, indent=1))
+
+
+if __name__ == '__main__':
+    main()
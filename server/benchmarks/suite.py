@@ -0,0 +1,257 @@
+"""
+Runs the matrix of file sizes, path depths, list lengths, read/write mixes and MQTT publishing (on and off) against the
+application running in-process (requests are sent through the ASGI transport of the HTTP client, no server is used),
+and reports the throughput and p50/p99 latency of each cell as JSON.
+
+Each file size is a different JSON file, with a chain of nested nodes (read and written at each path depth), lists of
+each length that fits in the file (their middle item is read and written) and padding up to the file size. Requests of
+each cell are generated from a fixed seed, so runs with the same arguments send the same requests. With MQTT on, the
+changes are published to a client that only counts them (no broker is used).
+
+Results of a previous run can be given as the baseline, so the change of the throughput and p99 latency of each cell
+is reported (ratios, ex: 0.8 is 20% lower than the baseline).
+
+Usage (from the server directory):
+    python -m benchmarks.suite [--sizes-kb 1 1024 51200] [--depths 1 4 16] [--list-lengths 10 1000 100000]
+                               [--write-ratios 0 0.1 0.5] [--mqtt off on] [--seconds 1] [--concurrency 4]
+                               [--output results.json] [--baseline previous_results.json]
+"""
+
+# python libs
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+
+from typing import Any, Dict, Iterator, List, Tuple
+
+# project files
+from benchmarks.utils import CountingClient, latency_summary, setup_server
+
+# constants
+LIST_ITEM = {'id': 0}
+WARMUP_REQUESTS = 5
+
+
+def nested_nodes(depth: int) -> Dict[str, Any]:
+    # chain of nodes whose "value" leaf is at each depth ("/value", "/n/value", "/n/n/value", ...)
+    node = {'value': 0}
+    for _ in range(depth - 1):
+        node = {'value': 0, 'n': node}
+
+    return node
+
+
+def depth_path(depth: int) -> str:
+    return '/' + 'n/' * (depth - 1) + 'value'
+
+
+def fitting_list_lengths(size: int, list_lengths: List[int]) -> List[int]:
+    # lengths of the lists that fit in a file of the given size (shortest first)
+    list_item_size = len(json.dumps(LIST_ITEM)) + 2
+    fitting_lengths = list()
+    used_size = 0
+    for list_length in sorted(list_lengths):
+        if used_size + list_length * list_item_size > size:
+            break
+
+        fitting_lengths.append(list_length)
+        used_size += list_length * list_item_size
+
+    return fitting_lengths
+
+
+def file_document(size: int, depth: int, list_lengths: List[int]) -> Dict[str, Any]:
+    """
+    Creates the JSON document of a file size
+    :param size: size in bytes of the serialized document (or of its nested nodes and lists, if they are bigger)
+    :param depth: maximum path depth of the nested nodes
+    :param list_lengths: lengths of the lists
+    :return: JSON document
+    """
+
+    document = nested_nodes(depth) | {'lists': {f'l{length}': [{'id': i} for i in range(length)]
+                                                for length in list_lengths}}
+    padding_item = 'x' * 64
+    padding_size = size - len(json.dumps(document)) - len('"padding": []')
+    return document | {'padding': [padding_item] * max(0, padding_size // (len(padding_item) + 4))}
+
+
+def cells(args: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+    # matrix of the benchmark, each cell reads and writes one node
+    for size_kb in args.sizes_kb:
+        targets = [{'target': 'depth', 'depth': depth} for depth in args.depths] + \
+                  [{'target': 'list', 'list_length': length}
+                   for length in fitting_list_lengths(int(size_kb * 1024), args.list_lengths)]
+
+        for target in targets:
+            for write_ratio in args.write_ratios:
+                for mqtt in args.mqtt:
+                    yield {'size_kb': size_kb} | target | {'write_ratio': write_ratio, 'mqtt': mqtt}
+
+
+def cell_key(cell: Dict[str, Any]) -> Tuple:
+    return tuple((key, cell.get(key)) for key in ['size_kb', 'target', 'depth', 'list_length', 'write_ratio', 'mqtt'])
+
+
+def cell_request(cell: Dict[str, Any], rng: random.Random, value: int) -> Tuple[str, str, bytes]:
+    # method, path and body of the next request of the cell
+    path = f'/kb{cell["size_kb"]:g}'
+    if cell['target'] == 'depth':
+        path += depth_path(cell['depth'])
+        body = json.dumps(value)
+
+    else:
+        path += f'/lists/l{cell["list_length"]}/{cell["list_length"] // 2}'
+        body = json.dumps({'id': value})
+
+    if rng.random() < cell['write_ratio']:
+        return 'PUT', path, body.encode()
+
+    return 'GET', path, b''
+
+
+async def run_cell(client, cell: Dict[str, Any], seconds: float, concurrency: int, seed: int) -> Dict[str, Any]:
+    latencies = list()
+    errors = 0
+
+    async def worker(worker_number: int, deadline: float = None) -> None:
+        nonlocal errors
+
+        rng = random.Random(seed * 1000 + worker_number)
+        requests = 0
+        while (deadline is None and requests < WARMUP_REQUESTS) or (deadline and time.perf_counter() < deadline):
+            method, path, body = cell_request(cell, rng, requests)
+            start = time.perf_counter()
+            response = await client.request(method, path, content=body)
+            requests += 1
+            if deadline is None:
+                continue
+
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    await worker(0)
+
+    start = time.perf_counter()
+    deadline = start + seconds
+    await asyncio.gather(*(worker(worker_number, deadline) for worker_number in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return cell | latency_summary(latencies) | {
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1)
+    }
+
+
+async def run(app, service, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    import httpx
+    from publisher import MqttPublisher
+
+    results = list()
+    async with httpx.AsyncClient(app=app, base_url='http://benchmark') as client:
+        for cell_number, cell in enumerate(cells(args)):
+            # the client is never connected, the messages are published to the counting client
+            mqtt_client = None
+            if cell['mqtt'] == 'on':
+                mqtt_client = CountingClient()
+                mqtt_client.publisher = service.mqtt_publisher = MqttPublisher(mqtt_client, queue_size=10000)
+                service.mqtt_publisher.start()
+                service.CONFIG['mqtt']['enabled'] = True
+
+            result = await run_cell(client, cell, args.seconds, args.concurrency, args.seed + cell_number)
+
+            if mqtt_client:
+                service.CONFIG['mqtt']['enabled'] = False
+                service.mqtt_publisher.stop()
+                result['mqtt_messages'] = mqtt_client.messages
+
+            print(json.dumps(result), file=sys.stderr)
+            results.append(result)
+
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any]) -> None:
+    """
+    Adds the ratios of the throughput and p99 latency of each cell to the ones of the same cell of the baseline
+    :param results: results of the cells
+    :param baseline: results of a previous run
+    """
+
+    baseline_cells = {cell_key(cell): cell for cell in baseline['results']}
+    for result in results:
+        if (baseline_cell := baseline_cells.get(cell_key(result))) is None:
+            continue
+
+        if baseline_cell['requests_per_second']:
+            result['requests_per_second_change'] = round(result['requests_per_second'] /
+                                                         baseline_cell['requests_per_second'], 3)
+
+        if baseline_cell['p99_ms']:
+            result['p99_change'] = round(result['p99_ms'] / baseline_cell['p99_ms'], 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes-kb', type=float, nargs='+', default=[1, 1024, 51200], help='sizes of the JSON files')
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 4, 16], help='path depths of the nodes')
+    parser.add_argument('--list-lengths', type=int, nargs='+', default=[10, 1000, 100000], help='lengths of the lists')
+    parser.add_argument('--write-ratios', type=float, nargs='+', default=[0, 0.1, 0.5],
+                        help='ratios of write (PUT) requests')
+    parser.add_argument('--mqtt', nargs='+', choices=['off', 'on'], default=['off', 'on'],
+                        help='publish the changes to MQTT')
+    parser.add_argument('--seconds', type=float, default=1, help='duration of each cell')
+    parser.add_argument('--concurrency', type=int, default=4, help='number of concurrent requests')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the generated requests')
+    parser.add_argument('--output', help='file to write the results to (in addition to printing them)')
+    parser.add_argument('--baseline', help='results of a previous run to compare with')
+    args = parser.parse_args()
+
+    # the service runs in a temporary directory
+    output_path = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    files = dict()
+    for size_kb in args.sizes_kb:
+        size = int(size_kb * 1024)
+        files[f'kb{size_kb:g}'] = file_document(size, max(args.depths), fitting_list_lengths(size, args.list_lengths))
+
+    setup_server(files)
+
+    import main as service
+
+    app = service.app()
+    results = asyncio.run(run(app, service, args))
+    service.shutdown()
+
+    if baseline_path:
+        with open(baseline_path) as baseline_file_handler:
+            compare(results, json.load(baseline_file_handler))
+
+    report = {
+        'benchmark': 'suite',
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'codec': service.json_codec.backend
+        },
+        'arguments': {key: value for key, value in vars(args).items() if key not in ['output', 'baseline']},
+        'results': results
+    }
+
+    if output_path:
+        with open(output_path, 'w') as output_file_handler:
+            json.dump(report, output_file_handler, indent=1)
+
+    print(json.dumps(report, indent=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+# python libs
+import os
+import sys
+import json
+import atexit
+import asyncio
+import logging
+import time
+import tempfile
+
+from typing import Any, Dict, List
+from pathlib import Path
+
+
+class CountingClient:
+    """
+    MQTT client stand-in that counts the published messages and acknowledges them right away
+    """
+
+    def __init__(self):
+        self.publisher = None
+        self.messages = 0
+        self.bytes = 0
+        self._mid = 0
+
+    def is_connected(self) -> bool:
+        return True
+
+    def max_inflight_messages_set(self, inflight: int) -> None:
+        pass
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        from paho.mqtt.client import MQTTMessageInfo, MQTT_ERR_SUCCESS
+
+        self._mid += 1
+        self.messages += 1
+        self.bytes += len(topic) + len(payload or b'')
+
+        message_info = MQTTMessageInfo(self._mid)
+        message_info.rc = MQTT_ERR_SUCCESS
+        self.publisher.acknowledged(self._mid)
+        return message_info
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    Returns the percentile of the values (nearest rank)
+    :param values: measured values
+    :param percent: percentile to return (ex: 99)
+    :return: percentile value
+    """
+
+    if not values:
+        return 0.0
+
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """
+    Returns the summary of the latencies in milliseconds
+    :param latencies: measured latencies in seconds
+    :return: dict with the number of requests and the p50, p99 and maximum latencies
+    """
+
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(max(latencies, default=0) * 1000, 3)
+    }
+
+
+def setup_server(files: Dict[str, Any], config: Dict[str, Any] = None) -> Path:
+    """
+    Creates the JSON files and the service configuration in a temporary directory and prepares the environment to
+    import the service (must be called before importing "main"). The directory is removed when the process exits.
+    :param files: JSON content of each "api.files" entry
+    :param config: service configuration (the "api.files" entries are added to it, keeping their given options)
+    :return: Path to the temporary directory
+    """
+
+    # the service uses the directory until the process exits (the service is shut down before)
+    temporary_directory = tempfile.TemporaryDirectory(prefix='json-api-benchmark-')
+    atexit.register(temporary_directory.cleanup)
+    directory = Path(temporary_directory.name)
+
+    config = config or {'mqtt': {'enabled': False}, 'api': {}}
+    files_options = config['api'].get('files', dict())
+    config['api']['files'] = dict()
+    for key, content in files.items():
+        with open(directory / f'{key}.json', 'w') as json_file_handler:
+            json.dump(content, json_file_handler)
+
+        config['api']['files'][key] = files_options.get(key, dict()) | {'path': str(directory / f'{key}.json')}
+
+    with open(directory / 'config.json', 'w') as config_file_handler:
+        json.dump(config, config_file_handler)
+
+    os.environ['CONFIG_FILE'] = str(directory / 'config.json')
+    os.environ.setdefault('LOGGING_LEVEL', str(logging.WARNING))
+    os.chdir(directory)  # service logs are written to the working directory
+
+    # the service modules are imported from the server directory
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    return directory
+
+
+def large_document(size: int) -> Dict[str, Any]:
+    """
+    Creates a JSON document with approximately the given size when serialized
+    :param size: size in bytes
+    :return: JSON document with a small node ("small") and a large list ("large")
+    """
+
+    item = {'id': 0, 'name': 'item', 'enabled': True, 'values': [1.5, 2.5, 3.5]}
+    items = max(1, size // len(json.dumps(item)))
+    return {
+        'small': {'value': 0},
+        'large': [item | {'id': i} for i in range(items)]
+    }
+
+
+async def asgi_request(app,
+                       method: str,
+                       path: str,
+                       body: bytes = b'',
+                       headers: Dict[str, str] = None) -> Dict[str, Any]:
+    """
+    Sends a request directly to the ASGI application, without a server or an HTTP client, and discards the response
+    body as it is received (so the measures don't include the memory used to keep it)
+    :param app: ASGI application
+    :param method: HTTP method
+    :param path: request path (with the query string, if any)
+    :param body: request body
+    :param headers: request headers
+    :return: dict with the response status, headers, body size, time to the first body byte and total time (seconds)
+    """
+
+    path, _, query_string = path.partition('?')
+    request_messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    response = {'status': None, 'headers': dict(), 'body_size': 0, 'first_byte_s': None, 'total_s': None}
+
+    async def receive():
+        if request_messages:
+            return request_messages.pop(0)
+
+        # the client never disconnects (streaming responses stop when a disconnect message is received)
+        await asyncio.Future()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+            response['headers'] = {key.decode(): value.decode() for key, value in message.get('headers', [])}
+
+        elif message['type'] == 'http.response.body':
+            if response['first_byte_s'] is None and message.get('body'):
+                response['first_byte_s'] = time.perf_counter() - start
+
+            response['body_size'] += len(message.get('body', b''))
+
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query_string.encode(),
+        'root_path': '',
+        'headers': [(key.lower().encode(), value.encode()) for key, value in (headers or dict()).items()],
+        'client': ('127.0.0.1', 0),
+        'server': ('benchmark', 80)
+    }
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    response['total_s'] = time.perf_counter() - start
+    return response
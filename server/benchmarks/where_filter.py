@@ -0,0 +1,76 @@
+"""
+Measures the latency of GET requests of the items of a large list with a given id ("?where=id==<id>"), scanning the
+list versus using a secondary index of the "id" field, and the latency of changing an item followed by that lookup
+(the index is updated with the changed item, not built again).
+
+Usage (from the server directory):
+    python -m benchmarks.where_filter [--size-mb 5] [--requests 200]
+"""
+
+# python libs
+import json
+import random
+import asyncio
+import argparse
+
+# project files
+from benchmarks.utils import asgi_request, large_document, latency_summary, setup_server
+
+# constants
+SEED = 42
+
+
+async def lookups(app, file_key: str, items: int, requests: int, write: bool) -> dict:
+    lookup_latencies = list()
+    write_latencies = list()
+    ids = random.Random(SEED)
+    for _ in range(requests):
+        item_id = ids.randrange(items)
+        if write:
+            response = await asgi_request(app, 'PUT', f'/{file_key}/large/{item_id}/name', body=b'"changed"')
+            assert response['status'] == 200
+            write_latencies.append(response['total_s'])
+
+        response = await asgi_request(app, 'GET', f'/{file_key}/large?where=id=={item_id}')
+        assert response['status'] == 200
+        lookup_latencies.append(response['total_s'])
+
+    result = {'lookup': latency_summary(lookup_latencies)}
+    if write:
+        result['write'] = latency_summary(write_latencies)
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, default=5, help='size of the list in MB')
+    parser.add_argument('--requests', type=int, default=200, help='number of lookups of each measure')
+    args = parser.parse_args()
+
+    document = large_document(int(args.size_mb * 1048576))
+    config = {
+        'mqtt': {'enabled': False},
+        'api': {'files': {'indexed': {'indexes': {'/large': ['id']}}}}
+    }
+    setup_server({'scan': document, 'indexed': document}, config)
+
+    import main as service
+
+    app = service.app()
+    items = len(document['large'])
+    results = {
+        'scan': asyncio.run(lookups(app, 'scan', items, args.requests, False)),
+        'index': asyncio.run(lookups(app, 'indexed', items, args.requests, False)),
+        'scan_after_write': asyncio.run(lookups(app, 'scan', items, args.requests, True)),
+        'index_after_write': asyncio.run(lookups(app, 'indexed', items, args.requests, True)),
+        'index_builds': service.secondary_indexes.builds,
+        'index_updates': service.secondary_indexes.updates
+    }
+    service.shutdown()
+
+    print(json.dumps({'benchmark': 'where_filter', 'list_size_mb': args.size_mb, 'items': items} | results, indent=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Measures the throughput and latency of GET requests served by "uvicorn main:app --workers N" for each number of
+workers. The service runs in a real server process (workers coordinate through file locks, see "workers_coordination")
+and the requests are sent by separate client processes, so the clients don't compete with the workers for one
+interpreter. Throughput only scales while there are free CPU cores for the workers and the clients.
+
+Usage (from the server directory):
+    python -m benchmarks.workers [--workers 1 2 4] [--size-kb 64] [--clients 4] [--connections 16] [--seconds 5]
+"""
+
+# python libs
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import asyncio
+import argparse
+import subprocess
+import multiprocessing
+
+from typing import Any, Dict, List
+from pathlib import Path
+
+# project files
+from benchmarks.utils import large_document, latency_summary, setup_server
+
+# constants
+SERVER_START_TIMEOUT = 30
+
+
+def free_port() -> int:
+    with socket.socket() as port_socket:
+        port_socket.bind(('127.0.0.1', 0))
+        return port_socket.getsockname()[1]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    """
+    Starts the service with uvicorn and waits until it answers requests
+    :param workers: number of worker processes
+    :param port: port to listen on
+    :return: server process
+    """
+
+    import httpx
+
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'main:app', '--factory',
+                               '--app-dir', str(Path(__file__).resolve().parent.parent),
+                               '--port', str(port),
+                               '--workers', str(workers),
+                               '--log-level', 'warning',
+                               '--no-access-log'])
+
+    deadline = time.perf_counter() + SERVER_START_TIMEOUT
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(f'http://127.0.0.1:{port}/bench/small/value').status_code == 200:
+                # the other workers may still be starting
+                time.sleep(workers * 0.5)
+                return server
+
+        except httpx.TransportError:
+            time.sleep(0.1)
+
+    server.terminate()
+    raise RuntimeError(f'Server with {workers} worker(s) did not start')
+
+
+def client_process(port: int, connections: int, seconds: float) -> List[float]:
+    # sends GET requests with the given number of concurrent connections, returns the latencies
+    import httpx
+
+    async def connection(client: httpx.AsyncClient, deadline: float, latencies: List[float]) -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.get('/bench/small/value')
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200
+
+    async def run() -> List[float]:
+        latencies = list()
+        limits = httpx.Limits(max_connections=connections)
+        async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', limits=limits) as client:
+            deadline = time.perf_counter() + seconds
+            await asyncio.gather(*(connection(client, deadline, latencies) for _ in range(connections)))
+
+        return latencies
+
+    return asyncio.run(run())
+
+
+def measure(workers: int, clients: int, connections: int, seconds: float) -> Dict[str, Any]:
+    port = free_port()
+    server = start_server(workers, port)
+    try:
+        start = time.perf_counter()
+        with multiprocessing.Pool(clients) as pool:
+            client_latencies = pool.starmap(client_process, [(port, connections, seconds)] * clients)
+
+        elapsed = time.perf_counter() - start
+
+    finally:
+        server.send_signal(signal.SIGINT)
+        server.wait()
+
+    latencies = [latency for latencies in client_latencies for latency in latencies]
+    return {'workers': workers} | latency_summary(latencies) | {
+        'requests_per_second': round(len(latencies) / elapsed, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='numbers of workers')
+    parser.add_argument('--size-kb', type=float, default=64, help='size of the JSON file in KB')
+    parser.add_argument('--clients', type=int, default=4, help='number of client processes')
+    parser.add_argument('--connections', type=int, default=16, help='concurrent connections of each client')
+    parser.add_argument('--seconds', type=float, default=5, help='duration of each measure')
+    args = parser.parse_args()
+
+    setup_server({'bench': large_document(int(args.size_kb * 1024))})
+
+    results = [measure(workers, args.clients, args.connections, args.seconds) for workers in args.workers]
+    print(json.dumps({'benchmark': 'workers', 'cpu_count': os.cpu_count(), 'file_size_kb': args.size_kb,
+                      'results': results}, indent=1))
+
+
+if __name__ == '__main__':
+    main()
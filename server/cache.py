@@ -0,0 +1,200 @@
+# python libs
+import os
+import threading
+
+from contextlib import contextmanager
+from itertools import count
+from typing import Any, Callable, ContextManager, Dict, Iterator, Optional, Tuple, Union
+from pathlib import Path
+
+
+class CachedDocument:
+
+    def __init__(self,
+                 data: Any,
+                 signature: Tuple[int, ...],
+                 dirty: bool = False,
+                 generation: int = 0,
+                 version: int = 0):
+        self.data = data
+        self.signature = signature
+        self.dirty = dirty  # document has changes not written to the file yet
+        self.writing = False  # document is being written to the file
+        self.generation = generation  # changes each time the document is loaded from the file
+        self.version = version  # changes each time the document is changed by the API (in the same generation)
+
+
+class DocumentCache:
+    """
+    Keeps the content of the JSON files in memory, one document per "api.files" entry.
+    A cached document is only used while the signature (inode, size, modification and change times) of the file it
+    was loaded from is the same, so changes made to the file outside the API are always detected.
+    """
+
+    def __init__(self):
+        self._documents: Dict[str, CachedDocument] = dict()
+        self._locks: Dict[str, ContextManager] = dict()
+        self._locks_lock = threading.Lock()
+        self._generations = count(1)
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def file_signature(file_path: Union[str, Path, int]) -> Tuple[int, ...]:
+        """
+        Gets the values of the file status used to check if the file changed
+        :param file_path: Path to the file (or descriptor of the open file)
+        :return: tuple with the file inode, size, modification time and change time (nanoseconds)
+        Raise FileNotFoundError if the file does not exist
+        """
+
+        file_stat = os.stat(file_path)
+        return file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ctime_ns
+
+    def lock(self, key: str) -> ContextManager:
+        """
+        Returns the lock that must be held while the document of the given key is used
+        :param key: "api.files" entry name
+        :return: reentrant lock of the document
+        """
+
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.RLock())
+
+    def set_lock(self, key: str, lock: ContextManager) -> None:
+        """
+        Replaces the lock of the document of the given key (ex: by a lock also held by other processes)
+        :param key: "api.files" entry name
+        :param lock: reentrant lock of the document
+        """
+
+        with self._locks_lock:
+            self._locks[key] = lock
+
+    def document(self, key: str) -> Optional[CachedDocument]:
+        """
+        Returns the cached document of the given key, without checking if the file has changed
+        :param key: "api.files" entry name
+        :return: cached document or None if the document is not cached
+        """
+
+        return self._documents.get(key)
+
+    def is_current(self, key: str, file_path: Union[str, Path]) -> bool:
+        """
+        Checks if the cached document of the given key can be used without reloading the file
+        :param key: "api.files" entry name
+        :param file_path: Path to the JSON file
+        :return: True if the document is cached and the file has not changed (or the document has changes not written
+        yet, or being written)
+        """
+
+        document = self._documents.get(key)
+        return bool(document) and (document.dirty or document.writing or
+                                   document.signature == self.file_signature(file_path))
+
+    def get(self, key: str, file_path: Union[str, Path], loader: Callable[[Union[str, Path]], Any]) -> Any:
+        """
+        Returns the cached document of the given key, (re)loading it with the loader if the file has changed.
+        Documents with changes not written yet, or being written, are always returned from memory.
+        :param key: "api.files" entry name
+        :param file_path: Path to the JSON file
+        :param loader: function used to read the file content when the cached document is missing or outdated
+        :return: JSON document object
+        """
+
+        return self.get_document(key, file_path, loader).data
+
+    def get_document(self,
+                     key: str,
+                     file_path: Union[str, Path],
+                     loader: Callable[[Union[str, Path]], Any]) -> CachedDocument:
+        """
+        Same as "get", but returns the cached document (with its generation and version)
+        :param key: "api.files" entry name
+        :param file_path: Path to the JSON file
+        :param loader: function used to read the file content when the cached document is missing or outdated
+        :return: cached document
+        """
+
+        document = self._documents.get(key)
+        if document and (document.dirty or document.writing or document.signature == self.file_signature(file_path)):
+            self.hits += 1
+            return document
+
+        # documents are only (re)loaded while holding the lock, so a document being changed is never replaced by an
+        # outdated one
+        with self.lock(key):
+            # the document may have been loaded by another thread while waiting for the lock
+            document = self._documents.get(key)
+            signature = self.file_signature(file_path)
+            if document and (document.dirty or document.writing or document.signature == signature):
+                self.hits += 1
+                return document
+
+            self.misses += 1
+            data = loader(file_path)
+
+            # the file can change while it is being read, so keep the signature taken before reading it to force a
+            # new load in the next request
+            document = self._documents[key] = CachedDocument(data, signature, generation=next(self._generations))
+            return document
+
+    @contextmanager
+    def writing(self, key: str) -> Iterator[None]:
+        """
+        Context where the file of the document is being written, so the changes of the file signature are ignored and
+        the cached document is returned without waiting for the write to end (the lock of the document must be held)
+        :param key: "api.files" entry name
+        """
+
+        document = self._documents.get(key)
+        if document:
+            document.writing = True
+
+        try:
+            yield
+
+        finally:
+            if document:
+                document.writing = False
+
+    def set(self, key: str, file_path: Union[str, Path], data: Any, dirty: bool = False) -> None:
+        """
+        Updates the cached document of the given key (the lock of the document must be held)
+        :param key: "api.files" entry name
+        :param file_path: Path to the JSON file
+        :param data: JSON document object
+        :param dirty: True if the document was not written to the file yet, False if it was just written
+        """
+
+        # the document keeps its generation, and its version only changes if the data changed
+        document = self._documents.get(key)
+        generation = document.generation if document else next(self._generations)
+        version = (document.version + (data is not document.data)) if document else 0
+
+        if dirty:
+            self._documents[key] = CachedDocument(data,
+                                                  document.signature if document else tuple(),
+                                                  dirty=True,
+                                                  generation=generation,
+                                                  version=version)
+
+        else:
+            self._documents[key] = CachedDocument(data,
+                                                  self.file_signature(file_path),
+                                                  generation=generation,
+                                                  version=version)
+
+    def invalidate(self, key: str = None) -> None:
+        """
+        Removes the cached document of the given key (or all cached documents if no key is given)
+        :param key: "api.files" entry name
+        """
+
+        if key is None:
+            self._documents.clear()
+
+        else:
+            self._documents.pop(key, None)
@@ -0,0 +1,195 @@
+# python libs
+import json
+
+from typing import Any, Iterator, Optional, Union
+from pathlib import Path
+
+# optional libs
+try:
+    import orjson
+
+except ImportError:
+    orjson = None
+
+# constants
+BACKENDS = ['json', 'orjson']
+SPLIT_ITEMS = 1024  # containers with more items than this (including the items of inner containers) are split
+SPLIT_SIZE = 65536  # encoded size, in bytes, of each group of items of a split container
+
+
+class JsonCodec:
+    """
+    Encodes and decodes JSON with one of the supported backends:
+    "json" - python standard library
+    "orjson" - faster encoder and decoder (optional, requires the "orjson" package). orjson only supports compact and
+    2 spaces indentation, so other indentations are always encoded with the standard library.
+    """
+
+    def __init__(self, backend: str = 'json', indent: Optional[int] = None):
+        """
+        :param backend: "json", "orjson" or "auto" ("orjson" if installed, otherwise "json")
+        :param indent: number of spaces used to indent the encoded JSON (0 or None for compact JSON)
+        Raise ValueError if the backend is not installed
+        """
+
+        if backend == 'auto':
+            backend = 'orjson' if orjson else 'json'
+
+        if backend == 'orjson' and not orjson:
+            raise ValueError('JSON codec backend "orjson" is not installed')
+
+        self.backend = backend
+        self.indent = indent or None
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        """
+        Decodes the JSON data
+        :param data: JSON text
+        :return: JSON data object
+        Raise JSONDecodeError if the data is not valid JSON
+        """
+
+        if self.backend == 'orjson':
+            return orjson.loads(data)
+
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        """
+        Encodes the object as UTF-8 JSON
+        :param obj: JSON data object
+        :return: JSON text
+        """
+
+        if self.backend == 'orjson' and self.indent in [None, 2]:
+            try:
+                return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if self.indent else 0)
+
+            except orjson.JSONEncodeError:
+                pass  # values not supported by orjson (ex: integers bigger than 64 bits)
+
+        if self.indent is None:
+            return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+        return json.dumps(obj, ensure_ascii=False, indent=self.indent).encode('utf-8')
+
+    def iterdumps(self, obj: Any, chunk_size: int = 65536) -> Iterator[bytes]:
+        """
+        Encodes the object as UTF-8 JSON in chunks, so the encoded object is never kept in memory at once.
+        Large containers are split in groups of items small enough to be encoded at once with "dumps", so the chunks
+        can be bigger than the chunk size if an item is much bigger than the previous ones or can't be split (ex: a
+        very long string).
+        Indented JSON is not split (it is returned in one chunk).
+        :param obj: JSON data object
+        :param chunk_size: minimum size, in bytes, of the chunks (except the last one)
+        :return: iterator of JSON text chunks
+        """
+
+        if self.indent is not None:
+            yield self.dumps(obj)
+            return
+
+        chunk = list()
+        chunk_length = 0
+        for part in self._iterencode(obj):
+            chunk.append(part)
+            chunk_length += len(part)
+            if chunk_length >= chunk_size:
+                yield b''.join(chunk)
+                chunk.clear()
+                chunk_length = 0
+
+        if chunk:
+            yield b''.join(chunk)
+
+    def load(self, file_path: Union[str, Path]) -> Any:
+        """
+        Reads the JSON file
+        :param file_path: Path to the JSON file
+        :return: JSON data object
+        """
+
+        with open(file_path, 'rb') as file_handler:
+            return self.loads(file_handler.read())
+
+    def with_indent(self, indent: Optional[int]) -> 'JsonCodec':
+        """
+        Returns a codec with the same backend and the given indentation
+        :param indent: number of spaces used to indent the encoded JSON (0 or None for compact JSON)
+        :return: JSON codec
+        """
+
+        return JsonCodec(self.backend, indent)
+
+    def _iterencode(self, obj: Any) -> Iterator[bytes]:
+        if isinstance(obj, dict) and self._is_large(obj):
+            yield b'{'
+            yield from self._iterencode_items(obj)
+            yield b'}'
+
+        elif isinstance(obj, list) and self._is_large(obj):
+            yield b'['
+            yield from self._iterencode_items(obj)
+            yield b']'
+
+        else:
+            yield self.dumps(obj)
+
+    def _iterencode_items(self, container: Union[dict, list]) -> Iterator[bytes]:
+        # encodes the items of the container (without the brackets) in groups, adapting the number of items of each
+        # group so that each group is encoded in about SPLIT_SIZE bytes. Items encoded alone are split again if large.
+        items = list(container.items()) if isinstance(container, dict) else container
+        group_items = 1
+        i = 0
+        while i < len(items):
+            group = items[i:i + group_items]
+            values = [value for _, value in group] if isinstance(container, dict) else group
+
+            # items with large containers are always encoded alone
+            large_item = next((j for j, value in enumerate(values)
+                               if isinstance(value, (dict, list)) and len(value) > SPLIT_ITEMS), None)
+            if large_item is not None:
+                group = group[:max(1, large_item)]
+
+            if i:
+                yield b','
+
+            if len(group) == 1:
+                if isinstance(container, dict):
+                    key, value = group[0]
+                    yield b'%s:' % self.dumps(key)
+
+                else:
+                    value = group[0]
+
+                encoded_size = 0
+                for part in self._iterencode(value):
+                    encoded_size += len(part)
+                    yield part
+
+            else:
+                encoded = self.dumps(dict(group) if isinstance(container, dict) else group)[1:-1]
+                encoded_size = len(encoded)
+                yield encoded
+
+            i += len(group)
+            if encoded_size < SPLIT_SIZE // 2:
+                group_items = len(group) * 2
+
+            elif encoded_size > SPLIT_SIZE * 2:
+                group_items = max(1, len(group) // 2)
+
+    @staticmethod
+    def _is_large(obj: Any) -> bool:
+        items = SPLIT_ITEMS
+        containers = [obj]
+        while containers:
+            container = containers.pop()
+            items -= len(container)
+            if items < 0:
+                return True
+
+            containers.extend(value for value in (container.values() if isinstance(container, dict) else container)
+                              if isinstance(value, (dict, list)))
+
+        return False
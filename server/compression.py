@@ -0,0 +1,184 @@
+# python libs
+import zlib
+import threading
+
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+# optional libs
+try:
+    import brotli
+
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+
+except ImportError:
+    zstandard = None
+
+# constants
+ENCODINGS = ['br', 'zstd', 'gzip']
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # higher qualities compress a little better, but are too slow to compress each response
+ZSTD_LEVEL = 3
+
+
+def available_encodings() -> List[str]:
+    """
+    Returns the encodings whose packages are installed
+    :return: available encodings, in order of preference
+    """
+
+    return [encoding for encoding, installed in zip(ENCODINGS, [brotli, zstandard, zlib]) if installed]
+
+
+class Compressor:
+    """
+    Compresses response bodies with the preferred encoding, of the configured ones, accepted by the client (see the
+    "Accept-Encoding" header):
+    "br" - Brotli (optional, requires the "brotli" package)
+    "zstd" - Zstandard (optional, requires the "zstandard" package)
+    "gzip" - python standard library
+    Encodings whose package is not installed are ignored.
+    """
+
+    def __init__(self, encodings: List[str], min_size: int = 1024):
+        """
+        :param encodings: encodings to use, in order of preference
+        :param min_size: size, in bytes, of the smallest body to compress
+        """
+
+        self.encodings = [encoding for encoding in encodings if encoding in available_encodings()]
+        self.min_size = min_size
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """
+        Returns the encoding of the response to a request
+        :param accept_encoding: "Accept-Encoding" header of the request
+        :return: the encoding with the highest quality in the header ("*" matches the encodings not in the header), or
+        the preferred one if several have the same quality, or None if the response must not be compressed
+        """
+
+        if not accept_encoding or not self.encodings:
+            return None
+
+        qualities = dict()
+        for coding in accept_encoding.split(','):
+            name, *parameters = coding.split(';')
+            quality = 1.0
+            for parameter in parameters:
+                key, _, value = parameter.strip().partition('=')
+                if key.lower() == 'q':
+                    try:
+                        quality = float(value)
+
+                    except ValueError:
+                        quality = 0.0
+
+            qualities[name.strip().lower()] = quality
+
+        encoding, encoding_quality = None, 0.0
+        for candidate in self.encodings:
+            if (quality := qualities.get(candidate, qualities.get('*', 0.0))) > encoding_quality:
+                encoding, encoding_quality = candidate, quality
+
+        return encoding
+
+    @staticmethod
+    def compress(body: bytes, encoding: str) -> bytes:
+        """
+        Compresses the body
+        :param body: body to compress
+        :param encoding: "br", "zstd" or "gzip"
+        :return: compressed body
+        """
+
+        return b''.join(Compressor.compress_chunks([body], encoding))
+
+    @staticmethod
+    def compress_chunks(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+        """
+        Compresses the body in chunks, as they are iterated, so the body is never kept in memory at once
+        :param chunks: chunks of the body to compress
+        :param encoding: "br", "zstd" or "gzip"
+        :return: chunks of the compressed body (empty chunks are skipped)
+        """
+
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            compress, flush = compressor.process, compressor.finish
+
+        elif encoding == 'zstd':
+            compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+            compress, flush = compressor.compress, compressor.flush
+
+        else:
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: deflate with gzip header and trailer
+            compress, flush = compressor.compress, compressor.flush
+
+        for chunk in chunks:
+            if compressed_chunk := compress(chunk):
+                yield compressed_chunk
+
+        yield flush()
+
+
+class CompressedBodies:
+    """
+    Least recently used compressed bodies, so the bodies of the nodes read most often are not encoded and compressed
+    in every request. Bodies are identified by the version of their node (ETag), so changed nodes are never returned,
+    and are kept with the headers of their response (ex: the pagination headers of the items of a list).
+    """
+
+    def __init__(self, max_size: int):
+        """
+        :param max_size: maximum size, in bytes, of all the kept bodies (0 disables the cache)
+        """
+
+        self.max_size = max_size
+        self.size = 0
+
+        self._bodies: OrderedDict[Hashable, Tuple[bytes, Dict[str, str]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        # counters
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        """
+        Returns the kept compressed body
+        :param key: key of the body
+        :return: compressed body and headers of its response, or None if the body is not kept
+        """
+
+        with self._lock:
+            if (cached_body := self._bodies.get(key)) is None:
+                self.misses += 1
+                return None
+
+            self._bodies.move_to_end(key)
+            self.hits += 1
+            return cached_body
+
+    def set(self, key: Hashable, body: bytes, headers: Dict[str, str]) -> None:
+        """
+        Keeps the compressed body, removing the least recently used bodies if the cache is full
+        :param key: key of the body
+        :param body: compressed body
+        :param headers: headers of the response of the body
+        """
+
+        if len(body) > self.max_size:
+            return
+
+        with self._lock:
+            if (previous_body := self._bodies.pop(key, None)) is not None:
+                self.size -= len(previous_body[0])
+
+            self._bodies[key] = (body, headers)
+            self.size += len(body)
+            while self.size > self.max_size:
+                self.size -= len(self._bodies.popitem(last=False)[1][0])
@@ -49,6 +49,39 @@ CONFIG_JSON_SCHEMA = {
                         'password'
                     ]
                 },
+                'subscribe': {
+                    'additionalProperties': False,
+                    'type': 'object',
+                    'properties': {
+                        'enabled': {
+                            'type': 'boolean'
+                        },
+                        'topic_prefix': {
+                            'type': 'string',
+                            'minLength': 1
+                        },
+                        'qos': {
+                            'type': 'integer',
+                            'enum': [
+                                0,
+                                1,
+                                2
+                            ]
+                        },
+                        'queue_size': {
+                            'type': 'integer',
+                            'minimum': 1
+                        },
+                        'batch_size': {
+                            'type': 'integer',
+                            'minimum': 1
+                        },
+                        'batch_interval': {
+                            'type': 'number',
+                            'minimum': 0
+                        }
+                    }
+                },
                 'publish': {
                     'additionalProperties': False,
                     'type': 'object',
@@ -62,6 +95,37 @@ CONFIG_JSON_SCHEMA = {
                         },
                         'request_file_in_message_content': {
                             'type': 'boolean'
+                        },
+                        'queue_size': {
+                            'type': 'integer',
+                            'minimum': 1
+                        },
+                        'qos': {
+                            'type': 'integer',
+                            'enum': [
+                                0,
+                                1,
+                                2
+                            ]
+                        },
+                        'max_in_flight': {
+                            'type': 'integer',
+                            'minimum': 1
+                        },
+                        'mode': {
+                            'type': 'string',
+                            'enum': [
+                                'full',
+                                'delta'
+                            ]
+                        },
+                        'delta_topic_suffix': {
+                            'type': 'string',
+                            'minLength': 1
+                        },
+                        'full_state_interval': {
+                            'type': 'number',
+                            'minimum': 0
                         }
                     }
                 }
@@ -91,6 +155,34 @@ CONFIG_JSON_SCHEMA = {
                                 'default': {
                                     'type': 'boolean',
                                     'default': False
+                                },
+                                'index_depth': {
+                                    'type': 'integer',
+                                    'minimum': 0
+                                },
+                                'indexes': {
+                                    'type': 'object',
+                                    'propertyNames': {
+                                        'pattern': '^(/.*)?$'
+                                    },
+                                    'additionalProperties': {
+                                        'type': 'array',
+                                        'items': {
+                                            'type': 'string',
+                                            'pattern': '[^/]'
+                                        }
+                                    }
+                                },
+                                'indent': {
+                                    'type': 'integer',
+                                    'minimum': 0
+                                },
+                                'validation': {
+                                    'type': 'string',
+                                    'enum': [
+                                        'full',
+                                        'incremental'
+                                    ]
                                 }
                             },
                             'required': [
@@ -98,6 +190,98 @@ CONFIG_JSON_SCHEMA = {
                             ]
                         }
                     }
+                },
+                'codec': {
+                    'type': 'string',
+                    'enum': [
+                        'json',
+                        'orjson',
+                        'auto'
+                    ]
+                },
+                'stream_threshold': {
+                    'type': 'integer',
+                    'minimum': 0
+                },
+                'thread_pool_size': {
+                    'type': 'integer',
+                    'minimum': 1
+                },
+                'metrics_path': {
+                    'type': 'string',
+                    'pattern': '^(/.*)?$'
+                },
+                'workers_coordination': {
+                    'type': 'string',
+                    'enum': [
+                        'auto',
+                        'enabled',
+                        'disabled'
+                    ]
+                },
+                'watch': {
+                    'type': 'string',
+                    'enum': [
+                        'auto',
+                        'inotify',
+                        'polling',
+                        'disabled'
+                    ]
+                },
+                'watch_poll_interval': {
+                    'type': 'number',
+                    'exclusiveMinimum': 0
+                },
+                'persistence': {
+                    'additionalProperties': False,
+                    'type': 'object',
+                    'properties': {
+                        'mode': {
+                            'type': 'string',
+                            'enum': [
+                                'write_through',
+                                'write_behind',
+                                'journal'
+                            ]
+                        },
+                        'flush_interval': {
+                            'type': 'number',
+                            'exclusiveMinimum': 0
+                        },
+                        'flush_dirty_threshold': {
+                            'type': 'integer',
+                            'minimum': 1
+                        },
+                        'journal_fsync': {
+                            'type': 'boolean'
+                        }
+                    }
+                },
+                'compression': {
+                    'additionalProperties': False,
+                    'type': 'object',
+                    'properties': {
+                        'encodings': {
+                            'type': 'array',
+                            'items': {
+                                'type': 'string',
+                                'enum': [
+                                    'br',
+                                    'zstd',
+                                    'gzip'
+                                ]
+                            },
+                            'uniqueItems': True
+                        },
+                        'min_size': {
+                            'type': 'integer',
+                            'minimum': 0
+                        },
+                        'cache_size': {
+                            'type': 'integer',
+                            'minimum': 0
+                        }
+                    }
                 }
             },
             'required': [
@@ -119,13 +303,54 @@ MQTT_DEFAULT_CONFIG_VALUES = {
     'publish': {
       'topic_prefix': '',
       'json_path_topic_depth': 0,
-      'request_file_in_message_content': False
+      'request_file_in_message_content': False,
+      'queue_size': 10000,
+      'qos': 0,
+      'max_in_flight': 20,
+      'mode': 'full',
+      'delta_topic_suffix': '/$delta',
+      'full_state_interval': 5
+    },
+    'subscribe': {
+      'enabled': False,
+      'topic_prefix': '<auto>',
+      'qos': 0,
+      'queue_size': 10000,
+      'batch_size': 1000,
+      'batch_interval': 0
     }
 }
 
+API_DEFAULT_CONFIG_VALUES = {
+    'codec': 'json',
+    'stream_threshold': 1048576,
+    'thread_pool_size': 8,
+    'metrics_path': '/-/metrics',
+    'workers_coordination': 'auto',
+    'watch': 'auto',
+    'watch_poll_interval': 1
+}
+
 API_FILES_DEFAULT_CONFIG_VALUES = {
     'schema': '',
-    'default': False
+    'default': False,
+    'indent': 1,
+    'index_depth': 0,
+    'indexes': {},
+    'validation': 'full'
+}
+
+API_PERSISTENCE_DEFAULT_CONFIG_VALUES = {
+    'mode': 'write_through',
+    'flush_interval': 1,
+    'flush_dirty_threshold': 100,
+    'journal_fsync': True
+}
+
+API_COMPRESSION_DEFAULT_CONFIG_VALUES = {
+    'encodings': ['br', 'zstd', 'gzip'],
+    'min_size': 1024,
+    'cache_size': 16777216
 }
 
 
@@ -165,7 +390,15 @@ class Config(dict, metaclass=Singleton):
         # add default options to missing configurations
         configuration['mqtt'] = MQTT_DEFAULT_CONFIG_VALUES | configuration['mqtt']
         configuration['mqtt']['publish'] = \
-            MQTT_DEFAULT_CONFIG_VALUES['publish'] | configuration['mqtt']['publish']
+            MQTT_DEFAULT_CONFIG_VALUES['publish'] | configuration['mqtt'].get('publish', {})
+        configuration['mqtt']['subscribe'] = \
+            MQTT_DEFAULT_CONFIG_VALUES['subscribe'] | configuration['mqtt'].get('subscribe', {})
+
+        configuration['api'] = API_DEFAULT_CONFIG_VALUES | configuration['api']
+        configuration['api']['persistence'] = \
+            API_PERSISTENCE_DEFAULT_CONFIG_VALUES | configuration['api'].get('persistence', {})
+        configuration['api']['compression'] = \
+            API_COMPRESSION_DEFAULT_CONFIG_VALUES | configuration['api'].get('compression', {})
 
         for file in configuration['api']['files']:
             configuration['api']['files'][file] = \
@@ -0,0 +1,154 @@
+# python libs
+import os
+import fcntl
+import logging
+import threading
+import multiprocessing
+
+from typing import Callable, Optional, Union
+from pathlib import Path
+
+# constants
+logger = logging.getLogger('uvicorn')
+
+LEADER_ELECTION_INTERVAL = 1
+
+
+def is_worker_process() -> bool:
+    """
+    Checks if the service runs in a worker process started by another process (ex: "uvicorn --workers N"), so other
+    workers may use the same JSON files
+    :return: True if the process was started with multiprocessing
+    """
+
+    return multiprocessing.parent_process() is not None
+
+
+def lock_file_path(file_path: Union[str, Path]) -> Path:
+    """
+    Returns the Path to the lock file of a file (next to the file, hidden)
+    :param file_path: Path to the locked file
+    :return: Path to the lock file
+    """
+
+    file_path = Path(file_path)
+    return file_path.with_name(f'.{file_path.name}.lock')
+
+
+class ProcessLock:
+    """
+    Reentrant lock shared by the threads of the process and by the other processes that lock the same file (the lock
+    file is locked with flock while the lock is held by a thread of the process). Locks are released by the OS if the
+    process dies.
+    """
+
+    def __init__(self, file_path: Union[str, Path]):
+        """
+        :param file_path: Path to the lock file (created if it doesn't exist)
+        """
+
+        self.file_path = Path(file_path)
+
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file_descriptor: Optional[int] = None
+
+    def acquire(self) -> bool:
+        self._thread_lock.acquire()
+        try:
+            if not self._depth:
+                self._file_descriptor = os.open(self.file_path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._file_descriptor, fcntl.LOCK_EX)
+
+        except OSError:
+            if self._file_descriptor is not None:
+                os.close(self._file_descriptor)
+                self._file_descriptor = None
+
+            self._thread_lock.release()
+            raise
+
+        self._depth += 1
+        return True
+
+    def release(self) -> None:
+        self._depth -= 1
+        if not self._depth:
+            # closing the descriptor releases the lock
+            os.close(self._file_descriptor)
+            self._file_descriptor = None
+
+        self._thread_lock.release()
+
+    def __enter__(self) -> 'ProcessLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.release()
+
+
+class LeaderElection:
+    """
+    Elects one of the processes that use the same lock file as the leader, that runs the tasks that must run only once
+    (ex: apply the changes received from the broker). The leader keeps the lock file locked until it stops, and the
+    other processes try to lock it periodically, so a new leader is elected if the leader dies.
+    """
+
+    def __init__(self, file_path: Union[str, Path], on_elected: Callable[[], None]):
+        """
+        :param file_path: Path to the lock file (created if it doesn't exist)
+        :param on_elected: function called when the process is elected (from a background thread, after the first
+        election attempt)
+        """
+
+        self.file_path = Path(file_path)
+        self.is_leader = False
+
+        self._on_elected = on_elected
+        self._file_descriptor: Optional[int] = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='leader-election', daemon=True)
+
+    def start(self) -> None:
+        """
+        Tries to be elected right away, and keeps trying in background if another process is the leader
+        """
+
+        if not self._elect():
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+        if self._file_descriptor is not None:
+            os.close(self._file_descriptor)
+            self._file_descriptor = None
+            self.is_leader = False
+
+    def _elect(self) -> bool:
+        # returns True when the process is the leader
+        file_descriptor = os.open(self.file_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(file_descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+        except BlockingIOError:
+            os.close(file_descriptor)
+            return False
+
+        self._file_descriptor = file_descriptor
+        self.is_leader = True
+        logger.info(f'Process {os.getpid()} elected as the leader of the workers.')
+        self._on_elected()
+        return True
+
+    def _run(self) -> None:
+        while not self._stopped.wait(LEADER_ELECTION_INTERVAL):
+            try:
+                if self._elect():
+                    return
+
+            except Exception as election_error:
+                logger.error('Error occurred while electing the leader of the workers:', exc_info=election_error)
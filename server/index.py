@@ -0,0 +1,319 @@
+# python libs
+import os
+import re
+import json
+import marshal
+import logging
+import threading
+
+from json.decoder import scanstring
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from pathlib import Path
+
+# project files
+from cache import DocumentCache
+
+# constants
+logger = logging.getLogger('uvicorn')
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+DECODER = json.JSONDecoder()
+
+INDEX_FILE_VERSION = 1
+
+IndexEntry = Tuple[int, int, str, int]  # (start byte, end byte, kind ("object", "array" or "value"), items)
+
+
+class PathIndex:
+    """
+    Byte ranges, in a JSON file, of the nodes down to a given depth of the path, so a node can be read by parsing only
+    its part of the file. Containers above the depth have all their children indexed, so missing nodes are also
+    detected without reading the file.
+    """
+
+    def __init__(self, signature: Tuple[int, ...], depth: int, entries: Dict[Tuple[str, ...], IndexEntry]):
+        """
+        :param signature: signature of the JSON file the index was built from (see DocumentCache.file_signature)
+        :param depth: maximum number of path parts of the indexed nodes
+        :param entries: index entry of each node, by its path parts
+        """
+
+        self.signature = signature
+        self.depth = depth
+        self._entries = entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    @classmethod
+    def build(cls, data: bytes, signature: Tuple[int, ...], depth: int) -> 'PathIndex':
+        """
+        Builds the index of the JSON file content
+        :param data: JSON file content
+        :param signature: signature of the JSON file
+        :param depth: maximum number of path parts of the indexed nodes
+        :return: path index
+        Raise JSONDecodeError if the content is not valid JSON
+        """
+
+        # latin-1 maps each byte to one character, so character positions are the byte positions in the file (the
+        # content of the strings is not used, except the keys that are decoded again from their bytes)
+        text = data.decode('latin-1')
+
+        entries = dict()
+        end = cls._scan(text, 0, tuple(), depth, entries)
+        if WHITESPACE.match(text, end).end() != len(text):
+            raise json.JSONDecodeError('Extra data', text, end)
+
+        return cls(signature, depth, entries)
+
+    def lookup(self, path: List[str]) -> Tuple[IndexEntry, List[str]]:
+        """
+        Finds the deepest indexed node in the path
+        :param path: path parts, in the JSON, to the node (ex: ['node1', 'node2', 'node3'])
+        :return: index entry of the deepest indexed node and the path parts after it
+        Raise KeyError if a node of the path doesn't exist, IndexError if a list index is out of range
+        """
+
+        indexed_path = tuple()
+        entry = self._entries[indexed_path]
+        for i, part in enumerate(path):
+            _, _, kind, items = entry
+
+            child_entry = self._entries.get(indexed_path + (part,))
+            if child_entry is None and kind == 'array' and i < self.depth:
+                # list indexes may have other representations (ex: "-1" or "01")
+                try:
+                    index = int(part)
+
+                except ValueError:
+                    raise KeyError(part)
+
+                if not -items <= index < items:
+                    raise IndexError('list index out of range')
+
+                part = str(index % items)
+                child_entry = self._entries.get(indexed_path + (part,))
+
+            if child_entry is None:
+                if kind == 'object' and i < self.depth:
+                    raise KeyError(part)
+
+                return entry, path[i:]
+
+            indexed_path += (part,)
+            entry = child_entry
+
+        return entry, list()
+
+    def dumps(self) -> bytes:
+        """
+        Serializes the index to be saved in a file (the format depends on the python version)
+        :return: serialized index
+        """
+
+        return marshal.dumps((INDEX_FILE_VERSION, self.signature, self.depth, self._entries))
+
+    @classmethod
+    def loads(cls, data: bytes) -> 'PathIndex':
+        """
+        Deserializes an index saved in a file
+        :param data: serialized index
+        :return: path index
+        Raise ValueError if the data is not a serialized index
+        """
+
+        try:
+            version, signature, depth, entries = marshal.loads(data)
+
+        except (EOFError, TypeError, ValueError):
+            raise ValueError('invalid path index data')
+
+        if version != INDEX_FILE_VERSION:
+            raise ValueError(f'unsupported path index version {version}')
+
+        return cls(signature, depth, entries)
+
+    @classmethod
+    def _scan(cls,
+              text: str,
+              position: int,
+              path: Tuple[str, ...],
+              depth: int,
+              entries: Dict[Tuple[str, ...], IndexEntry]) -> int:
+        # indexes the value that starts in the position and returns the position after it. Values below the depth
+        # are skipped with the decoder.
+        start = position = WHITESPACE.match(text, position).end()
+        kind = {'{': 'object', '[': 'array'}.get(text[position:position + 1], 'value')
+        items = 0
+
+        if kind == 'value' or len(path) >= depth:
+            _, position = DECODER.raw_decode(text, position)
+
+        else:
+            closing = '}' if kind == 'object' else ']'
+            position = WHITESPACE.match(text, position + 1).end()
+            empty = text.startswith(closing, position)
+            if empty:
+                position += 1
+
+            while not empty:
+                if kind == 'object':
+                    if not text.startswith('"', position):
+                        raise json.JSONDecodeError('Expecting property name enclosed in double quotes', text, position)
+
+                    key_start = position
+                    _, position = scanstring(text, position + 1)
+                    key = json.loads(text[key_start:position].encode('latin-1'))
+
+                    position = WHITESPACE.match(text, position).end()
+                    if not text.startswith(':', position):
+                        raise json.JSONDecodeError('Expecting \':\' delimiter', text, position)
+
+                    position += 1
+
+                else:
+                    key = str(items)
+
+                position = WHITESPACE.match(text, cls._scan(text, position, path + (key,), depth, entries)).end()
+                items += 1
+
+                if text.startswith(closing, position):
+                    position += 1
+                    break
+
+                if not text.startswith(',', position):
+                    raise json.JSONDecodeError('Expecting \',\' delimiter', text, position)
+
+                position = WHITESPACE.match(text, position + 1).end()
+
+        entries[path] = (start, position, kind, items)
+        return position
+
+
+class PathIndexes:
+    """
+    Keeps one path index per "api.files" entry, saved next to the JSON file ("<file>.index") so it is not built again
+    when the service restarts. An index is only used while the signature of the JSON file is the same, so it is built
+    again after any change of the file (made by the API or outside it).
+    """
+
+    def __init__(self):
+        self._indexes: Dict[str, PathIndex] = dict()
+        self._locks: Dict[str, threading.Lock] = dict()
+        self._locks_lock = threading.Lock()
+
+        # counters
+        self.builds = 0
+        self.reads = 0
+
+    def get(self, key: str, json_file_path: Union[str, Path], depth: int) -> PathIndex:
+        """
+        Returns the index of the given key, loading or (re)building it if the JSON file has changed
+        :param key: "api.files" entry name
+        :param json_file_path: Path to the JSON file
+        :param depth: maximum number of path parts of the indexed nodes
+        :return: path index
+        Raise JSONDecodeError if the JSON file has invalid JSON
+        """
+
+        signature = DocumentCache.file_signature(json_file_path)
+        if (index := self._indexes.get(key)) and index.signature == signature and index.depth == depth:
+            return index
+
+        with self._locks_lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        # the index is built only once, even if requested by several threads at the same time
+        with lock:
+            signature = DocumentCache.file_signature(json_file_path)
+            if (index := self._indexes.get(key)) and index.signature == signature and index.depth == depth:
+                return index
+
+            index_file_path = self.index_file_path(json_file_path)
+            try:
+                with open(index_file_path, 'rb') as index_file_handler:
+                    index = PathIndex.loads(index_file_handler.read())
+
+            except (OSError, ValueError):
+                index = None
+
+            if not index or index.signature != signature or index.depth != depth:
+                logger.info(f'Building the path index of JSON file \"{json_file_path}\"...')
+                with open(json_file_path, 'rb') as json_file_handler:
+                    signature = DocumentCache.file_signature(json_file_handler.fileno())
+                    index = PathIndex.build(json_file_handler.read(), signature, depth)
+
+                self.builds += 1
+                self._save(index, index_file_path)
+
+            self._indexes[key] = index
+            return index
+
+    def read(self,
+             key: str,
+             json_file_path: Union[str, Path],
+             depth: int,
+             path: List[str],
+             loader: Callable[[bytes], Any]) -> Optional[Tuple[Any, List[str]]]:
+        """
+        Reads, from the JSON file, only the deepest indexed node in the path
+        :param key: "api.files" entry name
+        :param json_file_path: Path to the JSON file
+        :param depth: maximum number of path parts of the indexed nodes
+        :param path: path parts, in the JSON, to the node (ex: ['node1', 'node2', 'node3'])
+        :param loader: function used to parse the content of the node
+        :return: JSON data object of the deepest indexed node and the path parts after it, or None if the node is the
+        whole file or if the file changed while it was being read
+        Raise KeyError if a node of the path doesn't exist, IndexError if a list index is out of range
+        """
+
+        index = self.get(key, json_file_path, depth)
+        (start, end, _, _), remaining_path = index.lookup(path)
+        if len(remaining_path) == len(path):
+            return None
+
+        with open(json_file_path, 'rb') as json_file_handler:
+            if DocumentCache.file_signature(json_file_handler.fileno()) != index.signature:
+                return None
+
+            json_file_handler.seek(start)
+            node_data = json_file_handler.read(end - start)
+
+            # the file may have been changed in place while it was being read
+            if DocumentCache.file_signature(json_file_handler.fileno()) != index.signature:
+                return None
+
+        self.reads += 1
+        return loader(node_data), remaining_path
+
+    def invalidate(self, key: str = None) -> None:
+        """
+        Removes the index of the given key (or all the indexes if no key is given) from memory
+        :param key: "api.files" entry name
+        """
+
+        if key is None:
+            self._indexes.clear()
+
+        else:
+            self._indexes.pop(key, None)
+
+    @staticmethod
+    def index_file_path(json_file_path: Union[str, Path]) -> Path:
+        json_file_path = Path(json_file_path)
+        return json_file_path.with_name(f'{json_file_path.name}.index')
+
+    @staticmethod
+    def _save(index: PathIndex, index_file_path: Path) -> None:
+        # other processes may be saving the same index
+        temporary_index_file_path = index_file_path.with_name(f'.{index_file_path.name}.{os.getpid()}.tmp')
+        try:
+            with open(temporary_index_file_path, 'wb') as index_file_handler:
+                index_file_handler.write(index.dumps())
+
+            os.replace(temporary_index_file_path, index_file_path)
+
+        except OSError as os_error:
+            # the index is still used, but it is built again when the service restarts
+            logger.warning(f'Unable to save the path index \"{index_file_path}\": {os_error}')
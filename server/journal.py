@@ -0,0 +1,210 @@
+# python libs
+import os
+import json
+import hashlib
+import logging
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from pathlib import Path
+
+# constants
+logger = logging.getLogger('uvicorn')
+
+JournalOperation = Tuple[str, List[str], Any]  # (operation, path parts, value)
+
+
+class JournalError(Exception):
+    pass
+
+
+class Journal:
+    """
+    Append-only journal of the operations made to a JSON file.
+    Operations are appended to numbered segment files next to the JSON file ("<file>.journal.<segment>") and a
+    checkpoint file ("<file>.journal.checkpoint") keeps the first segment not written to the JSON file yet and the
+    hash of the JSON file content at that time.
+
+    Compaction of the journal:
+    1. the current segment is closed and new operations are appended to the next one (rotate);
+    2. the document is written to a temporary file, and the last closed segment and the hash of the document are kept
+    in the checkpoint as the compaction in progress (begin_compaction);
+    3. the temporary file replaces the JSON file (by the caller);
+    4. the checkpoint is updated and the closed segments removed (compact).
+    If the service stops between 3 and 4 the JSON file hash matches the compaction in progress, so the closed segments
+    are known to be already written to the file and are not replayed again. If the JSON file hash matches neither the
+    checkpoint nor the compaction in progress, the file was changed outside the service and the operations of the
+    journal cannot be replayed on it.
+    """
+
+    def __init__(self, json_file_path: Union[str, Path], fsync: bool = True):
+        """
+        :param json_file_path: Path to the JSON file
+        :param fsync: force each appended operation to be written to disk before returning
+        """
+
+        self._json_file_path = Path(json_file_path)
+        self._fsync = fsync
+
+        self._checkpoint_path = self._json_file_path.with_name(f'{self._json_file_path.name}.journal.checkpoint')
+        self._checkpoint_segment, self._json_file_hash, self._compaction = self._read_checkpoint()
+        if (segments := self._segments()) and not self._checkpoint_path.exists():
+            self._checkpoint_segment = segments[0]
+
+        # new operations are appended after the existing segments
+        self._segment = max(segments[-1] + 1 if segments else 0, self._checkpoint_segment)
+
+        self._segment_file_handler = None
+
+        # counters
+        self.appended_operations = 0
+        self.compactions = 0
+
+    def append(self, operations: List[JournalOperation]) -> None:
+        """
+        Appends the operations to the current segment of the journal
+        :param operations: list of (operation, path parts, value) made to the JSON document
+        Raise OSError if the operations cannot be written
+        """
+
+        if self._segment_file_handler is None:
+            self._segment_file_handler = open(self._segment_path(self._segment), 'a')
+
+        self._segment_file_handler.write(''.join(f'{json.dumps([operation, path, value])}\n'
+                                                 for operation, path, value in operations))
+        self._segment_file_handler.flush()
+        if self._fsync:
+            os.fsync(self._segment_file_handler.fileno())
+
+        self.appended_operations += len(operations)
+
+    def rotate(self) -> int:
+        """
+        Closes the current segment, new operations are appended to the next one
+        :return: number of the closed segment
+        """
+
+        if self._segment_file_handler is not None:
+            self._segment_file_handler.close()
+            self._segment_file_handler = None
+
+        self._segment += 1
+        return self._segment - 1
+
+    def begin_compaction(self, segment: int, json_text: bytes) -> None:
+        """
+        Keeps the compaction in progress in the checkpoint. Must be called before the JSON file is replaced with a
+        document that includes all the operations of the given segment (and the previous ones).
+        :param segment: number of the last segment written to the JSON file
+        :param json_text: content the JSON file is replaced with
+        Raise OSError if the checkpoint cannot be written
+        """
+
+        self._write_checkpoint(self._checkpoint_segment, self._json_file_hash,
+                               {'segment': segment, 'hash': hashlib.sha1(json_text).hexdigest()})
+
+    def compact(self, segment: int) -> None:
+        """
+        Removes the segments already written to the JSON file. Must be called after the JSON file is replaced with a
+        document that includes all the operations of the given segment (and the previous ones).
+        :param segment: number of the last segment written to the JSON file
+        """
+
+        if self._compaction and self._compaction['segment'] == segment:
+            json_file_hash = self._compaction['hash']
+
+        else:
+            json_file_hash = self.file_hash(self._json_file_path)
+
+        self._write_checkpoint(segment + 1, json_file_hash)
+
+        for old_segment in self._segments():
+            if old_segment <= segment:
+                self._segment_path(old_segment).unlink(missing_ok=True)
+
+        self.compactions += 1
+
+    def operations(self) -> Iterator[JournalOperation]:
+        """
+        Returns the operations of the journal not written to the JSON file yet, in the order they were appended
+        :return: iterator of (operation, path parts, value)
+        Raise JournalError if the JSON file was changed outside the service and the journal has operations not written
+        to it
+        """
+
+        first_segment = self._checkpoint_segment
+        if self._checkpoint_path.exists() and \
+                (json_file_hash := self.file_hash(self._json_file_path)) != self._json_file_hash:
+            if self._compaction and json_file_hash == self._compaction['hash']:
+                # the JSON file was replaced by the compaction in progress, so its segments are already written to it
+                first_segment = self._compaction['segment'] + 1
+
+            elif any(self._segment_path(segment).stat().st_size for segment in self._segments()
+                     if segment >= first_segment):
+                raise JournalError(f'JSON file \"{self._json_file_path}\" was changed outside the service and its '
+                                   f'journal has operations not written to it. Restore the file, or remove the '
+                                   f'\"{self._json_file_path.name}.journal.*\" files to discard the operations')
+
+        for segment in self._segments():
+            if segment < first_segment:
+                continue
+
+            with open(self._segment_path(segment), 'r') as segment_file_handler:
+                for line in segment_file_handler:
+                    try:
+                        operation, path, value = json.loads(line)
+
+                    except json.JSONDecodeError:
+                        # last operation was not completely written (ex: service stopped while appending)
+                        logger.warning(f'Ignoring incomplete operation in journal segment {segment} of JSON file '
+                                       f'\"{self._json_file_path}\"')
+                        break
+
+                    yield operation, path, value
+
+    def reset(self) -> None:
+        """
+        Removes all the segments of the journal (including segments of previous journals of the file). Must be called
+        after the JSON file is replaced with a document that includes all the operations of the journal.
+        """
+
+        self.compact(self.rotate())
+
+    @staticmethod
+    def file_hash(file_path: Union[str, Path]) -> str:
+        file_hash = hashlib.sha1()
+        with open(file_path, 'rb') as file_handler:
+            while chunk := file_handler.read(1048576):
+                file_hash.update(chunk)
+
+        return file_hash.hexdigest()
+
+    def _segment_path(self, segment: int) -> Path:
+        return self._json_file_path.with_name(f'{self._json_file_path.name}.journal.{segment}')
+
+    def _segments(self) -> List[int]:
+        prefix = f'{self._json_file_path.name}.journal.'
+        return sorted(int(path.name[len(prefix):]) for path in self._json_file_path.parent.glob(f'{prefix}*')
+                      if path.name[len(prefix):].isdigit())
+
+    def _read_checkpoint(self) -> Tuple[int, str, Optional[Dict[str, Any]]]:
+        try:
+            with open(self._checkpoint_path, 'r') as checkpoint_file_handler:
+                checkpoint = json.load(checkpoint_file_handler)
+                return checkpoint['segment'], checkpoint['hash'], checkpoint.get('compaction')
+
+        except FileNotFoundError:
+            return 0, '', None
+
+    def _write_checkpoint(self, segment: int, json_file_hash: str, compaction: Dict[str, Any] = None) -> None:
+        checkpoint = {'segment': segment, 'hash': json_file_hash}
+        if compaction:
+            checkpoint['compaction'] = compaction
+
+        temporary_checkpoint_path = self._checkpoint_path.with_name(f'{self._checkpoint_path.name}.tmp')
+        with open(temporary_checkpoint_path, 'w') as checkpoint_file_handler:
+            json.dump(checkpoint, checkpoint_file_handler)
+            checkpoint_file_handler.flush()
+            os.fsync(checkpoint_file_handler.fileno())
+
+        os.replace(temporary_checkpoint_path, self._checkpoint_path)
+        self._checkpoint_segment, self._json_file_hash, self._compaction = segment, json_file_hash, compaction
@@ -0,0 +1,184 @@
+# python libs
+from typing import Any, Dict, List
+
+# constants
+JSON_PATCH_OPERATIONS = ['add', 'remove', 'replace', 'move', 'copy', 'test']
+
+
+class JsonPatchError(ValueError):
+    """
+    The JSON Patch document is malformed (ex: unknown operation, missing member, invalid JSON pointer)
+    """
+
+
+class JsonPatchTestError(JsonPatchError):
+    """
+    A "test" operation of the JSON Patch document failed
+    """
+
+
+def parse_json_pointer(pointer: Any) -> List[str]:
+    """
+    Converts a JSON pointer (RFC 6901) to path parts
+    :param pointer: JSON pointer (ex: "/node1/node~12/0")
+    :return: path parts (ex: ['node1', 'node/2', '0'])
+    Raise JsonPatchError if the pointer is not valid
+    """
+
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith('/')):
+        raise JsonPatchError(f'Invalid JSON pointer \"{pointer}\"')
+
+    if not pointer:
+        return []
+
+    return [part.replace('~1', '/').replace('~0', '~') for part in pointer[1:].split('/')]
+
+
+def json_pointer(path: List[str]) -> str:
+    """
+    Converts path parts to a JSON pointer (RFC 6901)
+    :param path: path parts (ex: ['node1', 'node/2', '0'])
+    :return: JSON pointer (ex: "/node1/node~12/0")
+    """
+
+    return ''.join('/' + str(part).replace('~', '~0').replace('/', '~1') for part in path)
+
+
+def parse_json_patch(json_patch: Any) -> List[Dict[str, Any]]:
+    """
+    Checks the JSON Patch document (RFC 6902) and converts the JSON pointers of its operations to path parts
+    :param json_patch: JSON Patch document (list of operations)
+    :return: list of operations with "op", "path" (path parts) and "value" or "from" (path parts), as required by
+    the operation
+    Raise JsonPatchError if the document is not valid
+    """
+
+    if not isinstance(json_patch, list):
+        raise JsonPatchError('JSON Patch document must be a list of operations')
+
+    operations = list()
+    for operation in json_patch:
+        if not isinstance(operation, dict) or operation.get('op') not in JSON_PATCH_OPERATIONS or \
+                'path' not in operation:
+            raise JsonPatchError(f'Invalid JSON Patch operation {operation}')
+
+        parsed_operation = {'op': operation['op'], 'path': parse_json_pointer(operation['path'])}
+        if operation['op'] in ['add', 'replace', 'test']:
+            if 'value' not in operation:
+                raise JsonPatchError(f'Missing \"value\" in JSON Patch operation {operation}')
+
+            parsed_operation['value'] = operation['value']
+
+        elif operation['op'] in ['move', 'copy']:
+            if 'from' not in operation:
+                raise JsonPatchError(f'Missing \"from\" in JSON Patch operation {operation}')
+
+            parsed_operation['from'] = parse_json_pointer(operation['from'])
+
+            # a node can't be moved into one of its children
+            if operation['op'] == 'move' and \
+                    parsed_operation['path'][:len(parsed_operation['from'])] == parsed_operation['from'] and \
+                    parsed_operation['path'] != parsed_operation['from']:
+                raise JsonPatchError(f'Cannot move a node into one of its children {operation}')
+
+        operations.append(parsed_operation)
+
+    return operations
+
+
+def json_equal(value: Any, other_value: Any) -> bool:
+    """
+    Compares two JSON values as defined by the JSON Patch "test" operation (booleans are not equal to numbers)
+    :param value: JSON data object
+    :param other_value: JSON data object
+    :return: True if the values are equal
+    """
+
+    if isinstance(value, bool) or isinstance(other_value, bool):
+        return type(value) is type(other_value) and value == other_value
+
+    if isinstance(value, dict):
+        return isinstance(other_value, dict) and value.keys() == other_value.keys() and \
+            all(json_equal(item, other_value[key]) for key, item in value.items())
+
+    if isinstance(value, list):
+        return isinstance(other_value, list) and len(value) == len(other_value) and \
+            all(json_equal(item, other_item) for item, other_item in zip(value, other_value))
+
+    if isinstance(value, (int, float)):
+        return isinstance(other_value, (int, float)) and value == other_value
+
+    return type(value) is type(other_value) and value == other_value
+
+
+def json_identical(value: Any, other_value: Any) -> bool:
+    """
+    Compares two JSON values as they are encoded (same types and same order of the object keys), so identical values
+    have the same JSON text
+    :param value: JSON data object
+    :param other_value: JSON data object
+    :return: True if the values are identical
+    """
+
+    # nodes not changed by an operation are shared by the JSON data objects before and after it
+    if value is other_value:
+        return True
+
+    if type(value) is not type(other_value):
+        return False
+
+    if isinstance(value, dict):
+        return len(value) == len(other_value) and \
+            all(key == other_key and json_identical(item, other_item)
+                for (key, item), (other_key, other_item) in zip(value.items(), other_value.items()))
+
+    if isinstance(value, list):
+        return len(value) == len(other_value) and \
+            all(json_identical(item, other_item) for item, other_item in zip(value, other_value))
+
+    # floats are compared by their representation (ex: 0.0 and -0.0 are equal numbers with different texts)
+    if isinstance(value, float):
+        return value.hex() == other_value.hex()
+
+    return value == other_value
+
+
+def json_diff(value: Any, other_value: Any, path: List[str] = None) -> List[Dict[str, Any]]:
+    """
+    Returns the JSON Patch document (RFC 6902) that changes a JSON value to another, with operations only in the nodes
+    that changed (list items are compared by index, so items inserted or removed in the middle of a list change the
+    following items)
+    :param value: JSON data object
+    :param other_value: JSON data object the patch changes the value to
+    :param path: path parts of the values (prefix of the paths of the operations)
+    :return: list of JSON Patch operations (empty if the values are identical)
+    """
+
+    path = path or []
+    if json_identical(value, other_value):
+        return []
+
+    if isinstance(value, dict) and isinstance(other_value, dict):
+        json_patch = [{'op': 'remove', 'path': json_pointer(path + [key])} for key in value if key not in other_value]
+        for key, other_item in other_value.items():
+            if key in value:
+                json_patch += json_diff(value[key], other_item, path + [key])
+
+            else:
+                json_patch.append({'op': 'add', 'path': json_pointer(path + [key]), 'value': other_item})
+
+        return json_patch
+
+    if isinstance(value, list) and isinstance(other_value, list):
+        json_patch = list()
+        for index, (item, other_item) in enumerate(zip(value, other_value)):
+            json_patch += json_diff(item, other_item, path + [str(index)])
+
+        # items removed from the end of the list are removed from the last one, so the indexes don't change
+        json_patch += [{'op': 'remove', 'path': json_pointer(path + [str(index)])}
+                       for index in range(len(value) - 1, len(other_value) - 1, -1)]
+        json_patch += [{'op': 'add', 'path': json_pointer(path + ['-']), 'value': other_item}
+                       for other_item in other_value[len(value):]]
+        return json_patch
+
+    return [{'op': 'replace', 'path': json_pointer(path), 'value': other_value}]
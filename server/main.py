@@ -5,31 +5,57 @@ import uvicorn
 
 from starlette.applications import Starlette
 from starlette.endpoints import HTTPEndpoint
-from starlette.responses import JSONResponse, Response
+from starlette.responses import Response, StreamingResponse
 from starlette.requests import Request
 from starlette.routing import Route
-from paho.mqtt.client import Client
-from jsonschema import validate, ValidationError
+from paho.mqtt.client import Client, MQTTMessage
+from jsonschema import SchemaError, ValidationError
 
 # python libs
 import os
 import sys
 import json
+import asyncio
 import logging
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import chain
 from logging import StreamHandler
 from logging.handlers import RotatingFileHandler
-from typing import Any, Union, List
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple, Union, List
 from pathlib import Path
 from uuid import uuid4
 
 # project files
 from config import Config
+from cache import DocumentCache
+from codec import JsonCodec
+from compression import CompressedBodies, Compressor
+from coordination import LeaderElection, ProcessLock, is_worker_process, lock_file_path
+from index import PathIndexes
+from json_patch import JsonPatchError, JsonPatchTestError, json_diff, json_equal, json_identical, parse_json_patch, \
+    parse_json_pointer
+from journal import Journal, JournalError, JournalOperation
+from metrics import Gauge, Histogram, Metrics, StageTimer
+from persistence import WriteBehindFlusher
+from publisher import MqttPublisher
+from query import NodeQuery, SecondaryIndexes, WhereCondition, field_tree, filter_items, project, truncate
+from subscriber import MqttSubscriber
+from validation import SchemaValidators
+from versions import NodeVersions, etag_matches
+from watcher import FileWatcher
 
 # constants
 LOGGING_LEVEL = int(os.getenv('LOGGING_LEVEL', logging.INFO))
 CONFIG = Config(Path(os.getenv('CONFIG_FILE', 'config.json')))
 DEFAULT_JSON_FILE = next(iter(CONFIG['api']['files']))
+STREAM_CHUNK_SIZE = 65536
+MQTT_SUBSCRIBE_TOPIC_PREFIX = CONFIG['mqtt']['subscribe']['topic_prefix'] \
+    if CONFIG['mqtt']['subscribe']['topic_prefix'] != '<auto>' else \
+    '/'.join(part for part in [CONFIG['mqtt']['publish']['topic_prefix'], 'set'] if part)
+WORKERS_COORDINATION = CONFIG['api']['workers_coordination'] == 'enabled' or \
+    (CONFIG['api']['workers_coordination'] == 'auto' and is_worker_process())
 
 # logging initialization
 Path('logs').mkdir(exist_ok=True)  # create logs dir if not exist
@@ -42,7 +68,50 @@ logger = logging.getLogger('uvicorn')
 logger.setLevel(level=LOGGING_LEVEL)
 
 # others
-mqtt_client: Client = Client(CONFIG['mqtt']['client_id'] if CONFIG['mqtt']['client_id'] != '<auto>' else uuid4().hex)
+thread_pool = ThreadPoolExecutor(max_workers=CONFIG['api']['thread_pool_size'], thread_name_prefix='json-api')
+json_codec = JsonCodec()  # compact JSON, used in requests, responses and MQTT messages
+file_codecs: Dict[str, JsonCodec] = dict()  # "api.files" entry codecs, with the file indentation
+document_cache = DocumentCache()
+path_indexes = PathIndexes()
+node_versions = NodeVersions()
+secondary_indexes = SecondaryIndexes()
+schema_validators = SchemaValidators()
+compressor = Compressor(CONFIG['api']['compression']['encodings'], CONFIG['api']['compression']['min_size'])
+compressed_bodies = CompressedBodies(CONFIG['api']['compression']['cache_size'])
+write_behind_flusher: Optional[WriteBehindFlusher] = None
+mqtt_client_id = CONFIG['mqtt']['client_id'] if CONFIG['mqtt']['client_id'] != '<auto>' else uuid4().hex
+if WORKERS_COORDINATION and CONFIG['mqtt']['client_id'] != '<auto>':
+    # the broker disconnects a client when another client connects with the same id
+    mqtt_client_id = f'{mqtt_client_id}-{os.getpid()}'
+
+mqtt_client: Client = Client(mqtt_client_id)
+mqtt_publisher = MqttPublisher(mqtt_client,
+                               CONFIG['mqtt']['publish']['queue_size'],
+                               qos=CONFIG['mqtt']['publish']['qos'],
+                               max_in_flight=CONFIG['mqtt']['publish']['max_in_flight'])
+mqtt_subscriber: Optional[MqttSubscriber] = None
+leader_election: Optional[LeaderElection] = None
+file_watcher: Optional[FileWatcher] = None
+metrics = Metrics()
+request_seconds = metrics.add(Histogram('json_api_request_seconds',
+                                        'Time to handle the requests',
+                                        ('file', 'method', 'status')))
+stage_timer = StageTimer(metrics.add(Histogram('json_api_stage_seconds',
+                                               'Time spent in each stage of the requests',
+                                               ('file', 'method', 'stage'))))
+
+
+@mqtt_client.connect_callback()
+def on_connect(client, userdata, flags, rc):
+    if rc != 0:
+        return
+
+    # publish the messages queued while disconnected
+    mqtt_publisher.connected()
+
+    # subscriptions are lost when the client reconnects with a clean session
+    if mqtt_subscriber:
+        client.subscribe(f'{MQTT_SUBSCRIBE_TOPIC_PREFIX}/#', CONFIG['mqtt']['subscribe']['qos'])
 
 
 @mqtt_client.disconnect_callback()
@@ -50,6 +119,41 @@ def on_disconnect(client, userdata, rc):
     client.reconnect()
 
 
+@mqtt_client.publish_callback()
+def on_publish(client, userdata, mid):
+    mqtt_publisher.acknowledged(mid)
+
+
+@mqtt_client.message_callback()
+def on_message(client, userdata, message: MQTTMessage):
+    # retained messages are changes made in the past (or by other clients), so they are not applied again
+    if not mqtt_subscriber or message.retain:
+        return
+
+    topic = message.topic
+    json_path_parts = topic[len(MQTT_SUBSCRIBE_TOPIC_PREFIX) + 1:].split('/') \
+        if topic.startswith(f'{MQTT_SUBSCRIBE_TOPIC_PREFIX}/') else ['']
+    if any(not part or ' ' in part for part in json_path_parts):
+        logger.warning(f'Ignoring MQTT message with invalid topic \"{topic}\"')
+        return
+
+    # check if topic specifies the json file to use (same as the url path of the requests)
+    json_file_key = DEFAULT_JSON_FILE
+    if json_path_parts[0] in CONFIG['api']['files']:
+        json_file_key = json_path_parts.pop(0)
+
+    # empty messages delete the node
+    if not message.payload:
+        mqtt_subscriber.queue(json_file_key, ('DELETE', json_path_parts, None))
+        return
+
+    try:
+        mqtt_subscriber.queue(json_file_key, ('PUT', json_path_parts, json_codec.loads(message.payload)))
+
+    except json.JSONDecodeError as message_json_decode_error:
+        logger.warning(f'Ignoring MQTT message with malformed JSON in topic \"{topic}\": {message_json_decode_error}')
+
+
 class JsonHandler(HTTPEndpoint):
 
     async def get(self, request: Request):
@@ -64,6 +168,9 @@ class JsonHandler(HTTPEndpoint):
     async def delete(self, request: Request):
         return await self.process_request(request)
 
+    async def patch(self, request: Request):
+        return await self.process_request(request)
+
     async def process_request(self, request: Request):
         json_path = request.path_params['json_path']
 
@@ -81,49 +188,122 @@ class JsonHandler(HTTPEndpoint):
                 json_path_parts = []
 
         # check if url path specifies the json file to use
-        request_file_data = CONFIG['api']['files'].get(DEFAULT_JSON_FILE)
+        request_file_key = DEFAULT_JSON_FILE
         if len(json_path_parts) > 0 and json_path_parts[0] in CONFIG['api']['files']:
-            request_file_data = CONFIG['api']['files'].get(json_path_parts.pop(0))
+            request_file_key = json_path_parts.pop(0)
 
-        # validate request and request body
-        body = None
         method = request.method
-        if method in ['POST', 'PUT']:
+        request_body = await request.body() if method in ['POST', 'PUT', 'PATCH'] else None
+        if_none_match = request.headers.get('if-none-match')
+
+        # GET requests of list nodes can be filtered with "where" conditions (all of them must match) and paginated,
+        # and the fields and depth of the returned value can be limited
+        try:
+            query = NodeQuery.parse(request.query_params) if method == 'GET' else None
+
+        except ValueError as query_error:
+            return Response(str(query_error), status_code=400)
+
+        # large GET responses are compressed with the preferred encoding accepted by the client
+        encoding = compressor.negotiate(request.headers.get('accept-encoding')) if method == 'GET' else None
+
+        # parsing, validation and file I/O are blocking operations, so they run in the thread pool to never block
+        # the requests of other connections
+        start = time.perf_counter()
+        response = await asyncio.get_running_loop().run_in_executor(thread_pool,
+                                                                    self.handle_request,
+                                                                    method,
+                                                                    json_path,
+                                                                    json_path_parts,
+                                                                    request_file_key,
+                                                                    request_body,
+                                                                    if_none_match,
+                                                                    query,
+                                                                    encoding)
+
+        request_seconds.observe(time.perf_counter() - start, request_file_key, method, str(response.status_code))
+        return response
+
+    def handle_request(self,
+                       method: str,
+                       json_path: str,
+                       json_path_parts: List[str],
+                       request_file_key: str,
+                       request_body: Optional[bytes],
+                       if_none_match: Optional[str] = None,
+                       query: Optional[NodeQuery] = None,
+                       encoding: Optional[str] = None) -> Response:
+        """
+        Performs the request operation in the JSON file (runs in the thread pool)
+        :param method: HTTP method of the request
+        :param json_path: JSON path of the request
+        :param json_path_parts: path parts, in the JSON, to the node (without the file name)
+        :param request_file_key: "api.files" entry of the JSON file
+        :param request_body: request body (only in POST, PUT and PATCH requests)
+        :param if_none_match: "If-None-Match" header of the request (only used in GET requests)
+        :param query: items, fields and depth of the node to return (only used in GET requests)
+        :param encoding: encoding of the response body (only used in GET requests, None to not compress it)
+        :return: request response
+        """
+
+        request_file_data = CONFIG['api']['files'].get(request_file_key)
+        stage_timer.request(request_file_key, method)
+
+        # validate request body
+        body = None
+        if method in ['POST', 'PUT', 'PATCH']:
             try:
-                body = await request.json()
+                with stage_timer.stage('parse'):
+                    body = json_codec.loads(request_body)
 
             except json.JSONDecodeError as request_json_decode_error:
                 logger.error(f'Malformed JSON in {method} request:', exc_info=request_json_decode_error)
                 return Response('Invalid JSON request body', status_code=400)
 
+        # PATCH requests have a JSON Patch document, with the paths relative to the node of the request
+        if method == 'PATCH':
+            try:
+                body = parse_json_patch(body)
+
+            except JsonPatchError as json_patch_error:
+                logger.error(f'Malformed JSON Patch in PATCH request: {json_patch_error}')
+                return Response(f'Invalid JSON Patch request body: {json_patch_error}', status_code=400)
+
         # change json data
         logger.debug(f'Performing \"{method}\" in JSON path {json_path_parts} with content {body}...')
 
         json_file_path = request_file_data['path']
         try:
-            logger.debug(f'Loading the content of JSON file {json_file_path}')
-            json_data = self.load_json_data(json_file_path)
-
-            # if json file just contains a value, and we want to update just change the file content for the new value
-            if method in ['POST', 'PUT'] and not json_path_parts:
-                json_data = body
+            # cached documents are never changed in place (changes are made to a copy of the nodes in the path), so
+            # readers don't wait for writers and always get a consistent version of the document
+            if method == 'GET':
+                return self.get_json_response(request_file_key, json_path_parts, if_none_match, query, encoding)
+
+            # writers of the same document are serialized, so each change is made to the last version of the document
+            with document_cache.lock(request_file_key):
+                logger.debug(f'Loading the content of JSON file {json_file_path}')
+                json_data = document_cache.get(request_file_key, json_file_path, self.load_json_data)
+
+                previous_json_data = json_data
+                with stage_timer.stage('traverse'):
+                    if method == 'PATCH':
+                        # all the operations are applied to the same copy, so they are validated, saved and published
+                        # together, and none of them is applied if one fails
+                        json_data, json_operations = self.patch_json_data(json_data, json_path_parts, body)
 
-            else:
-                # if json file just contains a value, but we have to create new nodes of given path
-                if not isinstance(json_data, dict) and method in ['POST', 'PUT']:
-                    json_data = dict()
-
-                result = self.get_set_json_value_by_path(json_data, json_path_parts, method, body)
-                if result is not None:  # no result value means operation is POST, PUT or DELETE
-                    return JSONResponse(result)
-
-            # json data has changed, so we need to save new version of data
-            # NOTE: since objects in python are passed by reference, changes made inside functions to
-            #       "json_data" variable are visible from outside the scope of the functions that changed them, so:
-            logger.debug(f'Saving changes made to JSON content to file {json_file_path}')
-            self.save_json_data(json_data,
-                                json_file_path,
-                                request_file_data['schema'] if request_file_data['schema'] else None)
+                    else:
+                        json_data = self.change_json_data(json_data, json_path_parts, method, body)
+                        json_operations = [(method, json_path_parts, body)]
+
+                # json data has changed, so we need to save new version of data
+                if json_operations:
+                    logger.debug(f'Saving changes made to JSON content to file {json_file_path}')
+                    self.save_json_data(json_data,
+                                        json_file_path,
+                                        request_file_data['schema'] if request_file_data['schema'] else None,
+                                        request_file_key,
+                                        json_operations,
+                                        previous_json_data)
 
         except FileNotFoundError:
             logger.error(f'File \"{json_file_path}\" not found')
@@ -150,22 +330,32 @@ class JsonHandler(HTTPEndpoint):
             return Response(f'Request violates the validations defined by JSON schema: {json_validation_error}',
                             status_code=401)
 
+        except SchemaError as schema_error:
+            logger.error(f'Invalid JSON schema for JSON file \"{json_file_path}\":', exc_info=schema_error)
+            return Response(f'Invalid JSON schema for JSON file \"{json_file_path}\"', status_code=500)
+
+        except OSError as os_error:
+            logger.error(f'Error occurred while saving changes to JSON file \"{json_file_path}\":', exc_info=os_error)
+            return Response(f'Error occurred while saving changes to JSON file \"{json_file_path}\"', status_code=500)
+
+        except JsonPatchTestError as json_patch_test_error:
+            logger.info(f'JSON Patch test failed: {json_patch_test_error}')
+            return Response(f'JSON Patch test failed: {json_patch_test_error}', status_code=409)
+
         except ValueError:
             logger.error(f'Attempt to perform a \"{method}\" operation in JSON root node')
             return Response(f'Operation \"{method}\" cannot be performed in JSON root node', status_code=400)
 
         # publish json data changes to the broker if mqtt server is enabled
-        if CONFIG['mqtt']['enabled']:
+        if CONFIG['mqtt']['enabled'] and json_operations:
             logger.info(f'Publishing changes made to JSON...')
             try:
-                self.publish_config(json_data if method != 'DELETE' else None,
-                                    json_path_parts,
-                                    json_file_path,
-                                    path_depth=CONFIG['mqtt']['publish']['json_path_topic_depth'])
-
-            except RuntimeError as mqtt_runtime_error:
-                logger.error('Error occurred while publishing changes to broker:', exc_info=mqtt_runtime_error)
-                return Response(status_code=500)
+                with stage_timer.stage('publish'):
+                    self.publish_changes(previous_json_data,
+                                         json_data,
+                                         [json_path_parts for _, json_path_parts, _ in json_operations],
+                                         json_file_path,
+                                         path_depth=CONFIG['mqtt']['publish']['json_path_topic_depth'])
 
             except ValueError as mqtt_value_error:
                 logger.error('Error occurred while publishing changes to broker:', exc_info=mqtt_value_error)
@@ -173,6 +363,185 @@ class JsonHandler(HTTPEndpoint):
 
         return Response(status_code=200)
 
+    def get_json_response(self,
+                          json_file_key: str,
+                          json_path_parts: List[str],
+                          if_none_match: Optional[str] = None,
+                          query: Optional[NodeQuery] = None,
+                          encoding: Optional[str] = None) -> Response:
+        """
+        Returns the response of a GET request, with the value of the node and its ETag, or "304 Not Modified" (without
+        reading the value) if the ETag matches the "If-None-Match" header.
+        Compressed bodies are kept (see CompressedBodies), so the next requests of the same version of the node are
+        answered without reading, encoding and compressing it again.
+        :param json_file_key: "api.files" entry of the JSON file
+        :param json_path_parts: path parts, in the JSON, to the node (without the file name)
+        :param if_none_match: "If-None-Match" header of the request
+        :param query: items, fields and depth of the node to return
+        :param encoding: encoding of the response body (None to not compress it)
+        :return: request response
+        Raise KeyError if path does not exist, IndexError list item index does not exist
+        """
+
+        json_file_data = CONFIG['api']['files'][json_file_key]
+        json_file_path = json_file_data['path']
+        vary_headers = {'Vary': 'Accept-Encoding'} if compressor.encodings else {}
+
+        def body_key(etag: str) -> Optional[Tuple]:
+            # identifies the compressed body of the response
+            return (json_file_key, etag, tuple(json_path_parts), query.key if query else (), encoding) \
+                if encoding else None
+
+        # files with a path index are not loaded to answer GET requests, only the requested node is read
+        index_depth = json_file_data['index_depth']
+        if index_depth and not document_cache.is_current(json_file_key, json_file_path):
+            etag = node_versions.file_etag(path_indexes.get(json_file_key, json_file_path, index_depth).signature)
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={'ETag': etag} | vary_headers)
+
+            if (response := self.cached_response(body_key(etag))) is not None:
+                return response
+
+            with stage_timer.stage('index_read'):
+                indexed_node = path_indexes.read(json_file_key,
+                                                 json_file_path,
+                                                 index_depth,
+                                                 json_path_parts,
+                                                 json_codec.loads)
+
+            if indexed_node is not None:
+                logger.debug(f'Reading JSON path {json_path_parts} from the path index of file {json_file_path}')
+                json_data, indexed_json_path_parts = indexed_node
+                with stage_timer.stage('traverse'):
+                    json_data = self.get_set_json_value_by_path(json_data, indexed_json_path_parts)
+
+                # nodes read from the path index are parsed again in each request, so the secondary indexes are not used
+                return self.cache_response(body_key(etag),
+                                           self.node_response(json_data, {'ETag': etag} | vary_headers, query,
+                                                              encoding=encoding))
+
+        logger.debug(f'Loading the content of JSON file {json_file_path}')
+        document = document_cache.get_document(json_file_key, json_file_path, self.load_json_data)
+
+        # the node versions are kept by each worker, so the workers use the ETag of the file, the same in all of them
+        if WORKERS_COORDINATION:
+            etag = node_versions.file_etag(document.signature)
+
+        else:
+            etag = node_versions.etag(json_file_key, document, json_path_parts)
+
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={'ETag': etag} | vary_headers)
+
+        if (response := self.cached_response(body_key(etag))) is not None:
+            return response
+
+        with stage_timer.stage('traverse'):
+            json_data = self.get_set_json_value_by_path(document.data, json_path_parts)
+
+        return self.cache_response(body_key(etag),
+                                   self.node_response(json_data, {'ETag': etag} | vary_headers, query, json_file_key,
+                                                      json_path_parts, encoding))
+
+    @staticmethod
+    def cached_response(key: Optional[Tuple]) -> Optional[Response]:
+        """
+        Returns the response with the kept compressed body and headers (see cache_response)
+        :param key: key of the compressed body, None if the body is not compressed
+        :return: response, or None if the body is not kept
+        """
+
+        if key is None or (cached_body := compressed_bodies.get(key)) is None:
+            return None
+
+        body, headers = cached_body
+        return Response(body, headers=headers)
+
+    @staticmethod
+    def cache_response(key: Optional[Tuple], response: Response) -> Response:
+        """
+        Keeps the compressed body of the response, with its headers (streamed responses are not kept)
+        :param key: key of the compressed body, None if the body is not compressed
+        :param response: response
+        :return: the response
+        """
+
+        if key is not None and 'content-encoding' in response.headers and not isinstance(response, StreamingResponse):
+            compressed_bodies.set(key, response.body, dict(response.headers))
+
+        return response
+
+    def node_response(self,
+                      json_data: object,
+                      headers: Dict[str, str],
+                      query: Optional[NodeQuery] = None,
+                      json_file_key: str = None,
+                      json_path_parts: List[str] = None,
+                      encoding: Optional[str] = None) -> Response:
+        """
+        Returns the response with the value of the node, or only with the items of the list node, the fields and the
+        depth selected by the query (only the selected values are serialized)
+        :param json_data: node value
+        :param headers: response headers
+        :param query: items, fields and depth of the node to return
+        :param json_file_key: "api.files" entry of the JSON file (None to not use the secondary indexes)
+        :param json_path_parts: path parts, in the JSON, to the node
+        :param encoding: encoding of the response body (None to not compress it)
+        :return: request response
+        """
+
+        if not query:
+            return self.json_response(json_data, headers=headers, encoding=encoding)
+
+        if query.selects_items and not isinstance(json_data, list):
+            return Response('Only list nodes can be filtered or paginated', status_code=400)
+
+        if query.where:
+            json_data = self.filter_json_node(json_data, query.where, json_file_key, json_path_parts)
+
+        if query.is_paginated:
+            json_data, page_headers = query.page(json_data)
+            headers = headers | page_headers
+
+        if query.fields or query.depth is not None:
+            with stage_timer.stage('project'):
+                if query.fields:
+                    json_data = project(json_data, field_tree(query.fields))
+
+                if query.depth is not None:
+                    json_data = truncate(json_data, query.depth)
+
+        return self.json_response(json_data, headers=headers, encoding=encoding)
+
+    @staticmethod
+    def filter_json_node(json_data: list,
+                         where: List[WhereCondition],
+                         json_file_key: str = None,
+                         json_path_parts: List[str] = None) -> list:
+        """
+        Returns the items of the list node that match all the conditions. If one of the "==" conditions is of a field
+        with a secondary index (see "indexes" of the "api.files" entry), only the items found in the index are checked
+        :param json_data: list node
+        :param where: conditions the items must match
+        :param json_file_key: "api.files" entry of the JSON file (None to not use the secondary indexes)
+        :param json_path_parts: path parts, in the JSON, to the list node
+        :return: matching items
+        """
+
+        with stage_timer.stage('filter'):
+            positions = None
+            if json_file_key is not None:
+                for condition in where:
+                    if condition.operator == '==' and \
+                            secondary_indexes.is_indexed(json_file_key, json_path_parts, condition.field) and \
+                            (positions := secondary_indexes.lookup(json_file_key,
+                                                                   json_path_parts,
+                                                                   json_data,
+                                                                   condition)) is not None:
+                        break
+
+            return filter_items(json_data, where, positions)
+
     @staticmethod
     def get_set_json_value_by_path(json_data: object, path: List[str],
                                    operation: str = 'get', value: Any = None):
@@ -277,7 +646,195 @@ class JsonHandler(HTTPEndpoint):
                 raise KeyError(key)
 
     @staticmethod
-    def publish_config(json_data: object, json_path_parts: List[str], json_file_path: str = None, path_depth: int = 0):
+    def change_json_data(json_data: object, path: List[str], operation: str, value: Any = None) -> object:
+        """
+        Performs a POST, PUT or DELETE operation in the JSON data.
+        The given JSON data is not changed, changes are made to a copy of the nodes in the path (see copy_json_path),
+        so a failed operation (ex: schema validation) never affects the original data.
+        :param json_data: JSON data object
+        :param path: path parts, in the JSON, to the node (ex: ['node1', 'node2', 'node3'])
+        :param operation: "POST", "PUT" or "DELETE" (see get_set_json_value_by_path), or "add", "remove" or "replace"
+        (see patch_json_node)
+        :param value: new value to assign to node (ignored in "DELETE" and "remove" operations)
+        :return: changed JSON data object
+                 Raise the same exceptions as get_set_json_value_by_path
+        """
+
+        # JSON Patch operations (used by the journal of PATCH requests)
+        if operation in ['add', 'remove', 'replace']:
+            return JsonHandler.patch_json_node(json_data, path, operation, value)
+
+        # if json file just contains a value, and we want to update just change the file content for the new value
+        if operation.upper() in ['POST', 'PUT'] and not path:
+            return value
+
+        json_data = JsonHandler.copy_json_path(json_data, path)
+
+        # if json file just contains a value, but we have to create new nodes of given path
+        if not isinstance(json_data, dict) and operation.upper() in ['POST', 'PUT']:
+            json_data = dict()
+
+        JsonHandler.get_set_json_value_by_path(json_data, path, operation, value)
+        return json_data
+
+    @staticmethod
+    def patch_json_data(json_data: object,
+                        path: List[str],
+                        json_patch: List[Dict[str, Any]]) -> Tuple[object, List[JournalOperation]]:
+        """
+        Performs the operations of a JSON Patch document (RFC 6902) in the JSON data, in order.
+        As in change_json_data, the given JSON data is not changed, so the document is applied atomically.
+        :param json_data: JSON data object
+        :param path: path parts, in the JSON, to the node the paths of the operations are relative to
+        :param json_patch: operations of the JSON Patch document (see json_patch.parse_json_patch)
+        :return: changed JSON data object and the list of ("add", "remove" or "replace", path parts, value) that
+        changed it ("move" and "copy" operations are converted to "remove" and "add" operations)
+                 Raise JsonPatchTestError if a "test" operation fails (or its node does not exist)
+                 Raise the same exceptions as patch_json_node
+        """
+
+        json_operations = list()
+        for patch_operation in json_patch:
+            operation = patch_operation['op']
+            json_path_parts = path + patch_operation['path']
+
+            if operation == 'test':
+                try:
+                    value = JsonHandler.get_set_json_value_by_path(json_data, json_path_parts)
+
+                except (KeyError, IndexError):
+                    raise JsonPatchTestError(f'JSON path {json_path_parts} does not exist')
+
+                if not json_equal(value, patch_operation['value']):
+                    raise JsonPatchTestError(f'value of JSON path {json_path_parts} is not {patch_operation["value"]}')
+
+                continue
+
+            if operation in ['move', 'copy']:
+                from_json_path_parts = path + patch_operation['from']
+                value = JsonHandler.get_set_json_value_by_path(json_data, from_json_path_parts)
+                if operation == 'move':
+                    if from_json_path_parts == json_path_parts:
+                        continue
+
+                    json_data = JsonHandler.patch_json_node(json_data, from_json_path_parts, 'remove')
+                    json_operations.append(('remove', from_json_path_parts, None))
+
+                operation = 'add'
+
+            else:
+                value = patch_operation.get('value')
+
+            json_data = JsonHandler.patch_json_node(json_data, json_path_parts, operation, value)
+            json_operations.append((operation, json_path_parts, value))
+
+        return json_data, json_operations
+
+    @staticmethod
+    def patch_json_node(json_data: object, path: List[str], operation: str, value: Any = None) -> object:
+        """
+        Performs a JSON Patch "add", "remove" or "replace" operation in the JSON data.
+        Unlike POST and PUT operations, missing parent nodes are not created and list items are inserted in the given
+        index ("-" appends the item to the list).
+        As in change_json_data, the given JSON data is not changed, changes are made to a copy of the nodes in the path.
+        :param json_data: JSON data object
+        :param path: path parts, in the JSON, to the node (ex: ['node1', 'node2', 'node3'])
+        :param operation: "add", "remove" or "replace"
+        :param value: new value to assign to node (ignored in "remove" operations)
+        :return: changed JSON data object
+                 Raise ValueError if path is empty and operation is "remove"
+                 Raise KeyError if the node (or, in "add" operations, its parent) does not exist
+                 Raise IndexError if a list item index does not exist
+        """
+
+        if not path:
+            if operation == 'remove':
+                raise ValueError('root node cannot be removed')
+
+            return value
+
+        json_data = JsonHandler.copy_json_path(json_data, path)
+        json_node_data = JsonHandler.get_set_json_value_by_path(json_data, path[:-1])
+        key = path[-1]
+
+        if isinstance(json_node_data, list):
+            if key == '-' and operation == 'add':
+                json_node_data.append(value)
+                return json_data
+
+            # list indexes of JSON pointers are never negative and have no leading zeros
+            if not key.isascii() or not key.isdigit() or (len(key) > 1 and key.startswith('0')):
+                raise KeyError(key)
+
+            index = int(key)
+            if index > len(json_node_data) or (index == len(json_node_data) and operation != 'add'):
+                raise IndexError(index)
+
+            if operation == 'add':
+                json_node_data.insert(index, value)
+
+            elif operation == 'remove':
+                del json_node_data[index]
+
+            else:
+                json_node_data[index] = value
+
+        elif isinstance(json_node_data, dict):
+            if operation != 'add' and key not in json_node_data:
+                raise KeyError(key)
+
+            if operation == 'remove':
+                del json_node_data[key]
+
+            else:
+                json_node_data[key] = value
+
+        else:
+            raise KeyError(key)
+
+        return json_data
+
+    @staticmethod
+    def copy_json_path(json_data: object, path: List[str]) -> object:
+        """
+        Copies the JSON data nodes in the given path, so they can be changed without changing the original data.
+        Nodes outside the path are not copied and are shared by the original data and the returned copy.
+        :param json_data: JSON data object
+        :param path: path parts, in the JSON, to the node that will be changed (ex: ['node1', 'node2', 'node3'])
+        :return: JSON data object with the nodes in the path copied
+        """
+
+        if not isinstance(json_data, (dict, list)):
+            return json_data
+
+        json_data = json_node_data = json_data.copy()
+        for i, key in enumerate(path):
+            try:
+                if isinstance(json_node_data, list):
+                    key = int(key)
+
+                child_json_node_data = json_node_data[key]
+
+            except (KeyError, IndexError, ValueError):
+                break  # the remaining nodes of the path will be created
+
+            # the last node is only changed in place when a value is appended to it
+            if not isinstance(child_json_node_data, (dict, list)) or \
+                    (i == len(path) - 1 and not isinstance(child_json_node_data, list)):
+                break
+
+            child_json_node_data = child_json_node_data.copy()
+            json_node_data[key] = child_json_node_data
+            json_node_data = child_json_node_data
+
+        return json_data
+
+    @staticmethod
+    def publish_config(json_data: object,
+                       json_path_parts: List[str],
+                       json_file_path: str = None,
+                       path_depth: int = 0,
+                       min_interval: float = 0):
         """
         Publish the JSON data to broker using the "json_path_parts" as topic.
         If a path_depth is set the JSON json_path_parts will be shortened to that depth and the data will to be
@@ -290,8 +847,9 @@ class JsonHandler(HTTPEndpoint):
         :param json_file_path: Path or name of the JSON file where the operation was performed
         :param path_depth: sets the depth of the JSON path in json_path_parts.
                The published JSON data will be the ones existing in the node of that indicated depth.
+        :param min_interval: minimum time, in seconds, between messages of the topic (see MqttPublisher.publish)
 
-        :return: True if message has been published, False if not
+        Raise ValueError if the topic is not valid to publish
         """
 
         if path_depth > 0:
@@ -301,7 +859,42 @@ class JsonHandler(HTTPEndpoint):
             for part in json_path_parts:
                 json_data = json_data[int(part)] if isinstance(json_data, list) else json_data[part]
 
-            json_data = json.dumps(json_data)
+        topic, json_data = JsonHandler.mqtt_message(json_data, json_path_parts, json_file_path)
+
+        # the message is published (and converted to JSON) in background, and after reconnecting if the client is
+        # disconnected. The nodes are never changed in place, so the data is the same when it is converted.
+        logger.debug(f'Queueing JSON data to be published to \"{topic}\"...')
+        mqtt_publisher.publish(topic,
+                               partial(json_codec.dumps, json_data) if json_data is not None else None,
+                               retain=True,
+                               min_interval=min_interval)
+
+    @staticmethod
+    def publish_delta(json_patch: List[Dict[str, Any]], json_path_parts: List[str], json_file_path: str = None):
+        """
+        Publish the changes made to a node, as a JSON Patch document, to the delta topic of the node (the topic of the
+        node with the "delta_topic_suffix"). Delta messages are not retained.
+        :param json_patch: JSON Patch document with the changes, relative to the node
+        :param json_path_parts: path parts, in the JSON, to the node
+        :param json_file_path: Path or name of the JSON file where the operations were performed
+        Raise ValueError if the topic is not valid to publish
+        """
+
+        topic, json_patch = JsonHandler.mqtt_message(json_patch, json_path_parts, json_file_path)
+        topic += CONFIG['mqtt']['publish']['delta_topic_suffix']
+
+        logger.debug(f'Queueing JSON Patch to be published to \"{topic}\"...')
+        mqtt_publisher.publish(topic, json_codec.dumps(json_patch), retain=False)
+
+    @staticmethod
+    def mqtt_message(json_data: object, json_path_parts: List[str], json_file_path: str = None) -> Tuple[str, object]:
+        """
+        Returns the topic and the content of the MQTT message of a node
+        :param json_data: data object to publish
+        :param json_path_parts: path parts, in the JSON, to the node, that will be used as topic
+        :param json_file_path: Path or name of the JSON file where the operation was performed
+        :return: topic and data object to publish
+        """
 
         topic = ''
 
@@ -320,11 +913,73 @@ class JsonHandler(HTTPEndpoint):
         if topic_prefix := CONFIG['mqtt']['publish']['topic_prefix']:
             topic = f'{topic_prefix}/{topic}'
 
-        logger.debug(f'Publishing JSON data to \"{topic}\"...')
-        if mqtt_client.is_connected():
-            return mqtt_client.publish(topic, json_data, retain=True).is_published()
+        return topic, json_data
+
+    @staticmethod
+    def publish_changes(previous_json_data: object,
+                        json_data: object,
+                        changed_paths: List[List[str]],
+                        json_file_path: str = None,
+                        path_depth: int = 0) -> None:
+        """
+        Publish the nodes changed by the operations in the given paths, once per topic (see publish_config).
+        Removed nodes are published as an empty message, and nodes that are identical before and after the operations
+        are not published (their retained messages would be the same).
+        In the "delta" publish mode, the changes of each node are also published to its delta topic (see publish_delta)
+        and the node itself is only published once per "full_state_interval".
+        :param previous_json_data: JSON data object before the operations
+        :param json_data: JSON data object after the operations
+        :param changed_paths: path parts, in the JSON, to the nodes changed by the operations
+        :param json_file_path: Path or name of the JSON file where the operations were performed
+        :param path_depth: sets the depth of the JSON path of the topics
+        Raise ValueError if a topic is not valid to publish
+        """
+
+        topics = dict()
+        for json_path_parts in changed_paths:
+            if path_depth > 0:
+                json_path_parts = json_path_parts[:path_depth]
 
-        return False
+            # items appended to a list are published with the list
+            if json_path_parts and json_path_parts[-1] == '-':
+                json_path_parts = json_path_parts[:-1]
+
+            topics.setdefault(tuple(json_path_parts), json_path_parts)
+
+        for json_path_parts in topics.values():
+            nodes = list()
+            for data in [previous_json_data, json_data]:
+                try:
+                    nodes.append((True, JsonHandler.get_set_json_value_by_path(data, json_path_parts)))
+
+                except KeyError:
+                    nodes.append((False, None))
+
+            (previous_exists, previous_node), (exists, node) = nodes
+            if previous_exists == exists and json_identical(previous_node, node):
+                logger.debug(f'JSON path {json_path_parts} did not change, skipping its publish...')
+                mqtt_publisher.suppressed()
+                continue
+
+            if CONFIG['mqtt']['publish']['mode'] != 'delta':
+                JsonHandler.publish_config(json_data if exists else None, json_path_parts, json_file_path)
+                continue
+
+            # only the changes are published right away, the full node (retained) is published at most once per
+            # interval, unless it was created or removed
+            if previous_exists and exists:
+                JsonHandler.publish_delta(json_diff(previous_node, node), json_path_parts, json_file_path)
+                JsonHandler.publish_config(json_data,
+                                           json_path_parts,
+                                           json_file_path,
+                                           min_interval=CONFIG['mqtt']['publish']['full_state_interval'])
+
+            else:
+                JsonHandler.publish_delta([{'op': 'add', 'path': '', 'value': node} if exists else
+                                           {'op': 'remove', 'path': ''}],
+                                          json_path_parts,
+                                          json_file_path)
+                JsonHandler.publish_config(json_data if exists else None, json_path_parts, json_file_path)
 
     @staticmethod
     def load_json_data(json_file_path: Union[str, Path]) -> object:
@@ -334,55 +989,278 @@ class JsonHandler(HTTPEndpoint):
         :return: Object
         """
 
-        with open(json_file_path, 'r') as json_file_handler:
-            return json.load(json_file_handler)
+        with stage_timer.stage('load'):
+            return json_codec.load(json_file_path)
 
-    def save_json_data(self,
-                       json_data: object,
+    @staticmethod
+    def save_json_data(json_data: object,
                        json_file_path: Union[str, Path],
-                       json_schema_file_path: Union[str, Path] = None) -> None:
+                       json_schema_file_path: Union[str, Path] = None,
+                       json_file_key: str = None,
+                       json_operations: List[JournalOperation] = None,
+                       previous_json_data: object = None) -> None:
         """
         Save the object as JSON in the given file (creates the file if it doesn't exist)
+        If the write-behind persistence is enabled the object is only queued to be written later by the flusher
         :param json_data: object to save as JSON
         :param json_file_path: Path to the JSON file
         :param json_schema_file_path: Path to the JSON schema
+        :param json_file_key: "api.files" entry of the JSON file, used to update the cached document
+        :param json_operations: list of (operation, path parts, value) that changed the object (used by the journal)
+        :param previous_json_data: object before the operations, used by the incremental validation and to update the
+        secondary indexes
         """
 
         if json_schema_file_path:
-            validate(json_data, self.load_json_data(json_schema_file_path))
+            with stage_timer.stage('validate', json_file_key):
+                validator_key = json_file_key or str(json_schema_file_path)
+
+                # validate only the changed node if the file uses incremental validation (JSON Patch documents are
+                # always validated in full)
+                if json_file_key and CONFIG['api']['files'][json_file_key]['validation'] == 'incremental' and \
+                        json_operations and len(json_operations) == 1 and \
+                        json_operations[0][0] in ['POST', 'PUT', 'DELETE']:
+                    operation, json_path_parts, _ = json_operations[0]
+                    schema_validators.validate_change(validator_key,
+                                                      json_schema_file_path,
+                                                      previous_json_data,
+                                                      json_data,
+                                                      operation,
+                                                      json_path_parts)
+
+                else:
+                    schema_validators.validate(validator_key, json_schema_file_path, json_data)
+
+        if json_file_key is None:
+            JsonHandler.write_json_data(json_data, json_file_path)
+            return
+
+        # the changed nodes get a new version (ETag) before the changed document is cached
+        if (document := document_cache.document(json_file_key)) is not None:
+            changed_paths = [json_path_parts for _, json_path_parts, _ in json_operations] if json_operations else [[]]
+            node_versions.register_changes(json_file_key, document, changed_paths, previous_json_data)
+
+        if write_behind_flusher:
+            write_behind_flusher.queue(json_file_key, json_file_path, json_data, json_operations)
+            secondary_indexes.update(json_file_key, previous_json_data, json_data, json_operations or [])
+            return
+
+        # readers keep using the cached document while the file is being written (other workers read the file, so it
+        # is replaced, to never be read with partial content)
+        with document_cache.writing(json_file_key):
+            JsonHandler.write_json_data(json_data,
+                                        json_file_path,
+                                        atomic=WORKERS_COORDINATION,
+                                        json_file_key=json_file_key)
+            path_indexes.invalidate(json_file_key)
+
+        document_cache.set(json_file_key, json_file_path, json_data)
+        secondary_indexes.update(json_file_key, previous_json_data, json_data, json_operations or [])
+
+    @staticmethod
+    def write_json_data(json_data: object,
+                        json_file_path: Union[str, Path],
+                        atomic: bool = False,
+                        json_file_key: str = None,
+                        before_replace: Callable[[bytes], None] = None) -> None:
+        """
+        Write the object as JSON in the given file (creates the file if it doesn't exist)
+        :param json_data: object to write as JSON
+        :param json_file_path: Path to the JSON file
+        :param atomic: write the object to a temporary file that replaces the JSON file, so the file never has
+        partial content (the directory of the file must be writable)
+        :param json_file_key: "api.files" entry of the JSON file, used to get the file indentation
+        :param before_replace: function called with the written content before the temporary file replaces the JSON
+        file (only if atomic)
+        """
+
+        with stage_timer.stage('write', json_file_key):
+            json_text = file_codecs.get(json_file_key, json_codec.with_indent(1)).dumps(json_data)
+
+            if not atomic:
+                with open(json_file_path, 'wb') as json_file_handler:
+                    json_file_handler.write(json_text)
+
+                return
+
+            json_file_path = Path(json_file_path)
+            temporary_json_file_path = json_file_path.with_name(f'.{json_file_path.name}.tmp')
+            with open(temporary_json_file_path, 'wb') as json_file_handler:
+                json_file_handler.write(json_text)
+                json_file_handler.flush()
+                os.fsync(json_file_handler.fileno())
+
+            if before_replace:
+                before_replace(json_text)
+
+            os.replace(temporary_json_file_path, json_file_path)
+
+    @staticmethod
+    def json_response(content: Any, headers: Dict[str, str] = None, encoding: Optional[str] = None) -> Response:
+        """
+        Returns a response with the content encoded as JSON. Contents bigger than the "api.stream_threshold" are
+        streamed in chunks, so the encoded content is never kept in memory at once.
+        :param content: JSON data object
+        :param headers: response headers
+        :param encoding: encoding of the response body (None to not compress it), only used if the encoded content
+        is at least "api.compression.min_size" bytes
+        :return: JSON response
+        """
+
+        stream_threshold = CONFIG['api']['stream_threshold']
+        if not stream_threshold:
+            with stage_timer.stage('serialize'):
+                body = json_codec.dumps(content)
+
+            return JsonHandler.body_response(body, headers, encoding)
+
+        # encode the content until it gets bigger than the threshold (the encoding of streamed contents is only
+        # timed until then)
+        chunks = json_codec.iterdumps(content, STREAM_CHUNK_SIZE)
+        body = list()
+        body_size = 0
+        with stage_timer.stage('serialize'):
+            for chunk in chunks:
+                body.append(chunk)
+                body_size += len(chunk)
+                if body_size > stream_threshold:
+                    logger.debug(f'Streaming JSON content bigger than {stream_threshold} bytes')
+                    chunks = chain(body, chunks)
+                    if encoding and body_size >= compressor.min_size:
+                        # the chunks are compressed as they are streamed
+                        chunks = compressor.compress_chunks(chunks, encoding)
+                        headers = JsonHandler.compressed_headers(headers or {}, encoding)
+
+                    return StreamingResponse(iterate_in_thread_pool(chunks),
+                                             headers=headers,
+                                             media_type='application/json')
+
+        return JsonHandler.body_response(b''.join(body), headers, encoding)
+
+    @staticmethod
+    def body_response(body: bytes, headers: Dict[str, str] = None, encoding: Optional[str] = None) -> Response:
+        # compresses the JSON body if it is at least "api.compression.min_size" bytes
+        if encoding and len(body) >= compressor.min_size:
+            with stage_timer.stage('compress'):
+                body = compressor.compress(body, encoding)
+
+            headers = JsonHandler.compressed_headers(headers or {}, encoding)
+
+        return Response(body, headers=headers, media_type='application/json')
+
+    @staticmethod
+    def compressed_headers(headers: Dict[str, str], encoding: str) -> Dict[str, str]:
+        # the compressed body is not the body the ETag was derived from, so the ETag is weak
+        headers = headers | {'Content-Encoding': encoding}
+        if 'ETag' in headers and not headers['ETag'].startswith('W/'):
+            headers['ETag'] = f'W/{headers["ETag"]}'
+
+        return headers
+
+
+async def iterate_in_thread_pool(iterator: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Gets the items of the iterator in the thread pool, so the streamed content is encoded without blocking the
+    requests of other connections
+    :param iterator: iterator of chunks of the content
+    :return: asynchronous iterator of chunks of the content
+    """
 
-        with open(json_file_path, 'w') as json_file_handler:
-            json.dump(json_data, json_file_handler, indent=1)
+    loop = asyncio.get_running_loop()
+    while (chunk := await loop.run_in_executor(thread_pool, next, iterator, None)) is not None:
+        yield chunk
 
 
 def app():
 
+    # set the JSON codecs, with the configured backend
+    global json_codec
+    try:
+        json_codec = JsonCodec(CONFIG['api']['codec'])
+
+    except ValueError as codec_error:
+        logger.error(f'Invalid JSON codec configuration: {codec_error}')
+        exit(1)
+
+    logger.info(f'Using JSON codec backend \"{json_codec.backend}\".')
+
     # set the default json file to be used
     for key, value in CONFIG['api']['files'].items():
         path = value['path']
+        file_codecs[key] = json_codec.with_indent(value['indent'])
+        secondary_indexes.declare(key, value['indexes'])
+
+        # writers of all the workers are serialized, so each change is made to the last version of the file
+        if WORKERS_COORDINATION:
+            document_cache.set_lock(key, ProcessLock(lock_file_path(path)))
 
         # load the file and schema (if defined) to ensure json integrity
         log_line_word = 'File'
         try:
-            JsonHandler.load_json_data(path)
+            # files with a path index are only loaded if they are changed (the index is built, or loaded if the
+            # file didn't change since it was built)
+            if value['index_depth']:
+                path_indexes.get(key, path, value['index_depth'])
 
+            else:
+                document_cache.get(key, path, JsonHandler.load_json_data)
+
+            # apply the operations of the journal not written to the file when the service stopped
+            replay_journal(key, path)
+
+            # build the schema validator once, it is only rebuilt if the schema file changes
             if 'schema' in value and (path := value['schema']):
                 log_line_word = 'Schema'
-                JsonHandler.load_json_data(path)
+                schema_validators.get(key, path)
 
         except json.JSONDecodeError as json_decode_error:
             logger.error(f'{log_line_word} \"{path}\" (specified at \"{key}\") has invalid JSON: '
                          f'{json_decode_error}')
             exit(1)
 
+        except SchemaError as schema_error:
+            logger.error(f'Schema \"{path}\" (specified at \"{key}\") is not a valid JSON schema: {schema_error}')
+            exit(1)
+
         except FileNotFoundError:
             logger.error(f'File \"{path}\" (specified at "{key}\") not found')
             exit(1)
 
+        except JournalError as journal_error:
+            logger.error(f'Journal of file \"{path}\" (specified at \"{key}\") cannot be replayed: {journal_error}')
+            exit(1)
+
         if value['default']:
             global DEFAULT_JSON_FILE
             DEFAULT_JSON_FILE = key
 
+    # start the background flush of changed documents if the write-behind persistence is enabled
+    persistence_config = CONFIG['api']['persistence']
+    if WORKERS_COORDINATION and persistence_config['mode'] != 'write_through':
+        logger.warning(f'\"{persistence_config["mode"]}\" persistence keeps changes that other workers don\'t see, '
+                       f'using \"write_through\" persistence.')
+        persistence_config['mode'] = 'write_through'
+
+    if persistence_config['mode'] in ['write_behind', 'journal']:
+        journal = persistence_config['mode'] == 'journal'
+
+        def write_document(json_file_key: str,
+                           json_data: Any,
+                           json_file_path: Union[str, Path],
+                           before_replace: Callable[[bytes], None] = None) -> None:
+            JsonHandler.write_json_data(json_data, json_file_path, atomic=journal, json_file_key=json_file_key,
+                                        before_replace=before_replace)
+
+        global write_behind_flusher
+        write_behind_flusher = WriteBehindFlusher(document_cache,
+                                                  write_document,
+                                                  persistence_config['flush_interval'],
+                                                  persistence_config['flush_dirty_threshold'],
+                                                  journal=journal,
+                                                  journal_fsync=persistence_config['journal_fsync'])
+        write_behind_flusher.start()
+        logger.info(f'{"Journal" if journal else "Write-behind"} persistence successfully started.')
+
     # connect mqtt consumer if mqtt server is enabled
     if CONFIG['mqtt']['enabled']:
         mqtt_client.enable_logger(logger)
@@ -405,10 +1283,40 @@ def app():
             logger.error(f'MQTT client connection to {CONFIG["mqtt"]["host"]}:{CONFIG["mqtt"]["port"]} refused.')
             exit(0)
 
+        # apply the changes received from the broker if the subscription is enabled (the topic is subscribed when the
+        # client connects)
+        if CONFIG['mqtt']['subscribe']['enabled']:
+            if WORKERS_COORDINATION:
+                # only one of the workers applies the changes, another one is elected if it stops
+                global leader_election
+                leader_election = LeaderElection(lock_file_path(os.getenv('CONFIG_FILE', 'config.json')),
+                                                 start_mqtt_subscriber)
+                leader_election.start()
+
+            else:
+                start_mqtt_subscriber()
+
         # start mqtt consumer
         mqtt_client.loop_start()
+        mqtt_publisher.start()
         logger.info('MQTT client successfully started.')
 
+    # reload and publish the files changed outside the service
+    if CONFIG['api']['watch'] != 'disabled':
+        global file_watcher
+        try:
+            file_watcher = FileWatcher({key: value['path'] for key, value in CONFIG['api']['files'].items()},
+                                       reload_changed_file,
+                                       CONFIG['api']['watch'],
+                                       CONFIG['api']['watch_poll_interval'])
+
+        except OSError as watch_error:
+            logger.error(f'Unable to watch the JSON files: {watch_error}')
+            exit(1)
+
+        file_watcher.start()
+        logger.info(f'Watching the JSON files for external changes ({file_watcher.mode}).')
+
     # change default uvicorn log format
     uvicorn.config.LOGGING_CONFIG['formatters']['default']['fmt'] = \
         '%(asctime)s: [%(name)s] %(levelprefix)s %(message)s'
@@ -417,9 +1325,303 @@ def app():
     uvicorn.config.LOGGING_CONFIG['formatters']['access']['fmt'] = \
         '%(asctime)s: [%(name)s] %(levelprefix)s %(client_addr)s - "%(request_line)s" %(status_code)s'
 
-    return Starlette(routes=[
-        Route('/{json_path:path}', JsonHandler, methods=['GET', 'POST', 'PUT', 'DELETE'])
-    ])
+    # the metrics route is registered before the JSON files route, so it is never handled as a JSON path
+    routes = list()
+    if metrics_path := CONFIG['api']['metrics_path']:
+        register_metrics()
+        routes.append(Route(metrics_path, metrics_endpoint, methods=['GET']))
+        logger.info(f'Exposing metrics at "{metrics_path}".')
+
+    routes.append(Route('/{json_path:path}', JsonHandler, methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH']))
+    return Starlette(routes=routes, on_shutdown=[shutdown])
+
+
+def register_metrics() -> None:
+    """
+    Registers the metrics read from the state of the service (JSON files, caches and MQTT client) when the metrics are
+    exposed
+    """
+
+    def file_sizes() -> Dict[Tuple[str, ...], int]:
+        sizes = dict()
+        for key, value in CONFIG['api']['files'].items():
+            try:
+                sizes[(key,)] = os.path.getsize(value['path'])
+
+            except OSError:
+                continue
+
+        return sizes
+
+    def cache_hit_ratio() -> float:
+        reads = document_cache.hits + document_cache.misses
+        return document_cache.hits / reads if reads else 0.0
+
+    def mqtt_messages() -> Dict[Tuple[str, ...], int]:
+        return {
+            ('published',): mqtt_publisher.published_messages,
+            ('replaced',): mqtt_publisher.replaced_messages,
+            ('suppressed',): mqtt_publisher.suppressed_messages,
+            ('dropped',): mqtt_publisher.dropped_messages,
+            ('error',): mqtt_publisher.publish_errors
+        }
+
+    metrics.add(Gauge('json_api_file_size_bytes', 'Size of the JSON files', file_sizes, ('file',)))
+    metrics.add(Gauge('json_api_cache_hits_total', 'Reads of documents found in the cache',
+                      lambda: document_cache.hits, metric_type='counter'))
+    metrics.add(Gauge('json_api_cache_misses_total', 'Reads of documents loaded from the files',
+                      lambda: document_cache.misses, metric_type='counter'))
+    metrics.add(Gauge('json_api_cache_hit_ratio', 'Ratio of reads of documents found in the cache', cache_hit_ratio))
+    metrics.add(Gauge('json_api_path_index_builds_total', 'Path indexes built',
+                      lambda: path_indexes.builds, metric_type='counter'))
+    metrics.add(Gauge('json_api_path_index_reads_total', 'Nodes read from the path indexes',
+                      lambda: path_indexes.reads, metric_type='counter'))
+    metrics.add(Gauge('json_api_compressed_body_hits_total', 'Compressed response bodies found in the cache',
+                      lambda: compressed_bodies.hits, metric_type='counter'))
+    metrics.add(Gauge('json_api_compressed_body_misses_total', 'Compressed response bodies not found in the cache',
+                      lambda: compressed_bodies.misses, metric_type='counter'))
+    metrics.add(Gauge('json_api_compressed_body_cache_bytes', 'Size of the compressed response bodies in the cache',
+                      lambda: compressed_bodies.size))
+    metrics.add(Gauge('json_api_secondary_index_builds_total', 'Secondary indexes built',
+                      lambda: secondary_indexes.builds, metric_type='counter'))
+    metrics.add(Gauge('json_api_secondary_index_updates_total', 'Secondary indexes updated with the changed items',
+                      lambda: secondary_indexes.updates, metric_type='counter'))
+    metrics.add(Gauge('json_api_secondary_index_lookups_total', 'Lists filtered with a secondary index',
+                      lambda: secondary_indexes.lookups, metric_type='counter'))
+
+    if write_behind_flusher:
+        metrics.add(Gauge('json_api_flushes_total', 'Documents written by the write-behind persistence',
+                          lambda: write_behind_flusher.flushes, metric_type='counter'))
+        metrics.add(Gauge('json_api_flush_errors_total', 'Errors writing documents of the write-behind persistence',
+                          lambda: write_behind_flusher.flush_errors, metric_type='counter'))
+
+    if not CONFIG['mqtt']['enabled']:
+        return
+
+    metrics.add(Gauge('json_api_mqtt_connected', 'Whether the MQTT client is connected to the broker',
+                      lambda: int(mqtt_client.is_connected())))
+    metrics.add(Gauge('json_api_mqtt_messages_total', 'MQTT messages by result', mqtt_messages, ('result',),
+                      metric_type='counter'))
+    metrics.add(Gauge('json_api_mqtt_pending_messages', 'MQTT messages waiting to be published',
+                      lambda: mqtt_publisher.pending_messages))
+    metrics.add(Gauge('json_api_mqtt_in_flight_messages', 'MQTT messages not acknowledged by the broker yet',
+                      lambda: mqtt_publisher.in_flight_messages))
+    metrics.add(Gauge('json_api_mqtt_ack_latency_seconds', 'Time between queueing and acknowledging MQTT messages',
+                      lambda: {('0.5',): mqtt_publisher.ack_latency(50), ('0.99',): mqtt_publisher.ack_latency(99)},
+                      ('quantile',)))
+
+    if mqtt_subscriber:
+        metrics.add(Gauge('json_api_mqtt_received_changes_total', 'Changes received from the broker',
+                          lambda: mqtt_subscriber.received_changes, metric_type='counter'))
+        metrics.add(Gauge('json_api_mqtt_applied_changes_total', 'Changes received from the broker and applied',
+                          lambda: mqtt_subscriber.applied_changes, metric_type='counter'))
+        metrics.add(Gauge('json_api_mqtt_pending_changes', 'Changes received from the broker waiting to be applied',
+                          lambda: mqtt_subscriber.pending_changes))
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(metrics.render(), media_type=Metrics.content_type)
+
+
+def start_mqtt_subscriber() -> None:
+    """
+    Starts applying the changes received from the broker (the topic is subscribed when the client connects, or right
+    away if it is already connected)
+    """
+
+    global mqtt_subscriber
+    subscribe_config = CONFIG['mqtt']['subscribe']
+    mqtt_subscriber = MqttSubscriber(apply_mqtt_changes,
+                                     subscribe_config['queue_size'],
+                                     subscribe_config['batch_size'],
+                                     subscribe_config['batch_interval'])
+    mqtt_subscriber.start()
+    if mqtt_client.is_connected():
+        mqtt_client.subscribe(f'{MQTT_SUBSCRIBE_TOPIC_PREFIX}/#', subscribe_config['qos'])
+
+    logger.info(f'Applying changes received from the broker in \"{MQTT_SUBSCRIBE_TOPIC_PREFIX}/#\".')
+
+
+def replay_journal(json_file_key: str, json_file_path: Union[str, Path]) -> None:
+    """
+    Applies the operations of the journal of the JSON file that were not written to the file yet
+    :param json_file_key: "api.files" entry of the JSON file
+    :param json_file_path: Path to the JSON file
+    """
+
+    # the journal is replayed by only one of the workers
+    with document_cache.lock(json_file_key):
+        journal = Journal(json_file_path)
+        if not (operations := list(journal.operations())):
+            return
+
+        logger.info(f'Replaying {len(operations)} operation(s) from the journal of JSON file \"{json_file_path}\"...')
+        json_data = document_cache.get(json_file_key, json_file_path, JsonHandler.load_json_data)
+        for operation, json_path_parts, value in operations:
+            try:
+                json_data = JsonHandler.change_json_data(json_data, json_path_parts, operation, value)
+
+            except (KeyError, IndexError, ValueError) as operation_error:
+                logger.warning(f'Ignoring journal operation \"{operation}\" in JSON path {json_path_parts}: '
+                               f'{operation_error!r}')
+
+        journal_segment = journal.rotate()
+        JsonHandler.write_json_data(json_data, json_file_path, atomic=True, json_file_key=json_file_key,
+                                    before_replace=partial(journal.begin_compaction, journal_segment))
+        document_cache.set(json_file_key, json_file_path, json_data)
+        journal.compact(journal_segment)
+
+
+def reload_changed_file(json_file_key: str) -> None:
+    """
+    Reloads a JSON file changed outside the service, validates it and publishes the nodes that changed (called by the
+    file watcher). Changes made by the service are ignored, since the cached document is already the file content, and
+    files that violate the JSON schema are not reloaded.
+    :param json_file_key: "api.files" entry of the JSON file
+    """
+
+    json_file_data = CONFIG['api']['files'][json_file_key]
+    json_file_path = json_file_data['path']
+    stage_timer.request(json_file_key, 'WATCH')
+
+    with document_cache.lock(json_file_key):
+        if document_cache.is_current(json_file_key, json_file_path):
+            return
+
+        # files that are not loaded (ex: read with their path index) have no other state to refresh
+        path_indexes.invalidate(json_file_key)
+        if (previous_document := document_cache.document(json_file_key)) is None:
+            return
+
+        try:
+            json_data = document_cache.get(json_file_key, json_file_path, JsonHandler.load_json_data)
+            if json_file_data['schema']:
+                schema_validators.validate(json_file_key, json_file_data['schema'], json_data)
+
+        except FileNotFoundError:
+            logger.warning(f'JSON file "{json_file_path}" was removed outside the service')
+            return
+
+        except json.JSONDecodeError as json_decode_error:
+            logger.warning(f'JSON file "{json_file_path}" was changed outside the service and has invalid JSON: '
+                           f'{json_decode_error}')
+            return
+
+        except ValidationError as json_validation_error:
+            # the previous version is still served (and the file is replaced with it by the next change)
+            document_cache.set(json_file_key, json_file_path, previous_document.data)
+            logger.warning(f'JSON file "{json_file_path}" was changed outside the service and violates the '
+                           f'validations defined by the JSON schema, keeping the previous version: '
+                           f'{json_validation_error.message}')
+            return
+
+    logger.info(f'JSON file "{json_file_path}" was changed outside the service, reloaded it.')
+
+    # the changes of the other workers are published by them, and the workers can't tell them apart from changes made
+    # outside the service
+    if CONFIG['mqtt']['enabled'] and not WORKERS_COORDINATION:
+        JsonHandler.publish_changes(previous_document.data,
+                                    json_data,
+                                    [parse_json_pointer(operation['path'])
+                                     for operation in json_diff(previous_document.data, json_data)],
+                                    json_file_path,
+                                    path_depth=CONFIG['mqtt']['publish']['json_path_topic_depth'])
+
+
+def apply_mqtt_changes(json_file_key: str, json_operations: List[JournalOperation]) -> None:
+    """
+    Applies a batch of changes received from the broker to the JSON file, with the same operations of the requests.
+    The JSON file is validated, saved and published once for all the changes of the batch. Changes that can't be
+    applied (ex: a node that does not exist) are ignored, and if the batch violates the JSON schema, only the changes
+    that don't violate it are applied.
+    :param json_file_key: "api.files" entry of the JSON file
+    :param json_operations: list of (operation, path parts, value) of the changes
+    """
+
+    json_file_data = CONFIG['api']['files'][json_file_key]
+    json_file_path = json_file_data['path']
+    json_schema_file_path = json_file_data['schema'] if json_file_data['schema'] else None
+    stage_timer.request(json_file_key, 'MQTT')
+
+    def change(json_data: object, validate: bool = False) -> Tuple[object, List[JournalOperation]]:
+        applied_json_operations = list()
+        for operation, json_path_parts, value in json_operations:
+            try:
+                changed_json_data = JsonHandler.change_json_data(json_data, json_path_parts, operation, value)
+                if validate:
+                    schema_validators.validate(json_file_key, json_schema_file_path, changed_json_data)
+
+            except (KeyError, IndexError, ValueError, ValidationError) as operation_error:
+                logger.warning(f'Ignoring \"{operation}\" received from the broker in JSON path {json_path_parts}: '
+                               f'{operation_error!r}')
+                continue
+
+            json_data = changed_json_data
+            applied_json_operations.append((operation, json_path_parts, value))
+
+        return json_data, applied_json_operations
+
+    with document_cache.lock(json_file_key):
+        previous_json_data = document_cache.get(json_file_key, json_file_path, JsonHandler.load_json_data)
+        json_data, applied_json_operations = change(previous_json_data)
+        if not applied_json_operations:
+            return
+
+        try:
+            JsonHandler.save_json_data(json_data,
+                                       json_file_path,
+                                       json_schema_file_path,
+                                       json_file_key,
+                                       applied_json_operations,
+                                       previous_json_data)
+
+        except ValidationError:
+            # find the changes that violate the schema, validating the JSON data after each change
+            json_data, applied_json_operations = change(previous_json_data, validate=True)
+            if not applied_json_operations:
+                return
+
+            JsonHandler.save_json_data(json_data,
+                                       json_file_path,
+                                       json_schema_file_path,
+                                       json_file_key,
+                                       applied_json_operations,
+                                       previous_json_data)
+
+    if CONFIG['mqtt']['enabled']:
+        JsonHandler.publish_changes(previous_json_data,
+                                    json_data,
+                                    [json_path_parts for _, json_path_parts, _ in applied_json_operations],
+                                    json_file_path,
+                                    path_depth=CONFIG['mqtt']['publish']['json_path_topic_depth'])
+
+
+def shutdown():
+
+    # apply the changes received from the broker that are still queued
+    if mqtt_subscriber:
+        logger.info('Applying pending changes received from the broker...')
+        mqtt_client.unsubscribe(f'{MQTT_SUBSCRIBE_TOPIC_PREFIX}/#')
+        mqtt_subscriber.stop()
+
+    if leader_election:
+        leader_election.stop()
+
+    if file_watcher:
+        file_watcher.stop()
+
+    # publish the messages that are still queued
+    if CONFIG['mqtt']['enabled']:
+        logger.info('Publishing pending MQTT messages...')
+        mqtt_publisher.stop()
+        mqtt_client.loop_stop()
+
+    # write all the changes that are still in memory
+    if write_behind_flusher:
+        logger.info('Flushing pending changes to the JSON files...')
+        write_behind_flusher.stop()
+
+    thread_pool.shutdown()
 
 
 if __name__ == '__main__':
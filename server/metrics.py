@@ -0,0 +1,219 @@
+# python libs
+import math
+import time
+import threading
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple, Union
+
+# constants
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+LabelValues = Tuple[str, ...]
+
+
+class Metric:
+    """
+    Metric with a value for each combination of label values, exposed in the Prometheus text format
+    """
+
+    type = 'untyped'
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        """
+        :param name: metric name
+        :param description: metric description (HELP line)
+        :param labels: label names
+        """
+
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, float]]:
+        """
+        Returns the samples of the metric
+        :return: (sample name, label values, value) of each sample
+        """
+
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.type}']
+        for name, label_values, value in self.samples():
+            lines.append(f'{name}{self._render_labels(label_values)} {self._render_value(value)}')
+
+        return '\n'.join(lines)
+
+    def _render_labels(self, label_values: LabelValues, labels: Tuple[str, ...] = None) -> str:
+        labels = labels or self.labels
+        if not labels:
+            return ''
+
+        escaped_values = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                          for value in label_values)
+        return '{' + ','.join(f'{label}="{value}"' for label, value in zip(labels, escaped_values)) + '}'
+
+    @staticmethod
+    def _render_value(value: float) -> str:
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+
+        return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Gauge(Metric):
+    """
+    Metric whose values are read, when the metrics are exposed, from a function
+    """
+
+    type = 'gauge'
+
+    def __init__(self,
+                 name: str,
+                 description: str,
+                 function: Callable[[], Union[float, Dict[LabelValues, float]]],
+                 labels: Tuple[str, ...] = (),
+                 metric_type: str = 'gauge'):
+        """
+        :param function: function that returns the value of the metric, or the value of each combination of label
+        values if the metric has labels
+        :param metric_type: "gauge", or "counter" for values that only increase (ex: counters of other objects)
+        """
+
+        super().__init__(name, description, labels)
+        self._function = function
+        self.type = metric_type
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, float]]:
+        values = self._function()
+        if not self.labels:
+            values = {(): values}
+
+        for label_values, value in values.items():
+            yield self.name, label_values, value
+
+
+class Histogram(Metric):
+    """
+    Metric with the count of observed values in each bucket (values less than or equal to its upper bound), their count
+    and their sum
+    """
+
+    type = 'histogram'
+
+    def __init__(self,
+                 name: str,
+                 description: str,
+                 labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelValues, List[float]] = dict()  # count of each bucket, +Inf count and sum
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            if (values := self._values.get(label_values)) is None:
+                values = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+
+            values[bisect_left(self.buckets, value)] += 1
+            values[-1] += value
+
+    @contextmanager
+    def time(self, *label_values: str) -> Iterator[None]:
+        """
+        Observes the time, in seconds, spent in the block
+        :param label_values: label values of the observation
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, float]]:
+        with self._lock:
+            values = [(label_values, list(bucket_values)) for label_values, bucket_values in self._values.items()]
+
+        for label_values, bucket_values in values:
+            cumulative_count = 0
+            for bucket, count in zip(self.buckets + (math.inf,), bucket_values):
+                cumulative_count += count
+                yield f'{self.name}_bucket', label_values + (self._render_value(bucket),), cumulative_count
+
+            yield f'{self.name}_sum', label_values, bucket_values[-1]
+            yield f'{self.name}_count', label_values, cumulative_count
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.type}']
+        for name, label_values, value in self.samples():
+            labels = self.labels + ('le',) if name.endswith('_bucket') else self.labels
+            lines.append(f'{name}{self._render_labels(label_values, labels)} {self._render_value(value)}')
+
+        return '\n'.join(lines)
+
+
+class Metrics:
+    """
+    Registry of the metrics of the service
+    """
+
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = dict()
+
+    def add(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Returns all the metrics in the Prometheus text format
+        :return: metrics text
+        """
+
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+class StageTimer:
+    """
+    Observes the time spent in each stage of the requests in a histogram labeled by "api.files" entry, method and stage.
+    The entry and the method of the request handled by a thread are kept while it is being handled, so stages of
+    functions that don't know the request can be timed too (stages of other threads, like the write-behind flusher, are
+    labeled with the "background" method, unless they also set them).
+    """
+
+    def __init__(self, histogram: Histogram):
+        """
+        :param histogram: histogram with the "file", "method" and "stage" labels
+        """
+
+        self._histogram = histogram
+        self._local = threading.local()
+
+    def request(self, key: str, method: str) -> None:
+        """
+        Sets the "api.files" entry and the method of the stages timed by the current thread (the threads of the
+        thread pool set them at the beginning of each request)
+        :param key: "api.files" entry name
+        :param method: request method
+        """
+
+        self._local.labels = (key, method)
+
+    @contextmanager
+    def stage(self, stage: str, key: str = None) -> Iterator[None]:
+        """
+        Observes the time spent in the block
+        :param stage: stage name
+        :param key: "api.files" entry name (the one of the current request if not given)
+        """
+
+        request_key, method = getattr(self._local, 'labels', None) or ('', 'background')
+        with self._histogram.time(key or request_key, method, stage):
+            yield
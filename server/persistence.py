@@ -0,0 +1,188 @@
+# python libs
+import logging
+import threading
+
+from typing import Any, Callable, Dict, List, Optional, Union
+from pathlib import Path
+from functools import partial
+
+# project files
+from cache import DocumentCache
+from journal import Journal, JournalOperation
+
+# constants
+logger = logging.getLogger('uvicorn')
+
+
+class WriteBehindFlusher:
+    """
+    Writes the changed documents of the cache to their files in background.
+    Changes are kept in memory and all the changes made to a document are written at once, when the flush interval
+    expires or when the number of changes not written reaches the dirty threshold.
+    If the journal is enabled, the operations are also appended to the journal of the file before being kept in
+    memory, and each flush compacts the journal into the file.
+    """
+
+    def __init__(self,
+                 document_cache: DocumentCache,
+                 writer: Callable[[str, Any, Union[str, Path], Optional[Callable[[bytes], None]]], None],
+                 flush_interval: float,
+                 flush_dirty_threshold: int,
+                 journal: bool = False,
+                 journal_fsync: bool = True):
+        """
+        :param document_cache: cache where the changed documents are kept
+        :param writer: function used to write a document to its file, called with the "api.files" entry name, the
+        document, the file path and a function to call with the file content before replacing the file (None if
+        journal is not enabled, otherwise the file must be replaced)
+        :param flush_interval: maximum time, in seconds, that a change can wait to be written
+        :param flush_dirty_threshold: number of changes not written that triggers a flush before the interval expires
+        :param journal: append the operations to the journal of the file before keeping them in memory
+        :param journal_fsync: force each operation appended to the journal to be written to disk
+        """
+
+        self._document_cache = document_cache
+        self._writer = writer
+        self._flush_interval = flush_interval
+        self._flush_dirty_threshold = flush_dirty_threshold
+        self._journal = journal
+        self._journal_fsync = journal_fsync
+
+        self._journals: Dict[str, Journal] = dict()
+        self._file_paths: Dict[str, Union[str, Path]] = dict()
+        self._dirty_changes: Dict[str, int] = dict()
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='write-behind-flusher', daemon=True)
+
+        # counters
+        self.flushes = 0
+        self.flushed_changes = 0
+        self.flush_errors = 0
+
+    @property
+    def pending_changes(self) -> int:
+        return sum(self._dirty_changes.values())
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the background flush and writes all the pending changes
+        """
+
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify()
+
+        if self._thread.is_alive():
+            self._thread.join()
+
+        self.flush()
+
+    def queue(self,
+              key: str,
+              file_path: Union[str, Path],
+              data: Any,
+              operations: List[JournalOperation] = None) -> None:
+        """
+        Keeps the changed document in memory until it is written by the next flush
+        :param key: "api.files" entry name
+        :param file_path: Path to the JSON file
+        :param data: changed JSON document object
+        :param operations: list of (operation, path parts, value) that changed the document, to append to the journal
+        Raise OSError if the operations cannot be appended to the journal (the document is not changed)
+        """
+
+        with self._document_cache.lock(key):
+            if self._journal:
+                self._get_journal(key, file_path).append(operations or [])
+
+            self._document_cache.set(key, file_path, data, dirty=True)
+
+        with self._condition:
+            self._file_paths[key] = file_path
+            self._dirty_changes[key] = self._dirty_changes.get(key, 0) + 1
+
+            if self.pending_changes >= self._flush_dirty_threshold:
+                self._condition.notify()
+
+    def flush(self, key: str = None) -> int:
+        """
+        Writes the changed documents to their files
+        :param key: "api.files" entry name of the document to write (all changed documents if not given)
+        :return: number of changes written
+        """
+
+        flushed_changes = 0
+        for key in [key] if key else list(self._dirty_changes):
+            with self._document_cache.lock(key):
+                with self._condition:
+                    changes = self._dirty_changes.pop(key, 0)
+                    file_path = self._file_paths.get(key)
+
+                document = self._document_cache.document(key)
+
+                # new operations are appended to the next segment of the journal while the document is written
+                journal_segment = self._journals[key].rotate() if changes and key in self._journals else None
+
+            if not changes or not document or not document.dirty:
+                continue
+
+            # the cached documents are never changed in place, so the document can be written without holding the
+            # lock while new changes are being made
+            logger.debug(f'Writing {changes} change(s) to JSON file {file_path}...')
+            try:
+                before_replace = None
+                if journal_segment is not None:
+                    before_replace = partial(self._journals[key].begin_compaction, journal_segment)
+
+                self._writer(key, document.data, file_path, before_replace)
+
+                if journal_segment is not None:
+                    self._journals[key].compact(journal_segment)
+
+            except OSError as os_error:
+                logger.error(f'Error occurred while writing changes to JSON file \"{file_path}\":', exc_info=os_error)
+
+                # keep the changes to be written in the next flush
+                with self._condition:
+                    self._dirty_changes[key] = self._dirty_changes.get(key, 0) + changes
+
+                self.flush_errors += 1
+                continue
+
+            with self._document_cache.lock(key):
+                # only mark the document as written if it didn't change during the write
+                if self._document_cache.document(key) is document:
+                    self._document_cache.set(key, file_path, document.data)
+
+            self.flushes += 1
+            self.flushed_changes += changes
+            flushed_changes += changes
+
+        return flushed_changes
+
+    def _get_journal(self, key: str, file_path: Union[str, Path]) -> Journal:
+        if key not in self._journals:
+            # the file has all the operations of previous journals (replayed at startup), so start a new one
+            self._journals[key] = Journal(file_path, self._journal_fsync)
+            self._journals[key].reset()
+
+        return self._journals[key]
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._stopped.is_set() or self.pending_changes >= self._flush_dirty_threshold,
+                    timeout=self._flush_interval)
+
+            flush_errors = self.flush_errors
+            self.flush()
+
+            # failed changes are kept dirty, so they would reach the threshold again right away: wait for the interval
+            # before writing them again
+            if self.flush_errors > flush_errors:
+                self._stopped.wait(self._flush_interval)
@@ -0,0 +1,285 @@
+# external libs
+from paho.mqtt.client import Client, MQTT_ERR_NO_CONN, MQTT_ERR_SUCCESS
+
+# python libs
+import time
+import logging
+import threading
+
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Set, Union
+
+# constants
+logger = logging.getLogger('uvicorn')
+
+ACK_LATENCY_SAMPLES = 1000
+
+Payload = Union[bytes, Callable[[], bytes], None]  # payload, or function that encodes it when it is published
+
+
+class MqttMessage:
+
+    __slots__ = ('topic', 'payload', 'retain', 'queued_at', 'due_at')
+
+    def __init__(self, topic: str, payload: Payload, retain: bool, due_at: float = 0):
+        self.topic = topic
+        self.payload = payload
+        self.retain = retain
+        self.queued_at = time.perf_counter()
+        self.due_at = due_at
+
+
+class MqttPublisher:
+    """
+    Publishes the messages to the broker in background, so requests never wait for the broker.
+    Messages are kept in a bounded queue until the client is connected and there is room in the in-flight window
+    (messages sent but not acknowledged by the broker yet), so messages queued while the client is disconnected are
+    published after it reconnects. A retained message replaces the queued retained message of the same topic (only the
+    last state of a topic is published), and the oldest message is dropped when the queue is full.
+    Retained messages can also be throttled: they are delayed until a minimum interval after the previous message of the
+    same topic, and only the last one is published.
+    """
+
+    def __init__(self, client: Client, queue_size: int, qos: int = 0, max_in_flight: int = 20):
+        """
+        :param client: MQTT client used to publish the messages (its network loop must be running)
+        :param queue_size: maximum number of messages waiting to be published
+        :param qos: quality of service of the published messages
+        :param max_in_flight: maximum number of messages sent but not acknowledged by the broker (QoS 1 and 2) or not
+        written to the network yet (QoS 0)
+        """
+
+        self._client = client
+        self._queue_size = queue_size
+        self._qos = qos
+        self._max_in_flight = max_in_flight
+
+        self._queue: Deque[MqttMessage] = deque()
+        self._retained: Dict[str, MqttMessage] = dict()  # queued retained message of each topic
+        self._delayed: Dict[str, MqttMessage] = dict()  # throttled retained message of each topic
+        self._last_queued: Dict[str, float] = dict()  # time the last retained message of each topic was queued
+        self._in_flight: Dict[int, MqttMessage] = dict()  # by message id
+        self._early_acks: Set[int] = set()  # messages acknowledged before being added to the in-flight window
+        self._ack_latencies: Deque[float] = deque(maxlen=ACK_LATENCY_SAMPLES)
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='mqtt-publisher', daemon=True)
+
+        # counters
+        self.published_messages = 0
+        self.replaced_messages = 0
+        self.suppressed_messages = 0
+        self.dropped_messages = 0
+        self.publish_errors = 0
+
+    @property
+    def pending_messages(self) -> int:
+        return len(self._queue) + len(self._delayed)
+
+    @property
+    def in_flight_messages(self) -> int:
+        return len(self._in_flight)
+
+    def ack_latency(self, percent: float) -> float:
+        """
+        Returns the percentile of the time, in seconds, between queueing a message and its acknowledgement, of the last
+        acknowledged messages
+        :param percent: percentile to return (ex: 99)
+        :return: latency percentile
+        """
+
+        latencies = sorted(self._ack_latencies)
+        if not latencies:
+            return 0.0
+
+        return latencies[min(len(latencies) - 1, max(0, round(percent / 100 * len(latencies)) - 1))]
+
+    def start(self) -> None:
+        self._client.max_inflight_messages_set(self._max_in_flight)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        """
+        Stops the background publishing, after waiting for the queued messages (including the throttled ones) to be
+        published
+        :param timeout: maximum time, in seconds, to wait for the queued messages to be published
+        """
+
+        with self._condition:
+            for message in self._delayed.values():
+                message.due_at = 0
+
+            self._condition.notify_all()
+            if self._client.is_connected():
+                self._condition.wait_for(lambda: not self.pending_messages and not self._in_flight, timeout=timeout)
+
+            if self.pending_messages or self._in_flight:
+                logger.warning(f'{self.pending_messages + len(self._in_flight)} MQTT message(s) were not published')
+
+            self._stopped.set()
+            self._condition.notify_all()
+
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def publish(self, topic: str, payload: Payload, retain: bool = True, min_interval: float = 0) -> None:
+        """
+        Queues the message to be published
+        :param topic: message topic
+        :param payload: message payload, or function that returns it (called in background, only if the message is
+        published). None publishes an empty message, that clears the retained message
+        :param retain: retain the message in the broker
+        :param min_interval: minimum time, in seconds, between retained messages of the topic (the message is delayed,
+        and replaced by the next messages of the topic, until then)
+        Raise ValueError if the topic is not valid to publish
+        """
+
+        if not topic or '+' in topic or '#' in topic:
+            raise ValueError(f'Invalid topic \"{topic}\" to publish')
+
+        with self._condition:
+            if retain and (message := self._retained.get(topic, self._delayed.get(topic))) is not None:
+                # a message that is not throttled is not delayed by a previous throttled message
+                if not min_interval and message is self._delayed.get(topic):
+                    del self._delayed[topic]
+
+                else:
+                    message.payload = payload
+                    self.replaced_messages += 1
+                    return
+
+            if retain and min_interval and \
+                    (due_at := self._last_queued.get(topic, -min_interval) + min_interval) > time.perf_counter():
+                self._delayed[topic] = MqttMessage(topic, payload, retain, due_at)
+                self._condition.notify_all()
+                return
+
+            self._queue_message(MqttMessage(topic, payload, retain))
+
+    def suppressed(self) -> None:
+        """
+        Counts a message that was not queued because it is identical to the last message of its topic
+        """
+
+        with self._condition:
+            self.suppressed_messages += 1
+
+    def connected(self) -> None:
+        """
+        Resumes the publishing after the client (re)connects (called from the "on_connect" callback of the client).
+        QoS 0 messages not written to the network are discarded by the client when it reconnects, so they are queued
+        to be published again.
+        """
+
+        with self._condition:
+            if self._qos == 0:
+                for message in reversed(list(self._in_flight.values())):
+                    # a retained message is not published again if a newer message of its topic is queued
+                    if not (message.retain and message.topic in self._retained):
+                        self._queue.appendleft(message)
+                        if message.retain:
+                            self._retained[message.topic] = message
+
+                self._in_flight.clear()
+                self._early_acks.clear()
+
+            self._condition.notify_all()
+
+    def acknowledged(self, mid: int) -> None:
+        """
+        Removes the message from the in-flight window (called from the "on_publish" callback of the client)
+        :param mid: message id
+        """
+
+        with self._condition:
+            if (message := self._in_flight.pop(mid, None)) is None:
+                self._early_acks.add(mid)
+                return
+
+            self._ack_latencies.append(time.perf_counter() - message.queued_at)
+            self.published_messages += 1
+            self._condition.notify_all()
+
+    def _queue_message(self, message: MqttMessage) -> None:
+        # must be called with the condition lock
+        if len(self._queue) >= self._queue_size:
+            dropped_message = self._queue.popleft()
+            if self._retained.get(dropped_message.topic) is dropped_message:
+                del self._retained[dropped_message.topic]
+
+            self.dropped_messages += 1
+            logger.warning(f'MQTT publish queue is full, dropping the message to \"{dropped_message.topic}\"')
+
+        self._queue.append(message)
+        if message.retain:
+            self._retained[message.topic] = message
+            self._last_queued[message.topic] = time.perf_counter()
+
+        self._condition.notify_all()
+
+    def _queue_delayed_messages(self) -> float:
+        # must be called with the condition lock, returns the time until the next delayed message is due
+        now = time.perf_counter()
+        for topic, message in list(self._delayed.items()):
+            if message.due_at <= now:
+                del self._delayed[topic]
+                self._queue_message(message)
+
+        return min((message.due_at - now for message in self._delayed.values()), default=1)
+
+    def _next_message(self) -> Optional[MqttMessage]:
+        # waits until a message can be published (returns None when stopped)
+        with self._condition:
+            while not self._stopped.is_set():
+                next_due = self._queue_delayed_messages()
+                if self._queue and len(self._in_flight) < self._max_in_flight and self._client.is_connected():
+                    message = self._queue.popleft()
+                    if self._retained.get(message.topic) is message:
+                        del self._retained[message.topic]
+
+                    return message
+
+                self._condition.wait(timeout=min(1, max(0.0, next_due)))
+
+            return None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            if (message := self._next_message()) is None:
+                continue
+
+            try:
+                if callable(message.payload):
+                    message.payload = message.payload()
+
+                message_info = self._client.publish(message.topic, message.payload, self._qos, message.retain)
+
+            except (RuntimeError, TypeError, ValueError) as publish_error:
+                logger.error(f'Error occurred while publishing to \"{message.topic}\":', exc_info=publish_error)
+                self.publish_errors += 1
+                continue
+
+            with self._condition:
+                if message_info.rc == MQTT_ERR_NO_CONN and self._qos == 0:
+                    # the client disconnected, QoS 0 messages are not kept by the client, so publish it again later
+                    if not (message.retain and message.topic in self._retained):
+                        self._queue.appendleft(message)
+                        if message.retain:
+                            self._retained[message.topic] = message
+
+                    continue
+
+                if message_info.rc not in [MQTT_ERR_SUCCESS, MQTT_ERR_NO_CONN]:
+                    logger.error(f'Error occurred while publishing to \"{message.topic}\": rc {message_info.rc}')
+                    self.publish_errors += 1
+                    continue
+
+                # QoS 1 and 2 messages are kept by the client and sent again when it reconnects
+                if message_info.mid in self._early_acks:
+                    self._early_acks.discard(message_info.mid)
+                    self._ack_latencies.append(time.perf_counter() - message.queued_at)
+                    self.published_messages += 1
+                    self._condition.notify_all()
+
+                else:
+                    self._in_flight[message_info.mid] = message
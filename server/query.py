@@ -0,0 +1,526 @@
+# external libs
+from starlette.datastructures import QueryParams
+
+# python libs
+import re
+import json
+import base64
+import threading
+
+from bisect import bisect_left, insort
+from itertools import chain
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+# project files
+from journal import JournalOperation
+from json_patch import json_equal
+
+# constants
+WHERE_PATTERN = re.compile(r'^(?P<field>[^=!<>]+)(?P<operator>==|!=|>=|<=|>|<)(?P<value>.*)$', re.DOTALL)
+MISSING = object()
+QUERY_PARAMETERS = ['where', 'offset', 'limit', 'cursor', 'fields', 'depth']
+
+
+class WhereCondition:
+    """
+    Condition of the "where" query parameter, matched against a field of the items of a list
+    (ex: "id==42", "address/city!=Lisbon", "price>=10")
+    """
+
+    __slots__ = ('field', 'operator', 'value')
+
+    def __init__(self, field: List[str], operator: str, value: Any):
+        self.field = field
+        self.operator = operator
+        self.value = value
+
+    @classmethod
+    def parse(cls, expression: str) -> 'WhereCondition':
+        """
+        Parses a condition: a field path (parts separated by "/"), an operator ("==", "!=", ">=", "<=", ">" or "<")
+        and a value, decoded as JSON if it is valid JSON, otherwise used as a string
+        :param expression: condition expression (ex: "id==42")
+        :return: condition
+        Raise ValueError if the expression is not a valid condition
+        """
+
+        if (match := WHERE_PATTERN.match(expression)) is None:
+            raise ValueError(f'Invalid condition \"{expression}\", expected <field><operator><value> with one of the '
+                             f'operators ==, !=, >=, <=, > or <')
+
+        field = match['field'].strip('/').split('/')
+        if not all(field):
+            raise ValueError(f'Invalid field \"{match["field"]}\" in condition \"{expression}\"')
+
+        try:
+            value = json.loads(match['value'])
+
+        except json.JSONDecodeError:
+            value = match['value']
+
+        if match['operator'] not in ['==', '!='] and \
+                (isinstance(value, bool) or not isinstance(value, (int, float, str))):
+            raise ValueError(f'Invalid value in condition \"{expression}\", only numbers and strings can be compared '
+                             f'with \"{match["operator"]}\"')
+
+        return cls(field, match['operator'], value)
+
+    def matches(self, item: Any) -> bool:
+        """
+        Checks if the field of the item matches the condition (items without the field never match; numbers are only
+        compared to numbers and strings to strings)
+        :param item: list item
+        :return: True if the item matches
+        """
+
+        if (field_value := field_value_of(item, self.field)) is MISSING:
+            return False
+
+        if self.operator == '==':
+            return json_equal(field_value, self.value)
+
+        if self.operator == '!=':
+            return not json_equal(field_value, self.value)
+
+        if isinstance(self.value, str):
+            if not isinstance(field_value, str):
+                return False
+
+        elif isinstance(field_value, bool) or not isinstance(field_value, (int, float)):
+            return False
+
+        if self.operator == '>=':
+            return field_value >= self.value
+
+        if self.operator == '<=':
+            return field_value <= self.value
+
+        if self.operator == '>':
+            return field_value > self.value
+
+        return field_value < self.value
+
+
+def field_value_of(item: Any, field: List[str]) -> Any:
+    """
+    Returns the value of a field of an item (MISSING if the item doesn't have the field)
+    :param item: list item
+    :param field: field path parts
+    :return: field value
+    """
+
+    for part in field:
+        if isinstance(item, dict) and part in item:
+            item = item[part]
+
+        elif isinstance(item, list) and part.isdigit() and int(part) < len(item):
+            item = item[int(part)]
+
+        else:
+            return MISSING
+
+    return item
+
+
+def index_key(value: Any) -> Optional[Hashable]:
+    """
+    Returns the key of a value in the secondary indexes: equal values (see json_equal) have the same key
+    :param value: field value
+    :return: index key (None for values that are not indexed, like objects and lists)
+    """
+
+    if isinstance(value, bool):
+        return 'bool', value
+
+    if isinstance(value, (int, float)):
+        return 'number', value
+
+    if isinstance(value, str):
+        return 'string', value
+
+    if value is None:
+        return 'null', None
+
+    return None
+
+
+class ListIndex:
+
+    def __init__(self, items: list, field: List[str]):
+        self.items = items  # list the positions are of (indexes are rebuilt when another list is used)
+        self.field = field
+        self.positions: Dict[Hashable, List[int]] = dict()
+
+        for position, item in enumerate(items):
+            self.add(position, item)
+
+    def add(self, position: int, item: Any) -> None:
+        if (key := index_key(field_value_of(item, self.field))) is not None:
+            insort(self.positions.setdefault(key, list()), position)
+
+    def remove(self, position: int, item: Any) -> None:
+        if (key := index_key(field_value_of(item, self.field))) is None or key not in self.positions:
+            return
+
+        positions = self.positions[key]
+        if (i := bisect_left(positions, position)) < len(positions) and positions[i] == position:
+            del positions[i]
+            if not positions:
+                del self.positions[key]
+
+
+class SecondaryIndexes:
+    """
+    Indexes of the values of fields of the items of list nodes, declared per "api.files" entry, used to find the items
+    that match "==" conditions without scanning the list.
+    An index is built the first time it is used for a list, and is updated with the changed items when changes made
+    through the API only change, append or remove the last items of the list. Any other change (ex: an item inserted
+    in the middle, the list replaced, or the file changed outside the API) builds it again the next time it is used.
+    """
+
+    def __init__(self):
+        self._declared: Dict[str, Dict[Tuple[str, ...], List[List[str]]]] = dict()  # fields of each list, per entry
+        self._indexes: Dict[Tuple[str, Tuple[str, ...], Tuple[str, ...]], ListIndex] = dict()
+        self._lock = threading.Lock()
+
+        # counters
+        self.builds = 0
+        self.updates = 0
+        self.lookups = 0
+
+    def declare(self, key: str, indexes: Dict[str, List[str]]) -> None:
+        """
+        Declares the indexes of an "api.files" entry
+        :param key: "api.files" entry name
+        :param indexes: fields (paths with parts separated by "/") indexed in each list node (JSON pointer)
+        """
+
+        self._declared[key] = {
+            tuple(part for part in list_path.split('/') if part): [field.strip('/').split('/') for field in fields]
+            for list_path, fields in indexes.items()
+        }
+
+    def is_indexed(self, key: str, list_path: List[str], field: List[str]) -> bool:
+        return field in self._declared.get(key, dict()).get(tuple(list_path), [])
+
+    def lookup(self, key: str, list_path: List[str], items: list, condition: WhereCondition) -> Optional[List[int]]:
+        """
+        Returns the positions of the items of the list whose field is equal to the value of the condition
+        :param key: "api.files" entry name
+        :param list_path: path parts, in the JSON, to the list
+        :param items: list node (of the document being read)
+        :param condition: "==" condition of an indexed field
+        :return: positions of the matching items, in order (None if the value can't be looked up in the index)
+        """
+
+        if (value_key := index_key(condition.value)) is None:
+            return None
+
+        index_id = (key, tuple(list_path), tuple(condition.field))
+        with self._lock:
+            index = self._indexes.get(index_id)
+            if index is None or index.items is not items:
+                index = self._indexes[index_id] = ListIndex(items, condition.field)
+                self.builds += 1
+
+            self.lookups += 1
+            return list(index.positions.get(value_key, []))
+
+    def update(self,
+               key: str,
+               previous_json_data: Any,
+               json_data: Any,
+               json_operations: List[JournalOperation]) -> None:
+        """
+        Updates the indexes of the lists changed by the operations (or discards them, to be built again)
+        :param key: "api.files" entry name
+        :param previous_json_data: JSON data object before the operations
+        :param json_data: JSON data object after the operations
+        :param json_operations: list of (operation, path parts, value) that changed the data
+        """
+
+        for list_path, fields in self._declared.get(key, dict()).items():
+            previous_items = field_value_of(previous_json_data, list(list_path))
+            items = field_value_of(json_data, list(list_path))
+            if items is previous_items:
+                continue
+
+            changed_positions = self._changed_positions(list_path, previous_items, items, json_operations)
+            with self._lock:
+                for field in fields:
+                    index_id = (key, list_path, tuple(field))
+                    index = self._indexes.get(index_id)
+                    if index is None or index.items is not previous_items:
+                        continue
+
+                    if changed_positions is None:
+                        del self._indexes[index_id]
+                        continue
+
+                    for position in changed_positions:
+                        if position < len(previous_items):
+                            index.remove(position, previous_items[position])
+
+                        if position < len(items):
+                            index.add(position, items[position])
+
+                    index.items = items
+                    self.updates += 1
+
+    @staticmethod
+    def _changed_positions(list_path: Tuple[str, ...],
+                           previous_items: Any,
+                           items: Any,
+                           json_operations: List[JournalOperation]) -> Optional[List[int]]:
+        # positions of the items changed by the operations, None if the positions of the other items may have changed
+        if not isinstance(previous_items, list) or not isinstance(items, list):
+            return None
+
+        changed_positions = set()
+        length = len(previous_items)
+        for operation, json_path_parts, _ in json_operations:
+            if tuple(json_path_parts[:len(list_path)]) != list_path:
+                # a parent of the list was changed
+                if tuple(json_path_parts) == list_path[:len(json_path_parts)]:
+                    return None
+
+                continue
+
+            relative_path = json_path_parts[len(list_path):]
+            operation = operation.lower()
+            if not relative_path:
+                # POST and PUT requests to a list append the value to it
+                if operation not in ['post', 'put']:
+                    return None
+
+                changed_positions.add(length)
+                length += 1
+                continue
+
+            position = relative_path[0]
+            if position == '-' and operation == 'add' and len(relative_path) == 1:
+                changed_positions.add(length)
+                length += 1
+                continue
+
+            if not position.isdigit():
+                return None
+
+            position = int(position)
+            if len(relative_path) > 1 or operation == 'replace':
+                changed_positions.add(position)
+
+            elif operation in ['post', 'put']:
+                # items that are lists are moved to the beginning of the list (see get_set_json_value_by_path)
+                if position < len(previous_items) and isinstance(previous_items[position], list):
+                    return None
+
+                changed_positions.add(position)
+
+            elif operation == 'add' and position == length:
+                changed_positions.add(length)
+                length += 1
+
+            elif operation in ['delete', 'remove'] and position == length - 1:
+                changed_positions.add(position)
+                length -= 1
+
+            else:
+                return None
+
+        return sorted(changed_positions) if length == len(items) else None
+
+
+def filter_items(items: list, conditions: List[WhereCondition], positions: Optional[List[int]] = None) -> list:
+    """
+    Returns the items of the list that match all the conditions, in the same order
+    :param items: list node
+    :param conditions: conditions to match
+    :param positions: positions of the only items that can match (ex: found with a secondary index)
+    :return: matching items
+    """
+
+    candidates = items if positions is None else (items[position] for position in positions)
+    return [item for item in candidates if all(condition.matches(item) for condition in conditions)]
+
+
+class NodeQuery:
+    """
+    Query parameters of a GET request that select what is returned of the node: the "where" conditions the items of a
+    list node must match, the page of the (matching) items, given by "offset" and "limit" or by a "cursor" returned in
+    the "X-Next-Cursor" header of the previous page, the "fields" of the objects and the "depth" of the returned value
+    """
+
+    def __init__(self,
+                 where: List[WhereCondition] = None,
+                 offset: Optional[int] = None,
+                 limit: Optional[int] = None,
+                 fields: List[List[str]] = None,
+                 depth: Optional[int] = None):
+        self.where = where or []
+        self.offset = offset
+        self.limit = limit
+        self.fields = fields or []
+        self.depth = depth
+        self.key: Tuple[Tuple[str, str], ...] = tuple()  # parameters of the query, identify the returned value
+
+    @classmethod
+    def parse(cls, query_params: QueryParams) -> 'NodeQuery':
+        """
+        Parses the query parameters of a request
+        :param query_params: query parameters of the request
+        :return: query
+        Raise ValueError if a parameter is not valid
+        """
+
+        where = [WhereCondition.parse(expression) for expression in query_params.getlist('where')]
+        offset = cls._parse_count(query_params, 'offset')
+        limit = cls._parse_count(query_params, 'limit')
+
+        if (cursor := query_params.get('cursor')) is not None:
+            if offset is not None:
+                raise ValueError('Parameters \"cursor\" and \"offset\" cannot be used together')
+
+            offset, cursor_limit = cls.decode_cursor(cursor)
+            limit = cursor_limit if limit is None else limit
+
+        fields = list()
+        for field in chain.from_iterable(fields.split(',') for fields in query_params.getlist('fields')):
+            if not all(field_parts := field.strip('/').split('/')):
+                raise ValueError(f'Invalid field \"{field}\" in \"fields\"')
+
+            fields.append(field_parts)
+
+        query = cls(where, offset, limit, fields, cls._parse_count(query_params, 'depth'))
+        query.key = tuple((name, value) for name, value in query_params.multi_items() if name in QUERY_PARAMETERS)
+        return query
+
+    @staticmethod
+    def _parse_count(query_params: QueryParams, name: str) -> Optional[int]:
+        if (value := query_params.get(name)) is None:
+            return None
+
+        if not value.isascii() or not value.isdigit():
+            raise ValueError(f'Invalid \"{name}\" \"{value}\", expected a non-negative integer')
+
+        return int(value)
+
+    @staticmethod
+    def encode_cursor(offset: int, limit: int) -> str:
+        return base64.urlsafe_b64encode(json.dumps([offset, limit]).encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[int, int]:
+        """
+        Decodes a cursor returned by encode_cursor
+        :param cursor: cursor
+        :return: offset and limit of the page
+        Raise ValueError if the cursor is not valid
+        """
+
+        try:
+            offset, limit = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+
+        except (ValueError, TypeError):
+            raise ValueError(f'Invalid \"cursor\" \"{cursor}\"')
+
+        if not all(isinstance(value, int) and not isinstance(value, bool) and value >= 0 for value in [offset, limit]):
+            raise ValueError(f'Invalid \"cursor\" \"{cursor}\"')
+
+        return offset, limit
+
+    @property
+    def is_paginated(self) -> bool:
+        return self.offset is not None or self.limit is not None
+
+    @property
+    def selects_items(self) -> bool:
+        return bool(self.where) or self.is_paginated
+
+    def __bool__(self) -> bool:
+        return self.selects_items or bool(self.fields) or self.depth is not None
+
+    def page(self, items: list) -> Tuple[list, Dict[str, str]]:
+        """
+        Returns the page of the items and the headers of the response: "X-Total-Count", with the number of items, and
+        "X-Next-Cursor", with the cursor of the next page (only if there are more items)
+        :param items: list items (matching the "where" conditions)
+        :return: items of the page and response headers
+        """
+
+        offset = self.offset or 0
+        end = len(items) if self.limit is None else offset + self.limit
+        headers = {'X-Total-Count': str(len(items))}
+        if end < len(items) and self.limit:
+            headers['X-Next-Cursor'] = self.encode_cursor(end, self.limit)
+
+        return items[offset:end], headers
+
+
+def field_tree(fields: List[List[str]]) -> Dict[str, Any]:
+    """
+    Returns the tree of the fields: the sub-fields of each field (None if the whole field is selected)
+    :param fields: field paths parts (ex: [['name'], ['address', 'city']])
+    :return: tree of the fields (ex: {'name': None, 'address': {'city': None}})
+    """
+
+    tree = dict()
+    for field in fields:
+        node = tree
+        for part in field[:-1]:
+            if (node := node.setdefault(part, dict())) is None:
+                break  # the whole parent field is already selected
+
+        else:
+            node[field[-1]] = None
+
+    return tree
+
+
+def project(json_data: Any, fields: Optional[Dict[str, Any]]) -> Any:
+    """
+    Returns the value with only the selected fields of its objects (the fields of each item, in lists). Fields that
+    don't exist are left out and values that are not objects or lists are returned as they are. Only the selected
+    values are walked, and they are not copied.
+    :param json_data: JSON value
+    :param fields: tree of the selected fields (see field_tree), None to select the whole value
+    :return: projected value
+    """
+
+    if fields is None:
+        return json_data
+
+    if isinstance(json_data, list):
+        return [project(item, fields) for item in json_data]
+
+    if isinstance(json_data, dict):
+        # whole fields are not walked
+        return {key: json_data[key] if sub_fields is None else project(json_data[key], sub_fields)
+                for key, sub_fields in fields.items() if key in json_data}
+
+    return json_data
+
+
+def truncate(json_data: Any, depth: int) -> Any:
+    """
+    Returns the value with the objects and lists deeper than the depth replaced by stubs: {"$keys": [<keys>]} for
+    objects and {"$count": <number of items>} for lists. Values under the stubs are never walked.
+    :param json_data: JSON value
+    :param depth: number of levels of the value to return (0 returns the stub of the value)
+    :return: truncated value
+    """
+
+    if isinstance(json_data, dict):
+        if not depth:
+            return {'$keys': list(json_data)}
+
+        return {key: truncate(value, depth - 1) if isinstance(value, (dict, list)) else value
+                for key, value in json_data.items()}
+
+    if isinstance(json_data, list):
+        if not depth:
+            return {'$count': len(json_data)}
+
+        return [truncate(item, depth - 1) if isinstance(item, (dict, list)) else item for item in json_data]
+
+    return json_data
@@ -0,0 +1,125 @@
+# python libs
+import logging
+import threading
+
+from collections import deque
+from typing import Callable, Deque, List, Tuple
+
+# project files
+from journal import JournalOperation
+
+# constants
+logger = logging.getLogger('uvicorn')
+
+
+class MqttSubscriber:
+    """
+    Applies the changes received from the broker to the JSON files in background, in batches: the changes of a file
+    that are queued while the previous batch is being applied (up to the batch size) are applied together, so each
+    batch is validated, saved and published once.
+    The queue is bounded, so when it is full the client stops reading messages from the broker until there is room.
+    """
+
+    def __init__(self,
+                 apply: Callable[[str, List[JournalOperation]], None],
+                 queue_size: int,
+                 batch_size: int,
+                 batch_interval: float = 0):
+        """
+        :param apply: function used to apply a batch of changes, called with the "api.files" entry name and the list of
+        (operation, path parts, value) of the batch
+        :param queue_size: maximum number of changes waiting to be applied
+        :param batch_size: maximum number of changes applied together
+        :param batch_interval: time, in seconds, to wait for more changes after the first change of a batch
+        """
+
+        self._apply = apply
+        self._queue_size = queue_size
+        self._batch_size = batch_size
+        self._batch_interval = batch_interval
+
+        self._queue: Deque[Tuple[str, JournalOperation]] = deque()
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='mqtt-subscriber', daemon=True)
+
+        # counters
+        self.received_changes = 0
+        self.applied_changes = 0
+        self.applied_batches = 0
+        self.apply_errors = 0
+
+    @property
+    def pending_changes(self) -> int:
+        return len(self._queue)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the background apply, after applying all the queued changes
+        """
+
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+
+        if self._thread.is_alive():
+            self._thread.join()
+
+        while self._queue:
+            self._apply_next_batch()
+
+    def queue(self, key: str, operation: JournalOperation) -> None:
+        """
+        Queues the change to be applied (waits while the queue is full)
+        :param key: "api.files" entry name
+        :param operation: (operation, path parts, value) of the change
+        """
+
+        with self._condition:
+            self._condition.wait_for(lambda: len(self._queue) < self._queue_size or self._stopped.is_set())
+            self._queue.append((key, operation))
+            self.received_changes += 1
+            self._condition.notify_all()
+
+    def _apply_next_batch(self) -> None:
+        # applies the first queued changes of the file of the first queued change
+        with self._condition:
+            key = self._queue[0][0]
+            operations = list()
+            remaining_changes = deque()
+            while self._queue and len(operations) < self._batch_size:
+                change_key, operation = self._queue.popleft()
+                if change_key == key:
+                    operations.append(operation)
+
+                else:
+                    remaining_changes.append((change_key, operation))
+
+            self._queue.extendleft(reversed(remaining_changes))
+            self._condition.notify_all()
+
+        try:
+            self._apply(key, operations)
+            self.applied_changes += len(operations)
+            self.applied_batches += 1
+
+        except Exception as apply_error:
+            logger.error(f'Error occurred while applying {len(operations)} change(s) received from the broker:',
+                         exc_info=apply_error)
+            self.apply_errors += 1
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            with self._condition:
+                if not self._condition.wait_for(lambda: self._queue or self._stopped.is_set(), timeout=1) or \
+                        self._stopped.is_set():
+                    continue
+
+            # wait for more changes to be applied in the same batch
+            if self._batch_interval:
+                self._stopped.wait(self._batch_interval)
+
+            self._apply_next_batch()
@@ -1,11 +1,23 @@
 from unittest import TestCase
 
-from httpx import Client, Request
+from httpx import Client, Limits, Request, TransportError
+from paho.mqtt.client import Client as MqttClient, MQTTMessageInfo, MQTT_ERR_SUCCESS
 
+import sys
 import json
+import time
+import socket
+import subprocess
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from shutil import copy2
+from tempfile import TemporaryDirectory
+
+from benchmarks.broker import MqttBroker
+from cache import DocumentCache
+from persistence import WriteBehindFlusher
+from publisher import MqttPublisher
 
 
 class TestJsonHandler(TestCase):
@@ -110,6 +122,159 @@ class TestJsonHandler(TestCase):
         except Exception as e:
             self.fail(e)
 
+    def test_read_node_value_after_file_change(self):
+        try:
+            with Client() as client:
+                response = client.send(Request(method='GET',
+                                               url='http://localhost:8000/node3/innerNode31'))
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+
+                # change file content outside the API
+                with open('example.json', 'wt') as json_file_handler:
+                    json.dump({'node3': {'innerNode31': 'changed_value'}}, json_file_handler)
+
+                response = client.send(Request(method='GET',
+                                               url='http://localhost:8000/node3/innerNode31'))
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                self.assertEqual(response.json(), 'changed_value')
+
+        except Exception as e:
+            self.fail(e)
+
+    def test_read_large_node_streamed(self):
+        # node bigger than the default stream threshold (1MB)
+        request_content = [{'id': i, 'name': f'item_{i}', 'values': [1.5, 2.5, 3.5]} for i in range(40000)]
+
+        try:
+            with Client() as client:
+                response = client.send(Request(method='PUT',
+                                               url='http://localhost:8000/large',
+                                               content=json.dumps(request_content)))
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+
+                response = client.send(Request(method='GET',
+                                               url='http://localhost:8000/large'))
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                self.assertEqual(response.headers.get('transfer-encoding'), 'chunked')
+                self.assertEqual(response.json(), request_content)
+
+                response = client.send(Request(method='GET',
+                                               url='http://localhost:8000/large/0'))
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                self.assertIsNotNone(response.headers.get('content-length'))
+                self.assertEqual(response.json(), request_content[0])
+
+        except Exception as e:
+            self.fail(e)
+
+    def test_read_node_compressed(self):
+        request_content = [{'id': i, 'name': f'item_{i}'} for i in range(100)]
+
+        try:
+            with Client() as client:
+                response = client.send(Request(method='PUT',
+                                               url='http://localhost:8000/compressed',
+                                               content=json.dumps(request_content)))
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+
+                # the second request gets the compressed body kept from the first one
+                for _ in range(2):
+                    response = client.get('http://localhost:8000/compressed', headers={'Accept-Encoding': 'gzip'})
+
+                    self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                    self.assertEqual(response.headers.get('content-encoding'), 'gzip')
+                    self.assertTrue(response.headers['etag'].startswith('W/'))
+                    self.assertEqual(response.json(), request_content)
+
+                response = client.get('http://localhost:8000/compressed',
+                                      headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['etag']})
+                self.assertTrue(response.status_code == 304, f'Unexpected status code: {response.status_code}')
+
+                response = client.get('http://localhost:8000/compressed', headers={'Accept-Encoding': 'identity'})
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                self.assertIsNone(response.headers.get('content-encoding'))
+                self.assertEqual(response.json(), request_content)
+
+                # the compressed bodies of list pages are kept with their pagination headers
+                for _ in range(2):
+                    response = client.get('http://localhost:8000/compressed?limit=50&offset=7',
+                                          headers={'Accept-Encoding': 'gzip'})
+
+                    self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                    self.assertEqual(response.headers.get('content-encoding'), 'gzip')
+                    self.assertEqual(response.headers.get('x-total-count'), '100')
+                    self.assertIsNotNone(response.headers.get('x-next-cursor'))
+                    self.assertEqual(response.json(), request_content[7:57])
+
+        except Exception as e:
+            self.fail(e)
+
+    def test_read_node_not_modified(self):
+        try:
+            with Client() as client:
+                response = client.send(Request(method='GET',
+                                               url='http://localhost:8000/node3/innerNode31'))
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                node_etag = response.headers['etag']
+
+                response = client.send(Request(method='GET',
+                                               url='http://localhost:8000/'))
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                root_etag = response.headers['etag']
+
+                response = client.send(Request(method='GET',
+                                               url='http://localhost:8000/node3/innerNode31',
+                                               headers={'If-None-Match': node_etag}))
+
+                self.assertTrue(response.status_code == 304, f'Unexpected status code: {response.status_code}')
+                self.assertEqual(response.content, b'')
+
+                # change other node, the node keeps its ETag
+                response = client.send(Request(method='PUT',
+                                               url='http://localhost:8000/node1/test',
+                                               content=json.dumps('new_value')))
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+
+                response = client.send(Request(method='GET',
+                                               url='http://localhost:8000/node3/innerNode31',
+                                               headers={'If-None-Match': node_etag}))
+
+                self.assertTrue(response.status_code == 304, f'Unexpected status code: {response.status_code}')
+
+                response = client.send(Request(method='GET',
+                                               url='http://localhost:8000/',
+                                               headers={'If-None-Match': root_etag}))
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+
+                # change the node
+                response = client.send(Request(method='PUT',
+                                               url='http://localhost:8000/node3/innerNode31',
+                                               content=json.dumps('new_value')))
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+
+                response = client.send(Request(method='GET',
+                                               url='http://localhost:8000/node3/innerNode31',
+                                               headers={'If-None-Match': node_etag}))
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                self.assertNotEqual(response.headers['etag'], node_etag)
+                self.assertEqual(response.json(), 'new_value')
+
+        except Exception as e:
+            self.fail(e)
+
     def test_read_node_list_value(self):
         value = self.get_json_value('node2/list/0')
 
@@ -135,6 +300,78 @@ class TestJsonHandler(TestCase):
         except Exception as e:
             self.fail(e)
 
+    def test_read_node_list_filtered(self):
+        value = self.get_json_value('node2/list')
+
+        try:
+            with Client() as client:
+                response = client.get('http://localhost:8000/node2/list', params={'where': 'id==2'})
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                self.assertEqual(response.json(), [item for item in value if item['id'] == 2])
+
+                response = client.get('http://localhost:8000/node2/list',
+                                      params=[('where', 'id>=1'), ('where', 'name!=item1')])
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                self.assertEqual(response.json(),
+                                 [item for item in value if item['id'] >= 1 and item['name'] != 'item1'])
+
+                response = client.get('http://localhost:8000/node2', params={'where': 'id==2'})
+                self.assertTrue(response.status_code == 400, f'Unexpected status code: {response.status_code}')
+
+        except Exception as e:
+            self.fail(e)
+
+    def test_read_node_list_paginated(self):
+        value = self.get_json_value('node2/list')
+
+        try:
+            with Client() as client:
+                response = client.get('http://localhost:8000/node2/list', params={'limit': 1})
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                self.assertEqual(response.json(), value[:1])
+                self.assertEqual(response.headers['X-Total-Count'], str(len(value)))
+
+                # the cursor returns the next page, with the same limit
+                response = client.get('http://localhost:8000/node2/list',
+                                      params={'cursor': response.headers['X-Next-Cursor']})
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                self.assertEqual(response.json(), value[1:2])
+                self.assertNotIn('X-Next-Cursor', response.headers)
+
+                response = client.get('http://localhost:8000/node2/list', params={'offset': -1})
+                self.assertTrue(response.status_code == 400, f'Unexpected status code: {response.status_code}')
+
+        except Exception as e:
+            self.fail(e)
+
+    def test_read_node_fields_and_depth(self):
+        value = self.get_json_value('node2')
+
+        try:
+            with Client() as client:
+                response = client.get('http://localhost:8000/node2', params={'fields': 'list/name'})
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                self.assertEqual(response.json(), {'list': [{'name': item['name']} for item in value['list']]})
+
+                # deeper objects and lists are replaced by stubs
+                response = client.get('http://localhost:8000/node2', params={'depth': 1})
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                self.assertEqual(response.json(), {'list': {'$count': len(value['list'])}})
+
+                response = client.get('http://localhost:8000/node2', params={'depth': 0})
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                self.assertEqual(response.json(), {'$keys': list(value)})
+
+        except Exception as e:
+            self.fail(e)
+
     def test_read_node_other_example_file(self):
         value = self.get_json_value('node2/innerNode21', 'other_example.json')
 
@@ -328,6 +565,91 @@ class TestJsonHandler(TestCase):
             value = self.get_json_value('node2/list/0')
             self.assertEqual(value, request_content, f'Value mismatch')
 
+    def test_metrics(self):
+        try:
+            with Client() as client:
+                client.get('http://localhost:8000/')
+                response = client.get('http://localhost:8000/-/metrics')
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                self.assertTrue(response.headers['Content-Type'].startswith('text/plain'))
+                self.assertIn('# TYPE json_api_request_seconds histogram', response.text)
+                self.assertIn('json_api_stage_seconds_count{', response.text)
+                self.assertIn('json_api_file_size_bytes{file=', response.text)
+
+        except Exception as e:
+            self.fail(e)
+
+    def test_patch_nodes(self):
+        request_content = [{'op': 'test', 'path': '/node3/innerNode31', 'value': 'node3_value'},
+                           {'op': 'replace', 'path': '/node3/innerNode31', 'value': 'new_node3_value'},
+                           {'op': 'add', 'path': '/node2/list/0', 'value': {'id': 0, 'name': 'item0'}},
+                           {'op': 'add', 'path': '/node2/list/-', 'value': {'id': 3, 'name': 'item3'}},
+                           {'op': 'move', 'from': '/test', 'path': '/node1/test/moved'},
+                           {'op': 'copy', 'from': '/node3', 'path': '/node1/node3'},
+                           {'op': 'remove', 'path': '/node3'}]
+
+        try:
+            with Client() as client:
+                response = client.send(Request(method='PATCH',
+                                               url='http://localhost:8000/',
+                                               content=json.dumps(request_content)))
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                self.assertEqual(response.content, b'')
+
+        except Exception as e:
+            self.fail(e)
+
+        else:
+            value = self.get_json_value()
+            self.assertEqual(value, {'node1': {'test': {'moved': 0}, 'node3': {'innerNode31': 'new_node3_value'}},
+                                     'node2': {'list': [{'id': 0, 'name': 'item0'},
+                                                        {'id': 1, 'name': 'item1'},
+                                                        {'id': 2, 'name': 'item2'},
+                                                        {'id': 3, 'name': 'item3'}]}},
+                             f'Value mismatch')
+
+    def test_patch_nodes_atomic(self):
+        value = self.get_json_value()
+
+        try:
+            with Client() as client:
+                # the paths are relative to the node of the request
+                response = client.send(Request(method='PATCH',
+                                               url='http://localhost:8000/node3',
+                                               content=json.dumps([{'op': 'remove', 'path': '/innerNode31'},
+                                                                   {'op': 'test', 'path': '/innerNode31',
+                                                                    'value': 'node3_value'}])))
+
+                self.assertTrue(response.status_code == 409, f'Unexpected status code: {response.status_code}')
+
+                response = client.send(Request(method='PATCH',
+                                               url='http://localhost:8000/node3',
+                                               content=json.dumps([{'op': 'remove', 'path': '/innerNode31'},
+                                                                   {'op': 'replace', 'path': '/nonexistent_node',
+                                                                    'value': 0}])))
+
+                self.assertTrue(response.status_code == 404, f'Unexpected status code: {response.status_code}')
+
+                response = client.send(Request(method='PATCH',
+                                               url='http://localhost:8000/node3',
+                                               content=json.dumps({'op': 'remove', 'path': '/innerNode31'})))
+
+                self.assertTrue(response.status_code == 400, f'Unexpected status code: {response.status_code}')
+
+                response = client.send(Request(method='GET',
+                                               url='http://localhost:8000/'))
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                self.assertEqual(response.json(), value)
+
+        except Exception as e:
+            self.fail(e)
+
+        else:
+            self.assertEqual(self.get_json_value(), value, f'Value mismatch')
+
     def test_delete_node(self):
         try:
             with Client() as client:
@@ -471,6 +793,63 @@ class TestJsonHandler(TestCase):
         except Exception as e:
             self.fail(e)
 
+    def test_concurrent_list_appends(self):
+        writers = 300
+
+        def append_value(value):
+            return client.send(Request(method='PUT',
+                                       url='http://localhost:8000/node2/list',
+                                       content=json.dumps({'id': value}))).status_code
+
+        try:
+            with Client(limits=Limits(max_connections=writers)) as client, \
+                    ThreadPoolExecutor(max_workers=writers) as executor:
+                status_codes = list(executor.map(append_value, range(100, 100 + writers)))
+
+        except Exception as e:
+            self.fail(e)
+
+        else:
+            self.assertEqual(status_codes, [200] * writers, 'Unexpected status codes')
+
+            # no update can be lost
+            ids = [item['id'] for item in self.get_json_value('node2/list')]
+            self.assertEqual(len(ids), 2 + writers, 'Value mismatch')
+            self.assertEqual(set(ids), {1, 2} | set(range(100, 100 + writers)), 'Value mismatch')
+
+    def test_concurrent_node_updates_and_reads(self):
+        writers = 300
+
+        def update_node(value):
+            return client.send(Request(method='PUT',
+                                       url=f'http://localhost:8000/node1/test/node{value}',
+                                       content=json.dumps(value))).status_code
+
+        def read_node(_):
+            response = client.send(Request(method='GET', url='http://localhost:8000/node1/test'))
+
+            # readers always get a complete version of the node
+            nodes = response.json()
+            return response.status_code == 200 and all(nodes[f'node{value}'] == value
+                                                       for value in range(writers) if f'node{value}' in nodes)
+
+        try:
+            with Client(limits=Limits(max_connections=2 * writers)) as client, \
+                    ThreadPoolExecutor(max_workers=2 * writers) as executor:
+                read_results = executor.map(read_node, range(writers))
+                status_codes = list(executor.map(update_node, range(writers)))
+                read_results = list(read_results)
+
+        except Exception as e:
+            self.fail(e)
+
+        else:
+            self.assertEqual(status_codes, [200] * writers, 'Unexpected status codes')
+            self.assertTrue(all(read_results), 'Inconsistent read')
+
+            value = self.get_json_value('node1/test')
+            self.assertEqual(value, {f'node{value}': value for value in range(writers)}, 'Value mismatch')
+
     @staticmethod
     def get_json_value(path='', json_file='example.json'):
         with open(json_file, 'r') as json_file_handler:
@@ -488,3 +867,698 @@ class TestJsonHandler(TestCase):
                 json_data = json_data[key]
 
         return json_data
+
+
+class TestServerProcess(TestCase):
+    """
+    Tests that run their own server process, with their own configuration and JSON files, so the server can be
+    stopped abruptly and started again
+    """
+
+    def setUp(self) -> None:
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.server = None
+        self.url = None
+        self.broker = None
+        self.mqtt_client = None
+        self.messages = list()
+        self.lock_holders = list()
+
+    def tearDown(self) -> None:
+        # workers are stopped by the server process, so it is not killed
+        if self.server is not None and self.server.poll() is None:
+            self.server.terminate()
+            try:
+                self.server.wait(timeout=10)
+
+            except subprocess.TimeoutExpired:
+                self.kill_server()
+
+        for lock_holder in self.lock_holders:
+            lock_holder.kill()
+            lock_holder.wait()
+
+        if self.mqtt_client is not None:
+            self.mqtt_client.loop_stop()
+            self.mqtt_client.disconnect()
+
+        if self.broker is not None:
+            self.broker.stop()
+
+        self.directory.cleanup()
+
+    def start_broker(self):
+        # starts an MQTT broker and a client that keeps the (topic, payload) of the messages of all the topics,
+        # returns the "mqtt" configuration of the service
+        self.broker = MqttBroker().start()
+
+        subscribed = list()
+        self.mqtt_client = MqttClient()
+        self.mqtt_client.on_subscribe = lambda client, userdata, mid, granted_qos: subscribed.append(mid)
+        self.mqtt_client.on_message = lambda client, userdata, message: \
+            self.messages.append((message.topic, message.payload))
+        self.mqtt_client.connect('127.0.0.1', self.broker.port)
+        self.mqtt_client.subscribe('#')
+        self.mqtt_client.loop_start()
+        self.wait_for(lambda: subscribed)
+
+        return {'enabled': True, 'host': '127.0.0.1', 'port': self.broker.port}
+
+    def retained_messages(self):
+        # returns the payload of the retained messages kept by the broker for each topic
+        retained_messages = dict()
+        mqtt_client = MqttClient()
+        mqtt_client.on_message = lambda client, userdata, message: \
+            retained_messages.update({message.topic: message.payload} if message.retain else {})
+        mqtt_client.connect('127.0.0.1', self.broker.port)
+        mqtt_client.subscribe('#')
+        mqtt_client.loop_start()
+        time.sleep(0.5)
+        mqtt_client.loop_stop()
+        mqtt_client.disconnect()
+
+        return retained_messages
+
+    def configure(self, files, files_options=None, api=None, mqtt=None):
+        # writes the JSON content of each "api.files" entry to "<entry>.json" and the service configuration
+        for key, json_data in files.items():
+            with open(self.path / f'{key}.json', 'wt') as json_file_handler:
+                json.dump(json_data, json_file_handler)
+
+        config = {
+            'mqtt': {'enabled': False} | (mqtt or {}),
+            'api': {'files': {key: {'path': f'{key}.json'} | (files_options or {}).get(key, {}) for key in files}}
+        }
+        for key, value in (api or {}).items():
+            config['api'][key] = config['api'].get(key, {}) | value if isinstance(value, dict) else value
+
+        with open(self.path / 'config.json', 'wt') as config_file_handler:
+            json.dump(config, config_file_handler)
+
+    def start_server(self, workers=1):
+        # starts the server and waits until it answers requests, returns None if the server stopped while starting
+        with socket.socket() as port_socket:
+            port_socket.bind(('127.0.0.1', 0))
+            port = port_socket.getsockname()[1]
+
+        self.url = f'http://127.0.0.1:{port}'
+        self.server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'main:app', '--factory',
+                                        '--app-dir', str(Path(__file__).resolve().parent),
+                                        '--port', str(port),
+                                        '--workers', str(workers)],
+                                       cwd=self.path, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        deadline = time.perf_counter() + 30
+        while time.perf_counter() < deadline:
+            if self.server.poll() is not None:
+                return None
+
+            try:
+                with Client() as client:
+                    response = client.get(f'{self.url}/-/metrics')
+                    if response.status_code == 200 and 'json_api_mqtt_connected 0' not in response.text:
+                        # the other workers may still be starting
+                        time.sleep(workers - 1)
+                        return self.server
+
+            except TransportError:
+                time.sleep(0.1)
+
+        self.fail('Server did not start')
+
+    def hold_lock(self, statement):
+        # runs a process that holds a lock of the service (the statement locks it) until it is killed
+        lock_holder = subprocess.Popen([sys.executable, '-c',
+                                        f'import sys, time\n'
+                                        f'sys.path.insert(0, {str(Path(__file__).resolve().parent)!r})\n'
+                                        f'from coordination import LeaderElection, ProcessLock\n'
+                                        f'{statement}\n'
+                                        f'print("locked", flush=True)\n'
+                                        f'time.sleep(60)\n'],
+                                       cwd=self.path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        self.lock_holders.append(lock_holder)
+        self.assertEqual(lock_holder.stdout.readline().strip(), 'locked')
+
+        return lock_holder
+
+    def kill_server(self):
+        # stops the server abruptly, as in a crash
+        if self.server is not None and self.server.poll() is None:
+            self.server.kill()
+            self.server.wait()
+
+    def metric(self, name):
+        with Client() as client:
+            for line in client.get(f'{self.url}/-/metrics').text.splitlines():
+                if line.startswith(name):
+                    return float(line.split()[-1])
+
+        return None
+
+    def wait_for(self, predicate, timeout=10):
+        deadline = time.perf_counter() + timeout
+        while not predicate():
+            if time.perf_counter() > deadline:
+                self.fail('Timed out waiting for the server')
+
+            time.sleep(0.05)
+
+    def test_journal_not_replayed_on_externally_changed_file(self):
+        self.configure({'example': {'value': 0}},
+                       api={'persistence': {'mode': 'journal', 'flush_interval': 3600, 'flush_dirty_threshold': 1000}})
+
+        try:
+            self.start_server()
+            with Client() as client:
+                response = client.put(f'{self.url}/example/value', content=json.dumps(1))
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+
+            self.kill_server()
+
+            # change file content outside the API, the journal operation was not written to it
+            with open(self.path / 'example.json', 'wt') as json_file_handler:
+                json.dump({'value': 'changed_value'}, json_file_handler)
+
+            # the server refuses to start instead of dropping or replaying the operation
+            self.assertIsNone(self.start_server(), 'Server started with a journal not written to a changed file')
+            self.assertNotEqual(self.server.returncode, 0)
+            self.assertTrue(any(path.stat().st_size for path in self.path.glob('example.json.journal.[0-9]*')),
+                            'Journal operations were dropped')
+
+        except Exception as e:
+            self.fail(e)
+
+    def test_journal_replayed_once_after_failed_flush(self):
+        self.configure({'example': {'list': []}},
+                       api={'persistence': {'mode': 'journal', 'flush_interval': 3600, 'flush_dirty_threshold': 1}})
+
+        try:
+            self.start_server()
+
+            # the temporary file used to replace the JSON file cannot be written, so every flush fails
+            (self.path / '.example.json.tmp').mkdir()
+            with Client() as client:
+                for value in range(5):
+                    response = client.put(f'{self.url}/example/list', content=json.dumps(value))
+                    self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+
+            self.wait_for(lambda: self.metric('json_api_flush_errors_total'))
+            self.kill_server()
+            (self.path / '.example.json.tmp').rmdir()
+
+            # each operation is replayed once, also after stopping again before any other change
+            for _ in range(2):
+                self.start_server()
+                with Client() as client:
+                    self.assertEqual(client.get(f'{self.url}/example/list').json(), list(range(5)))
+
+                self.kill_server()
+
+        except Exception as e:
+            self.fail(e)
+
+    def test_incremental_validation_matches_full_validation(self):
+        schema = {'type': 'object',
+                  'properties': {'items': {'type': 'array', 'maxItems': 6, 'items': {'type': ['array', 'integer']}}}}
+        with open(self.path / 'schema.json', 'wt') as schema_file_handler:
+            json.dump(schema, schema_file_handler)
+
+        self.configure({'full': {'items': [0, 1, [2]]}, 'incremental': {'items': [0, 1, [2]]}},
+                       files_options={'full': {'schema': 'schema.json', 'validation': 'full'},
+                                      'incremental': {'schema': 'schema.json', 'validation': 'incremental'}})
+
+        # list items replaced (items that are lists are moved to the beginning of the list), appended and removed
+        requests = [('PUT', 'items/2', 'bad'), ('PUT', 'items/2', [3]), ('PUT', 'items/0', 'bad'),
+                    ('PUT', 'items/0', ['bad']), ('PUT', 'items/1', 4), ('POST', 'items/0', 'bad'),
+                    ('POST', 'items', 'bad'), ('POST', 'items', 5), ('PUT', 'items', [6]), ('PUT', 'items', 7),
+                    ('DELETE', 'items/0', None), ('DELETE', 'items/2', None), ('PUT', 'items/0', 'bad'),
+                    ('DELETE', 'items/3', None), ('POST', 'items/0', [8])]
+
+        try:
+            self.start_server()
+            with Client() as client:
+                for method, path, value in requests:
+                    status_codes = [client.send(Request(method=method,
+                                                        url=f'{self.url}/{key}/{path}',
+                                                        content=json.dumps(value) if value is not None else None))
+                                    .status_code for key in ['full', 'incremental']]
+
+                    self.assertEqual(status_codes[0], status_codes[1], f'Validation mismatch in {method} {path}')
+
+                self.assertEqual(client.get(f'{self.url}/incremental/').json(), client.get(f'{self.url}/full/').json())
+
+        except Exception as e:
+            self.fail(e)
+
+    def test_watched_file_reloaded_and_published(self):
+        with open(self.path / 'schema.json', 'wt') as schema_file_handler:
+            json.dump({'type': 'object', 'properties': {'value': {'type': 'integer'}}}, schema_file_handler)
+
+        mqtt = self.start_broker()
+        self.configure({'example': {'value': 0, 'other': 'unchanged'}},
+                       files_options={'example': {'schema': 'schema.json'}},
+                       api={'watch': 'polling', 'watch_poll_interval': 0.1},
+                       mqtt=mqtt)
+
+        try:
+            self.start_server()
+
+            # change file content outside the API
+            with open(self.path / 'example.json', 'wt') as json_file_handler:
+                json.dump({'value': 1, 'other': 'unchanged'}, json_file_handler)
+
+            # only the topic of the changed node is published
+            self.wait_for(lambda: any(topic.endswith('/value') for topic, _ in self.messages))
+            with Client() as client:
+                self.assertEqual(client.get(f'{self.url}/example/value').json(), 1)
+
+            self.assertEqual([(topic.rsplit('/', 1)[-1], payload) for topic, payload in self.messages],
+                             [('value', b'1')])
+
+            # a change that violates the schema is not reloaded, nor published
+            with open(self.path / 'example.json', 'wt') as json_file_handler:
+                json.dump({'value': 'invalid', 'other': 'changed'}, json_file_handler)
+
+            time.sleep(1)
+            with Client() as client:
+                self.assertEqual(client.get(f'{self.url}/example/').json(), {'value': 1, 'other': 'unchanged'})
+
+            self.assertEqual(len(self.messages), 1, 'Invalid file content was published')
+
+        except Exception as e:
+            self.fail(e)
+
+    def test_unchanged_nodes_not_published(self):
+        mqtt = self.start_broker()
+        self.configure({'example': {'other': 0}}, mqtt=mqtt)
+
+        try:
+            self.start_server()
+            with Client() as client:
+                for _ in range(2):
+                    response = client.put(f'{self.url}/example/node', content=json.dumps({'value': 1}))
+                    self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+
+                # the second request didn't change the node
+                self.wait_for(lambda: self.metric('json_api_mqtt_messages_total{result="suppressed"}'))
+
+                response = client.delete(f'{self.url}/example/node')
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+
+            # the removed node is published as an empty message, that clears its retained message
+            self.wait_for(lambda: len(self.messages) == 2)
+            self.assertEqual([(topic.rsplit('/', 1)[-1], payload and json.loads(payload))
+                              for topic, payload in self.messages],
+                             [('node', {'value': 1}), ('node', b'')])
+            self.assertFalse([topic for topic in self.retained_messages() if topic.endswith('/node')],
+                             'Removed node is still retained')
+
+        except Exception as e:
+            self.fail(e)
+
+    def test_delta_publish_mode(self):
+        mqtt = self.start_broker()
+        self.configure({'example': {'node': {'a': 0}}},
+                       mqtt=mqtt | {'publish': {'mode': 'delta', 'full_state_interval': 1}})
+
+        try:
+            self.start_server()
+            with Client() as client:
+                for value in range(1, 4):
+                    response = client.put(f'{self.url}/example/node', content=json.dumps({'a': value}))
+                    self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+
+                # created and removed nodes are published right away
+                for method, content in [('PUT', json.dumps({'x': 1})), ('DELETE', None)]:
+                    response = client.send(Request(method=method, url=f'{self.url}/example/created', content=content))
+                    self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+
+            self.wait_for(lambda: len(self.messages) == 9)
+            time.sleep(0.5)
+            messages = [(topic.split('/', 1)[1], payload and json.loads(payload)) for topic, payload in self.messages]
+
+            # the changes of the node are published as JSON Patch documents relative to the node
+            self.assertEqual([payload for topic, payload in messages if topic == 'node/$delta'],
+                             [[{'op': 'replace', 'path': '/a', 'value': value}] for value in range(1, 4)])
+            self.assertEqual([payload for topic, payload in messages if topic == 'created/$delta'],
+                             [[{'op': 'add', 'path': '', 'value': {'x': 1}}], [{'op': 'remove', 'path': ''}]])
+
+            # the full state of the node is published at most once per interval, with its last value
+            self.assertEqual([payload for topic, payload in messages if topic == 'node'], [{'a': 1}, {'a': 3}])
+            self.assertEqual([payload for topic, payload in messages if topic == 'created'], [{'x': 1}, b''])
+            self.assertEqual(messages[-1], ('node', {'a': 3}))
+
+        except Exception as e:
+            self.fail(e)
+
+    def test_mqtt_changes_applied_in_batches(self):
+        with open(self.path / 'schema.json', 'wt') as schema_file_handler:
+            json.dump({'type': 'object', 'properties': {'a': {'type': 'integer'}}}, schema_file_handler)
+
+        mqtt = self.start_broker()
+        self.configure({'example': {'a': 0, 'c': 0}},
+                       files_options={'example': {'schema': 'schema.json'}},
+                       mqtt=mqtt | {'subscribe': {'enabled': True, 'batch_interval': 0.5}})
+
+        # retained messages are sent to the service when it subscribes, and are not applied
+        self.mqtt_client.publish('set/example/retained', json.dumps(1), retain=True).wait_for_publish()
+
+        def stage_count(stage):
+            return self.metric(f'json_api_stage_seconds_count{{file="example",method="MQTT",stage="{stage}"}}') or 0
+
+        try:
+            self.start_server()
+
+            # wait for the service to apply the changes received from the broker
+            with Client() as client:
+                def applied(path):
+                    return client.get(f'{self.url}/example/{path}').status_code == 200
+
+                self.wait_for(lambda: self.mqtt_client.publish('set/example/ready', json.dumps(True)) and
+                              applied('ready'))
+
+            time.sleep(0.5)
+            self.wait_for(lambda: self.metric('json_api_mqtt_applied_changes_total') ==
+                          self.metric('json_api_mqtt_received_changes_total'))
+            changes = self.metric('json_api_mqtt_applied_changes_total')
+            validations, writes = stage_count('validate'), stage_count('write')
+            del self.messages[:]
+
+            # a node that does not exist can't be deleted, so that change is ignored
+            for topic, payload in [('set/example/a', json.dumps(1)), ('set/example/b', json.dumps({'x': 2})),
+                                   ('set/example/c', ''), ('set/example/missing', '')]:
+                self.mqtt_client.publish(topic, payload)
+
+            self.wait_for(lambda: self.metric('json_api_mqtt_applied_changes_total') == changes + 4)
+            with Client() as client:
+                json_data = client.get(f'{self.url}/example/').json()
+
+            self.assertEqual({key: json_data.get(key) for key in ['a', 'b', 'c', 'retained']},
+                             {'a': 1, 'b': {'x': 2}, 'c': None, 'retained': None})
+
+            # the batch is validated, saved and published once
+            self.assertEqual(stage_count('validate'), validations + 1)
+            self.assertEqual(stage_count('write'), writes + 1)
+            self.wait_for(lambda: len([topic for topic, _ in self.messages if not topic.startswith('set/')]) == 3)
+            time.sleep(0.5)
+            self.assertEqual(sorted((topic.split('/', 1)[1], payload) for topic, payload in self.messages
+                                    if not topic.startswith('set/')),
+                             [('a', b'1'), ('b', b'{"x":2}'), ('c', b'')])
+
+        except Exception as e:
+            self.fail(e)
+
+    def test_read_node_value_from_path_index(self):
+        self.configure({'example': {'node1': {'list': [1, 2, {'value': 'indexed_value'}]}, 'node2': 0}},
+                       files_options={'example': {'index_depth': 2}})
+
+        try:
+            self.start_server()
+            with Client() as client:
+                response = client.get(f'{self.url}/example/node1/list/2/value')
+
+                self.assertTrue(response.status_code == 200, f'Unexpected status code: {response.status_code}')
+                self.assertEqual(response.json(), 'indexed_value')
+
+                response = client.get(f'{self.url}/example/node1/nonexistent_node')
+                self.assertTrue(response.status_code == 404, f'Unexpected status code: {response.status_code}')
+
+                response = client.get(f'{self.url}/example/node1/list/3')
+                self.assertTrue(response.status_code == 404, f'Unexpected status code: {response.status_code}')
+
+            # the file was not loaded, the nodes were read with its path index
+            self.assertEqual(self.metric('json_api_cache_misses_total'), 0)
+            self.assertGreater(self.metric('json_api_path_index_reads_total'), 0)
+
+        except Exception as e:
+            self.fail(e)
+
+    def test_workers_serialize_file_writes(self):
+        writers = 200
+        self.configure({'example': {'list': []}})
+
+        def append_value(value):
+            return client.put(f'{self.url}/example/list', content=json.dumps(value)).status_code
+
+        try:
+            self.start_server(workers=2)
+            with Client(limits=Limits(max_connections=writers)) as client, \
+                    ThreadPoolExecutor(max_workers=writers) as executor:
+                status_codes = list(executor.map(append_value, range(writers)))
+
+            self.assertEqual(status_codes, [200] * writers, 'Unexpected status codes')
+
+            # each worker changes the last version of the file, so no update is lost
+            with open(self.path / 'example.json', 'r') as json_file_handler:
+                self.assertEqual(sorted(json.load(json_file_handler)['list']), list(range(writers)))
+
+        except Exception as e:
+            self.fail(e)
+
+    def test_one_worker_applies_mqtt_changes(self):
+        mqtt = self.start_broker()
+        self.configure({'example': {'list': []}}, mqtt=mqtt | {'subscribe': {'enabled': True}})
+
+        try:
+            self.start_server(workers=2)
+
+            # each change appends to the list, so it would be appended twice if both workers applied it
+            self.mqtt_client.publish('set/example/list', json.dumps(1)).wait_for_publish()
+            with Client() as client:
+                self.wait_for(lambda: client.get(f'{self.url}/example/list').json())
+                time.sleep(1)
+                self.assertEqual(client.get(f'{self.url}/example/list').json(), [1])
+
+            with open(self.path / 'logs' / 'json-api.log', 'r') as log_file_handler:
+                self.assertEqual(log_file_handler.read().count('elected as the leader'), 1)
+
+        except Exception as e:
+            self.fail(e)
+
+    def test_file_lock_released_when_holder_dies(self):
+        self.configure({'example': {'value': 0}}, api={'workers_coordination': 'enabled'})
+
+        try:
+            self.start_server()
+            lock_holder = self.hold_lock('ProcessLock(".example.json.lock").acquire()')
+
+            # the change waits for the lock of the file, held by the other process
+            with Client(timeout=10) as client, ThreadPoolExecutor(max_workers=1) as executor:
+                response = executor.submit(client.put, f'{self.url}/example/value', content=json.dumps(1))
+                time.sleep(1)
+                self.assertFalse(response.done(), 'File changed while locked by another process')
+
+                lock_holder.kill()
+                self.assertTrue(response.result().status_code == 200,
+                                f'Unexpected status code: {response.result().status_code}')
+                self.assertEqual(client.get(f'{self.url}/example/value').json(), 1)
+
+        except Exception as e:
+            self.fail(e)
+
+    def test_leader_taken_over_when_leader_dies(self):
+        mqtt = self.start_broker()
+        self.configure({'example': {'value': 0}},
+                       api={'workers_coordination': 'enabled'},
+                       mqtt=mqtt | {'subscribe': {'enabled': True}})
+
+        try:
+            leader = self.hold_lock('LeaderElection(".config.json.lock", lambda: None).start()')
+            self.start_server()
+
+            # the changes received from the broker are only applied by the leader
+            self.mqtt_client.publish('set/example/value', json.dumps(1)).wait_for_publish()
+            time.sleep(1)
+            with Client() as client:
+                self.assertEqual(client.get(f'{self.url}/example/value').json(), 0)
+
+                # the service is elected when the leader dies
+                leader.kill()
+                self.wait_for(lambda: self.mqtt_client.publish('set/example/value', json.dumps(2)) and
+                              client.get(f'{self.url}/example/value').json() == 2)
+
+        except Exception as e:
+            self.fail(e)
+
+
+class FakeMqttClient:
+    """
+    MQTT client stand-in that keeps the published messages until they are written to the network, and discards the
+    messages not written yet when it reconnects (as the paho client does with QoS 0 messages)
+    """
+
+    def __init__(self):
+        self.publisher = None
+        self.connected = True
+        self.pending_messages = dict()
+        self.written_messages = list()
+        self._mid = 0
+
+    def is_connected(self):
+        return self.connected
+
+    def max_inflight_messages_set(self, inflight):
+        pass
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        self._mid += 1
+        self.pending_messages[self._mid] = (topic, payload)
+
+        message_info = MQTTMessageInfo(self._mid)
+        message_info.rc = MQTT_ERR_SUCCESS
+        return message_info
+
+    def write(self):
+        for mid in list(self.pending_messages):
+            self.written_messages.append(self.pending_messages.pop(mid))
+            self.publisher.acknowledged(mid)
+
+    def reconnect(self):
+        self.pending_messages.clear()
+        self.connected = True
+        self.publisher.connected()
+
+
+class TestMqttPublisher(TestCase):
+
+    def setUp(self) -> None:
+        self.client = FakeMqttClient()
+        self.publisher = MqttPublisher(self.client, queue_size=100, max_in_flight=2)
+        self.client.publisher = self.publisher
+        self.publisher.start()
+
+    def tearDown(self) -> None:
+        self.publisher.stop(timeout=1)
+
+    def wait_for(self, predicate, timeout=5):
+        deadline = time.perf_counter() + timeout
+        while not predicate():
+            if time.perf_counter() > deadline:
+                self.fail('Timed out waiting for the publisher')
+
+            time.sleep(0.01)
+
+    def test_messages_not_written_published_after_reconnect(self):
+        for topic in ['a', 'b', 'c', 'd']:
+            self.publisher.publish(topic, topic.encode())
+
+        # the in-flight window is full of messages that were not written to the network
+        self.wait_for(lambda: self.publisher.in_flight_messages == 2)
+        self.client.connected = False
+        self.publisher.publish('a', b'a2')
+        self.client.reconnect()
+
+        def written():
+            self.client.write()
+            return not self.publisher.pending_messages and not self.publisher.in_flight_messages
+
+        self.wait_for(written)
+        self.assertEqual(sorted(self.client.written_messages), [('a', b'a2'), ('b', b'b'), ('c', b'c'), ('d', b'd')])
+        self.assertEqual(self.publisher.published_messages, 4)
+
+        # the in-flight window is not left full, so new messages are still published
+        self.publisher.publish('e', b'e')
+        self.wait_for(written)
+        self.assertIn(('e', b'e'), self.client.written_messages)
+
+
+class TestWriteBehindFlusher(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = TemporaryDirectory()
+        self.file_path = Path(self.directory.name) / 'example.json'
+        self.document_cache = DocumentCache()
+        self.written_documents = list()
+        self.write_error = None
+        self.flusher = None
+
+    def tearDown(self) -> None:
+        self.write_error = None
+        self.flusher.stop()
+        self.directory.cleanup()
+
+    def write_document(self, key, json_data, json_file_path, before_replace=None):
+        if self.write_error:
+            raise self.write_error
+
+        with open(json_file_path, 'wt') as json_file_handler:
+            json.dump(json_data, json_file_handler)
+
+        self.written_documents.append(json_data)
+
+    def start_flusher(self, flush_interval, flush_dirty_threshold):
+        self.flusher = WriteBehindFlusher(self.document_cache,
+                                          self.write_document,
+                                          flush_interval,
+                                          flush_dirty_threshold)
+        self.flusher.start()
+
+    def wait_for(self, predicate, timeout=5):
+        deadline = time.perf_counter() + timeout
+        while not predicate():
+            if time.perf_counter() > deadline:
+                self.fail('Timed out waiting for the flusher')
+
+            time.sleep(0.01)
+
+    def test_changes_coalesced_in_one_flush(self):
+        self.start_flusher(flush_interval=0.5, flush_dirty_threshold=1000)
+        for value in range(10):
+            self.flusher.queue('example', self.file_path, {'value': value})
+
+        self.wait_for(lambda: self.flusher.flushes)
+        self.assertEqual(self.flusher.flushes, 1)
+        self.assertEqual(self.flusher.flushed_changes, 10)
+        self.assertEqual(self.written_documents, [{'value': 9}])
+        self.assertFalse(self.document_cache.document('example').dirty)
+
+    def test_dirty_threshold_triggers_flush(self):
+        self.start_flusher(flush_interval=3600, flush_dirty_threshold=3)
+        for value in range(2):
+            self.flusher.queue('example', self.file_path, {'value': value})
+
+        time.sleep(0.2)
+        self.assertEqual(self.flusher.flushes, 0)
+
+        self.flusher.queue('example', self.file_path, {'value': 2})
+        self.wait_for(lambda: self.flusher.flushes)
+        self.assertEqual(self.flusher.flushed_changes, 3)
+        self.assertEqual(self.written_documents, [{'value': 2}])
+
+    def test_pending_changes_flushed_on_stop(self):
+        self.start_flusher(flush_interval=3600, flush_dirty_threshold=1000)
+        for value in range(2):
+            self.flusher.queue('example', self.file_path, {'value': value})
+
+        self.flusher.stop()
+        self.assertEqual(self.flusher.flushes, 1)
+        self.assertEqual(self.flusher.pending_changes, 0)
+        self.assertEqual(TestJsonHandler.get_json_value(json_file=self.file_path), {'value': 1})
+
+    def test_failed_flush_keeps_changes(self):
+        self.start_flusher(flush_interval=3600, flush_dirty_threshold=1000)
+        self.flusher.queue('example', self.file_path, {'value': 0})
+        self.flusher.queue('example', self.file_path, {'value': 1})
+
+        self.write_error = OSError('No space left on device')
+        self.assertEqual(self.flusher.flush(), 0)
+        self.assertEqual(self.flusher.flush_errors, 1)
+        self.assertEqual(self.flusher.pending_changes, 2)
+        self.assertTrue(self.document_cache.document('example').dirty)
+
+        # the changes are written by the next flush
+        self.write_error = None
+        self.assertEqual(self.flusher.flush(), 2)
+        self.assertEqual(self.written_documents, [{'value': 1}])
+        self.assertFalse(self.document_cache.document('example').dirty)
+
+    def test_failed_flush_retried_after_interval(self):
+        self.write_error = OSError('No space left on device')
+        self.start_flusher(flush_interval=0.25, flush_dirty_threshold=1)
+        self.flusher.queue('example', self.file_path, {'value': 0})
+
+        # the failed change stays over the dirty threshold, but it is only written again once per interval
+        time.sleep(1)
+        self.assertTrue(1 <= self.flusher.flush_errors <= 5, f'Unexpected flush errors: {self.flusher.flush_errors}')
+        self.assertEqual(self.flusher.pending_changes, 1)
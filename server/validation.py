@@ -0,0 +1,262 @@
+# external libs
+from jsonschema import RefResolver
+from jsonschema.exceptions import best_match
+from jsonschema.protocols import Validator
+from jsonschema.validators import Draft3Validator, validator_for
+
+# python libs
+import re
+import json
+import threading
+
+from typing import Any, Dict, List, Optional, Tuple, Union
+from pathlib import Path
+
+# project files
+from cache import DocumentCache
+
+# constants
+# keywords that can't be checked by validating only the changed node, the full document must be validated
+UNSUPPORTED_KEYWORDS = {'allOf', 'anyOf', 'oneOf', 'not', 'if', 'then', 'else', 'dependentSchemas',
+                        'unevaluatedProperties', 'unevaluatedItems', 'prefixItems', 'additionalItems', '$id', 'id',
+                        '$dynamicRef', '$recursiveRef'}
+
+# keywords of the nodes in the path to the change that depend on the whole value of the node
+ANCESTOR_KEYWORDS = {'enum', 'const', 'uniqueItems', 'contains', 'minContains', 'maxContains', 'dependencies'}
+
+# keywords of the node where a key or item is added or deleted that depend on the keys or items of the node
+ADD_KEYWORDS = {'maxProperties', 'propertyNames', 'dependentRequired', 'maxItems'}
+DELETE_KEYWORDS = {'required', 'minProperties', 'dependentRequired', 'minItems'}
+
+# keywords that are ignored when next to a "$ref"
+ANNOTATION_KEYWORDS = {'$ref', '$schema', '$comment', 'title', 'description', 'default', 'examples', 'definitions',
+                       '$defs'}
+
+
+class SchemaValidators:
+    """
+    Keeps one compiled JSON schema validator per "api.files" entry.
+    The schema is only read, checked and compiled again when the signature of the schema file changes, and the
+    "$ref" resolved by a validator are kept by its resolver between validations.
+    """
+
+    def __init__(self):
+        self._validators: Dict[str, Tuple[Tuple[int, ...], Validator]] = dict()
+        self._lock = threading.Lock()
+
+        # counters
+        self.builds = 0
+        self.full_validations = 0
+        self.incremental_validations = 0
+
+    def get(self, key: str, schema_file_path: Union[str, Path]) -> Validator:
+        """
+        Returns the validator of the given key, (re)building it if the schema file has changed
+        :param key: "api.files" entry name
+        :param schema_file_path: Path to the JSON schema file
+        :return: validator
+        Raise SchemaError if the schema is invalid or JSONDecodeError if the schema file has invalid JSON
+        """
+
+        signature = DocumentCache.file_signature(schema_file_path)
+        if (cached_validator := self._validators.get(key)) and cached_validator[0] == signature:
+            return cached_validator[1]
+
+        with self._lock:
+            if (cached_validator := self._validators.get(key)) and cached_validator[0] == signature:
+                return cached_validator[1]
+
+            with open(schema_file_path, 'r') as schema_file_handler:
+                schema = json.load(schema_file_handler)
+
+            validator_class = validator_for(schema)
+            validator_class.check_schema(schema)
+
+            # relative "$ref" are resolved from the directory of the schema file
+            validator = validator_class(schema,
+                                        resolver=RefResolver(Path(schema_file_path).absolute().as_uri(), schema))
+
+            self._validators[key] = (signature, validator)
+            self.builds += 1
+            return validator
+
+    def validate(self, key: str, schema_file_path: Union[str, Path], json_data: Any) -> None:
+        """
+        Validates the JSON data with the validator of the given key
+        :param key: "api.files" entry name
+        :param schema_file_path: Path to the JSON schema file
+        :param json_data: JSON data object to validate
+        Raise ValidationError if the JSON data is invalid (the most relevant error, as "jsonschema.validate")
+        """
+
+        self.full_validations += 1
+        if (error := best_match(self.get(key, schema_file_path).iter_errors(json_data))) is not None:
+            raise error
+
+    def validate_change(self,
+                        key: str,
+                        schema_file_path: Union[str, Path],
+                        previous_json_data: Any,
+                        json_data: Any,
+                        operation: str,
+                        path: List[str]) -> None:
+        """
+        Validates only the node changed by the operation, against the schema of that node.
+        The full JSON data is validated if the schema has keywords, in the path of the change, that depend on more than
+        the changed node (ex: "required" in the parent of a deleted node, "uniqueItems" in an ancestor list)
+        :param key: "api.files" entry name
+        :param schema_file_path: Path to the JSON schema file
+        :param previous_json_data: JSON data object before the operation
+        :param json_data: JSON data object after the operation
+        :param operation: "POST", "PUT" or "DELETE" operation performed (see JsonHandler.change_json_data)
+        :param path: path parts, in the JSON, to the node where the operation was performed
+        Raise ValidationError if the JSON data is invalid
+        """
+
+        validator = self.get(key, schema_file_path)
+
+        changes = self._changed_nodes(validator, previous_json_data, json_data, operation.upper(), path)
+        if changes is None:
+            self.validate(key, schema_file_path, json_data)
+            return
+
+        self.incremental_validations += 1
+        for schemas, node in changes:
+            for schema in schemas:
+                if (error := best_match(validator.evolve(schema=schema).iter_errors(node))) is not None:
+                    raise error
+
+    @staticmethod
+    def _resolve(validator: Validator, schema: Any) -> Optional[Any]:
+        """
+        Follows the local "$ref" of the schema
+        :return: resolved schema or None if the schema can't be resolved (references to other files)
+        """
+
+        while isinstance(schema, dict) and '$ref' in schema:
+            if not schema['$ref'].startswith('#') or not set(schema).issubset(ANNOTATION_KEYWORDS):
+                return None
+
+            schema = validator.resolver.resolve(schema['$ref'])[1]
+
+        return schema
+
+    @classmethod
+    def _child_schemas(cls, validator: Validator, schemas: List[Any], key: Union[str, int]) -> Optional[List[Any]]:
+        """
+        Returns the schemas that apply to the child node with the given key
+        :return: list of child schemas or None if the schemas are not supported by the incremental validation
+        """
+
+        child_schemas = list()
+        for schema in schemas:
+            if isinstance(schema, bool):
+                child_schemas.append(schema)
+                continue
+
+            if isinstance(key, int):
+                if isinstance(items := schema.get('items', True), list):
+                    return None  # items validated by position
+
+                child_schemas.append(items)
+                continue
+
+            matched = False
+            if key in (properties := schema.get('properties', {})):
+                child_schemas.append(properties[key])
+                matched = True
+
+            for pattern, pattern_schema in schema.get('patternProperties', {}).items():
+                if re.search(pattern, key):
+                    child_schemas.append(pattern_schema)
+                    matched = True
+
+            if not matched:
+                child_schemas.append(schema.get('additionalProperties', True))
+
+        resolved_child_schemas = [cls._resolve(validator, schema) for schema in child_schemas]
+        if any(schema is None or (isinstance(schema, dict) and UNSUPPORTED_KEYWORDS.intersection(schema))
+               for schema in resolved_child_schemas):
+            return None
+
+        return resolved_child_schemas
+
+    @classmethod
+    def _changed_nodes(cls,
+                       validator: Validator,
+                       previous_json_data: Any,
+                       json_data: Any,
+                       operation: str,
+                       path: List[str]) -> Optional[List[Tuple[List[Any], Any]]]:
+        """
+        Finds the nodes changed by the operation and the schemas that apply to each one
+        :return: list of (schemas, changed node) or None if the full JSON data must be validated
+        """
+
+        if isinstance(validator, Draft3Validator) or not path or \
+                not isinstance(previous_json_data, dict) or not isinstance(json_data, dict):
+            return None  # root node changed
+
+        schemas = [cls._resolve(validator, validator.schema)]
+        if schemas[0] is None or (isinstance(schemas[0], dict) and UNSUPPORTED_KEYWORDS.intersection(schemas[0])):
+            return None
+
+        previous_node, node = previous_json_data, json_data
+        for i, key in enumerate(path):
+            if isinstance(node, list):
+                key = int(key)
+
+            if any(isinstance(schema, dict) and ANCESTOR_KEYWORDS.intersection(schema) for schema in schemas):
+                return None
+
+            try:
+                previous_child_node = previous_node[key]
+                exists = True
+
+            except (KeyError, IndexError, TypeError):
+                previous_child_node = None
+                exists = False
+
+            last = i == len(path) - 1
+            if last and isinstance(key, int) and isinstance(previous_node, list):
+                # the positions of the list items shift: an item that is a list is moved to the beginning of the list
+                # when it is replaced, and the items after a removed item move back
+                if (operation == 'DELETE' and key != len(previous_node) - 1) or \
+                        (operation != 'DELETE' and isinstance(previous_child_node, list)):
+                    return None
+
+            if operation == 'DELETE' and last:
+                # removed items change the position of the next ones in lists
+                if any(isinstance(schema, dict) and DELETE_KEYWORDS.intersection(schema) for schema in schemas) or \
+                        (isinstance(node, list) and cls._child_schemas(validator, schemas, key) is None):
+                    return None
+
+                return list()
+
+            if not exists:
+                # a new node is added to this node (and the remaining nodes of the path are created inside it)
+                if any(isinstance(schema, dict) and ADD_KEYWORDS.intersection(schema) for schema in schemas):
+                    return None
+
+            child_schemas = cls._child_schemas(validator, schemas, key)
+            if child_schemas is None:
+                return None
+
+            child_node = node[key]
+            if not exists or last or type(previous_child_node) is not type(child_node) or \
+                    not isinstance(child_node, (dict, list)):
+                if last and isinstance(previous_child_node, list) and isinstance(child_node, list):
+                    # value appended to the list (or the list items were moved in a list of lists)
+                    if isinstance(key, int) or len(child_node) != len(previous_child_node) + 1 or \
+                            any(isinstance(schema, dict) and
+                                (ANCESTOR_KEYWORDS | ADD_KEYWORDS).intersection(schema) for schema in child_schemas):
+                        return None
+
+                    item_schemas = cls._child_schemas(validator, child_schemas, len(child_node) - 1)
+                    return None if item_schemas is None else [(item_schemas, child_node[-1])]
+
+                return [(child_schemas, child_node)]
+
+            schemas, previous_node, node = child_schemas, previous_child_node, child_node
+
+        return None
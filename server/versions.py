@@ -0,0 +1,122 @@
+# python libs
+import hashlib
+import threading
+
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+# project files
+from cache import CachedDocument
+
+
+class DocumentVersions:
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.changes: Dict[Tuple[str, ...], int] = dict()  # version of the last change made at each path
+        self.subtrees: Dict[Tuple[str, ...], int] = dict()  # version of the last change made at or below each path
+
+
+class NodeVersions:
+    """
+    Keeps the version of the nodes of the cached documents, used as the ETag of the GET responses.
+    A change made at a path changes the version of the node at that path, of all its parents and of all its children,
+    so the other nodes keep their ETag. Changes inside lists change the version of the whole list (the indexes of the
+    items may change). When a document is loaded from the file (changed outside the API) all the nodes get a new ETag.
+    """
+
+    def __init__(self):
+        # the versions are not kept when the service restarts, so the ETags of each run are different
+        self._epoch = uuid4().hex[:8]
+
+        self._documents: Dict[str, DocumentVersions] = dict()
+        self._lock = threading.Lock()
+
+    def register_changes(self,
+                         key: str,
+                         document: CachedDocument,
+                         paths: List[List[str]],
+                         previous_json_data: Any) -> None:
+        """
+        Registers the changes that will be made to the document. Must be called before the changed document is cached,
+        so a changed document is never read with the versions before the changes (if the changes fail, the nodes just
+        get a new ETag).
+        :param key: "api.files" entry name
+        :param document: cached document, before the changes
+        :param paths: path parts, in the JSON, to the nodes where the changes are made
+        :param previous_json_data: JSON data object before the changes
+        """
+
+        # the version of the changed document (see DocumentCache.set)
+        version = document.version + 1
+
+        with self._lock:
+            versions = self._documents.get(key)
+            if versions is None or versions.generation != document.generation:
+                versions = self._documents[key] = DocumentVersions(document.generation)
+
+            for path in map(tuple, paths):
+                # changes inside lists are registered in the list
+                json_node_data = previous_json_data
+                for i, part in enumerate(path):
+                    if isinstance(json_node_data, list):
+                        path = path[:i]
+                        break
+
+                    if not isinstance(json_node_data, dict) or part not in json_node_data:
+                        break
+
+                    json_node_data = json_node_data[part]
+
+                versions.changes[path] = version
+                for i in range(len(path) + 1):
+                    versions.subtrees[path[:i]] = version
+
+    def etag(self, key: str, document: CachedDocument, path: List[str]) -> str:
+        """
+        Returns the ETag of a node of the document
+        :param key: "api.files" entry name
+        :param document: cached document
+        :param path: path parts, in the JSON, to the node
+        :return: ETag (quoted)
+        """
+
+        path = tuple(path)
+        version = 0
+        if (versions := self._documents.get(key)) and versions.generation == document.generation:
+            version = max(versions.subtrees.get(path, 0), *(versions.changes.get(path[:i], 0)
+                                                            for i in range(len(path) + 1)))
+
+        elif versions and versions.generation > document.generation:
+            # the document was loaded again after this one was read, the version of the node is not known
+            version = document.version
+
+        # the versions may already include changes made after the document was read, but these changes are not in the
+        # document (if the node changed the version of the document is still a version of the node not used by other
+        # contents of the node)
+        return f'"{self._epoch}-{document.generation}-{min(version, document.version)}"'
+
+    @staticmethod
+    def file_etag(signature: Tuple[int, ...]) -> str:
+        """
+        Returns the ETag of all the nodes of a file that was not loaded (ex: read with a path index), derived from the
+        signature of the file
+        :param signature: signature of the file (see DocumentCache.file_signature)
+        :return: ETag (quoted)
+        """
+
+        return f'"{hashlib.sha1(repr(signature).encode()).hexdigest()[:16]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Checks if the "If-None-Match" header of a request matches the ETag (weak comparison)
+    :param if_none_match: value of the "If-None-Match" header
+    :param etag: ETag of the current content (quoted)
+    :return: True if the client already has the current content
+    """
+
+    if not if_none_match:
+        return False
+
+    return any(tag == '*' or tag.removeprefix('W/') == etag for tag in map(str.strip, if_none_match.split(',')))
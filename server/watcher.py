@@ -0,0 +1,166 @@
+# python libs
+import os
+import time
+import ctypes
+import select
+import struct
+import logging
+import threading
+import ctypes.util
+
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple, Union
+from pathlib import Path
+
+# project files
+from cache import DocumentCache
+
+# constants
+logger = logging.getLogger('uvicorn')
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+INOTIFY_EVENT_HEADER = struct.Struct('iIII')  # watch descriptor, mask, cookie and name length
+
+
+class FileWatcher:
+    """
+    Watches the JSON files for changes made outside the service (ex: edited by operators or other tools) and calls the
+    handler once for each changed file.
+    Files are watched with inotify (Linux), through the directories where they are, so files replaced by renaming
+    another file are also detected. Where inotify is not available the signature (see DocumentCache.file_signature) of
+    the files is polled, without reading them. Events of a file are debounced, so a file written in several steps is
+    handled once. Changes made by the service itself are also reported, the handler must ignore them.
+    """
+
+    def __init__(self,
+                 files: Dict[str, Union[str, Path]],
+                 handler: Callable[[str], None],
+                 mode: str = 'auto',
+                 poll_interval: float = 1,
+                 debounce_interval: float = 0.1):
+        """
+        :param files: Path to the file of each "api.files" entry
+        :param handler: function called with the "api.files" entry name of each changed file
+        :param mode: "inotify", "polling" or "auto" (inotify if it is available, otherwise polling)
+        :param poll_interval: time, in seconds, between checks of the files when polling
+        :param debounce_interval: time, in seconds, to wait for more events of a changed file before handling it
+        """
+
+        self._files = {key: Path(path).resolve() for key, path in files.items()}
+        self._handler = handler
+        self._poll_interval = poll_interval
+        self._debounce_interval = debounce_interval
+
+        self._inotify_file_descriptor = self._inotify_init(self._files.values()) if mode != 'polling' else None
+        if self._inotify_file_descriptor is None and mode == 'inotify':
+            raise OSError('inotify is not available')
+
+        self.mode = 'inotify' if self._inotify_file_descriptor is not None else 'polling'
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='file-watcher', daemon=True)
+
+        # counters
+        self.changed_files = 0
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+        if self._inotify_file_descriptor is not None:
+            os.close(self._inotify_file_descriptor)
+            self._inotify_file_descriptor = None
+
+    @staticmethod
+    def _inotify_init(file_paths: Iterable[Path]) -> Optional[int]:
+        # returns the inotify descriptor watching the directories of the files (None if inotify is not available)
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            inotify_file_descriptor = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+
+        except (AttributeError, OSError, TypeError):
+            return None
+
+        if inotify_file_descriptor < 0:
+            return None
+
+        for directory in {file_path.parent for file_path in file_paths}:
+            if libc.inotify_add_watch(inotify_file_descriptor, bytes(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+                logger.warning(f'Unable to watch directory \"{directory}\" with inotify: '
+                               f'{os.strerror(ctypes.get_errno())}')
+                os.close(inotify_file_descriptor)
+                return None
+
+        return inotify_file_descriptor
+
+    def _inotify_changes(self) -> Set[str]:
+        # waits for the inotify events, returns the "api.files" entries of the changed files
+        readable, _, _ = select.select([self._inotify_file_descriptor], [], [], self._poll_interval)
+        if not readable:
+            return set()
+
+        changed_names = set()
+        try:
+            events = os.read(self._inotify_file_descriptor, 65536)
+
+        except BlockingIOError:
+            return set()
+
+        position = 0
+        while position < len(events):
+            _, _, _, name_length = INOTIFY_EVENT_HEADER.unpack_from(events, position)
+            position += INOTIFY_EVENT_HEADER.size
+            changed_names.add(events[position:position + name_length].rstrip(b'\0').decode(errors='replace'))
+            position += name_length
+
+        return {key for key, file_path in self._files.items() if file_path.name in changed_names}
+
+    def _file_signatures(self) -> Dict[str, Tuple[int, ...]]:
+        signatures = dict()
+        for key, file_path in self._files.items():
+            try:
+                signatures[key] = DocumentCache.file_signature(file_path)
+
+            except OSError:
+                signatures[key] = tuple()
+
+        return signatures
+
+    def _run(self) -> None:
+        signatures = self._file_signatures()
+        while not self._stopped.is_set():
+            if self.mode == 'inotify':
+                changed_keys = self._inotify_changes()
+
+            else:
+                self._stopped.wait(self._poll_interval)
+                previous_signatures, signatures = signatures, self._file_signatures()
+                changed_keys = {key for key in signatures if signatures[key] != previous_signatures[key]}
+
+            if not changed_keys:
+                continue
+
+            # wait for the file to be completely written (events received meanwhile are handled together)
+            time.sleep(self._debounce_interval)
+            if self.mode == 'inotify':
+                changed_keys |= self._inotify_changes_available()
+
+            for key in sorted(changed_keys):
+                self.changed_files += 1
+                try:
+                    self._handler(key)
+
+                except Exception as handler_error:
+                    logger.error(f'Error occurred while handling the change of JSON file \"{self._files[key]}\":',
+                                 exc_info=handler_error)
+
+    def _inotify_changes_available(self) -> Set[str]:
+        # the changes of the events already received, without waiting for new ones
+        changed_keys = set()
+        while select.select([self._inotify_file_descriptor], [], [], 0)[0]:
+            changed_keys |= self._inotify_changes()
+
+        return changed_keys